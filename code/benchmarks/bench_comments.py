@@ -0,0 +1,149 @@
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Executar a partir de code/:  python benchmarks/bench_comments.py [--repo-dir <clone do macrozheng/mall>]
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.java_lexer import count_comments_by_type, FILE_LEVEL
+from utils.utils import _count_file_comments
+
+# Implementação anterior (regex de comentários + brace matching por declaração),
+# mantida aqui só como referência de tempo.
+COMMENT_RE = re.compile(r'//.*?$|/\*.*?\*/', re.DOTALL | re.MULTILINE)
+CLASS_DECL_RE = re.compile(r'\b(class|interface|enum)\s+([A-Za-z_][A-Za-z0-9_$]*)', re.MULTILINE)
+
+
+def legacy_count(content):
+    class_ranges = []
+    for m in CLASS_DECL_RE.finditer(content):
+        brace_idx = content.find('{', m.end())
+        if brace_idx == -1:
+            continue
+        depth = 0
+        for i in range(brace_idx, len(content)):
+            if content[i] == '{':
+                depth += 1
+            elif content[i] == '}':
+                depth -= 1
+                if depth == 0:
+                    class_ranges.append((m.group(2), brace_idx, i + 1))
+                    break
+    class_ranges.sort(key=lambda x: x[2] - x[1])
+
+    counts = {}
+    for cm in COMMENT_RE.finditer(content):
+        owner = next((name for name, s, e in class_ranges if s <= cm.start() < e), FILE_LEVEL)
+        counts[owner] = counts.get(owner, 0) + 1
+    return counts
+
+
+def synthetic_file(classes=400, depth=4, methods=5):
+    """
+    Arquivo grande com tipos aninhados, comentários e literais com '{', '}' e '//'.
+    """
+    parts = ["package bench;\n\n/* cabeçalho */\n"]
+    for c in range(classes):
+        for d in range(depth):
+            parts.append(f"{'  ' * d}/** Javadoc de C{c}_{d} */\npublic class C{c}_{d} {{\n")
+            for m in range(methods):
+                parts.append(
+                    f"{'  ' * d}  // método {m}\n"
+                    f"{'  ' * d}  void m{m}() {{ String s = \"{{ // não é comentário\"; char ch = '}}'; }}\n"
+                )
+        for d in reversed(range(depth)):
+            parts.append(f"{'  ' * d}}}\n")
+    return "".join(parts)
+
+
+def java_files(repo_dir):
+    for root, _, files in os.walk(repo_dir):
+        for name in files:
+            if name.endswith(".java"):
+                yield os.path.join(root, name)
+
+
+def timed(label, func, contents, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            func(content)
+        best = min(best, time.perf_counter() - start)
+    size_mb = sum(len(c) for c in contents) / 1024 ** 2
+    print(f"  {label:<8} {best * 1000:9.1f} ms  ({size_mb / best:6.1f} MB/s)")
+    return best
+
+
+def run(label, contents, repeat):
+    print(f"\n== {label}: {len(contents)} arquivo(s), {sum(len(c) for c in contents) / 1024:.0f} KB ==")
+    old = timed("regex", legacy_count, contents, repeat)
+    new = timed("lexer", count_comments_by_type, contents, repeat)
+    print(f"  speedup  {old / new:9.1f}x")
+
+
+def run_scan_modes(size_mb):
+    """
+    Arquivo gerado grande (tipo saída de protobuf/ANTLR) lido do disco:
+    compara a varredura em bytes via mmap com a leitura decodificada.
+    Cada modo roda em um processo separado para medir o pico de RSS.
+    """
+    base = synthetic_file()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Generated.java")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(max(1, int(size_mb * 1024 ** 2 / len(base)))):
+                f.write(base.replace("class C", f"class G{i}_C"))
+        print(f"\n== arquivo gerado: {os.path.getsize(path) / 1024 ** 2:.0f} MB ==")
+        for mode in ("text", "mmap"):
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--scan-file", path, "--scan-mode", mode],
+                           check=True)
+
+
+def scan_file(path, mode):
+    start = time.perf_counter()
+    _count_file_comments(path, mode)
+    elapsed = time.perf_counter() - start
+    peak = f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:7.1f} MB" if resource else "n/d"
+    print(f"  {mode:<8} {elapsed * 1000:9.1f} ms  pico RSS {peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da contagem de comentários por classe")
+    parser.add_argument("--repo-dir", help="checkout de um repositório (ex.: macrozheng/mall, analisado em ck_output/macrozheng_mall)")
+    parser.add_argument("--classes", type=int, default=400, help="tipos de topo no arquivo sintético")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--large-mb", type=float, default=0,
+                        help="também compara os modos text e mmap em um arquivo gerado deste tamanho (MB)")
+    parser.add_argument("--scan-file", help=argparse.SUPPRESS)
+    parser.add_argument("--scan-mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scan_file:
+        scan_file(args.scan_file, args.scan_mode)
+        return
+
+    if args.repo_dir:
+        contents = []
+        for path in java_files(args.repo_dir):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                contents.append(f.read())
+        run(args.repo_dir, contents, args.repeat)
+    else:
+        print("[!] --repo-dir não informado: medindo apenas o arquivo sintético")
+
+    run("sintético", [synthetic_file(classes=args.classes)], args.repeat)
+    if args.large_mb:
+        run_scan_modes(args.large_mb)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Executar a partir de code/:  python benchmarks/bench_stats.py [--classes 100000]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils"))
+
+from stats_kernel import describe_frame, correlations
+
+TARGET_COLS = ["cbo", "dit", "loc", "lcom"]
+THRESHOLDS = {"cbo": [14], "dit": [7], "loc": [500]}
+
+
+def synthetic_repo(classes, seed=42):
+    """
+    class.csv sintético com distribuições parecidas com as do CK (caudas longas
+    em LOC e LCOM, DIT pequeno).
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "cbo": rng.poisson(6, classes),
+        "dit": rng.integers(1, 9, classes),
+        "loc": rng.lognormal(4, 1.2, classes).astype(np.int64),
+        "lcom": rng.lognormal(2, 2, classes).astype(np.int64),
+    })
+
+
+def pandas_summary(df):
+    # Abordagem anterior do analyzer.py: uma chamada do pandas por estatística
+    stats = {}
+    for col in TARGET_COLS:
+        stats[f"{col}_mean"] = df[col].mean()
+        stats[f"{col}_median"] = df[col].median()
+        stats[f"{col}_mode"] = df[col].mode().iloc[0]
+        stats[f"{col}_std"] = df[col].std()
+        stats[f"{col}_min"] = df[col].min()
+        stats[f"{col}_max"] = df[col].max()
+        stats[f"{col}_p90"] = df[col].quantile(0.9)
+        if df[col].std(ddof=0) != 0:
+            zscores = (df[col] - df[col].mean()) / df[col].std(ddof=0)
+            stats[f"{col}_outlier_pct"] = (abs(zscores) > 2).mean() * 100
+        else:
+            stats[f"{col}_outlier_pct"] = 0.0
+    for col, (threshold,) in THRESHOLDS.items():
+        stats[f"pct_{col}_high"] = (df[col] > threshold).mean() * 100
+    pearson = df[TARGET_COLS].corr(method="pearson").to_numpy()
+    spearman = df[TARGET_COLS].corr(method="spearman").to_numpy()
+    return stats, pearson, spearman
+
+
+def kernel_summary(df):
+    summary, matrix = describe_frame(df, TARGET_COLS, thresholds=THRESHOLDS)
+    stats = {}
+    for col in TARGET_COLS:
+        s = summary[col]
+        for key in ("mean", "median", "mode", "std", "min", "max"):
+            stats[f"{col}_{key}"] = s[key]
+        stats[f"{col}_p90"] = s["quantile"]
+        stats[f"{col}_outlier_pct"] = s["outlier_pct"]
+    for col, (threshold,) in THRESHOLDS.items():
+        stats[f"pct_{col}_high"] = summary[col][f"above_{threshold}"]
+    pearson, spearman = correlations(matrix)
+    return stats, pearson, spearman
+
+
+def timed(label, func, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<8} {best * 1000:9.1f} ms")
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das estatísticas por repositório do analyzer")
+    parser.add_argument("--classes", type=int, default=100_000, help="linhas do class.csv sintético")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = synthetic_repo(args.classes)
+    print(f"== repositório sintético: {args.classes} classes ==")
+    old, (old_stats, old_p, old_s) = timed("pandas", pandas_summary, df, args.repeat)
+    new, (new_stats, new_p, new_s) = timed("kernel", kernel_summary, df, args.repeat)
+    print(f"  speedup  {old / new:9.1f}x")
+
+    diffs = [key for key in old_stats if old_stats[key] != new_stats[key]]
+    corr_diff = max(np.abs(old_p - new_p).max(), np.abs(old_s - new_s).max())
+    print(f"\nEstatísticas diferentes: {len(diffs)} {diffs if diffs else ''}")
+    print(f"Maior diferença nas correlações: {corr_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import com.github.mauricioaniche.ck.CK;
+import com.github.mauricioaniche.ck.CKClassResult;
+import com.github.mauricioaniche.ck.CKNotifier;
+import com.github.mauricioaniche.ck.ResultWriter;
+
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.nio.charset.StandardCharsets;
+import java.util.HashMap;
+import java.util.Map;
+
+/**
+ * Worker persistente do CK: mantém a JVM aberta e analisa um repositório por
+ * linha recebida no stdin, gravando os mesmos CSVs que o Runner do CK.
+ *
+ * Entrada (uma linha por repositório, separada por TAB):
+ *   repo_dir  output_dir  use_jars  max_files_per_partition  variables_and_fields
+ *
+ * Saída: linhas prefixadas com "@@CKDRIVER " (o resto do stdout é log do CK):
+ *   @@CKDRIVER READY
+ *   @@CKDRIVER OK   <ms>  <classes>
+ *   @@CKDRIVER ERR  <ms>  <mensagem>
+ */
+public class CKDriver {
+
+    private static final String PREFIX = "@@CKDRIVER ";
+
+    public static void main(String[] args) throws IOException {
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        reply("READY");
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.trim().isEmpty()) {
+                continue;
+            }
+            long start = System.nanoTime();
+            try {
+                String[] parts = line.split("\t");
+                int classes = analyze(parts[0], parts[1], Boolean.parseBoolean(parts[2]),
+                        Integer.parseInt(parts[3]), Boolean.parseBoolean(parts[4]));
+                reply("OK\t" + elapsedMillis(start) + "\t" + classes);
+            } catch (Throwable t) {
+                String message = String.valueOf(t).replace('\n', ' ').replace('\t', ' ');
+                reply("ERR\t" + elapsedMillis(start) + "\t" + message);
+            }
+        }
+    }
+
+    private static int analyze(String repoDir, String outputDir, boolean useJars, int maxAtOnce,
+                               boolean variablesAndFields) throws IOException {
+        Map<String, CKClassResult> results = new HashMap<>();
+
+        new CK(useJars, maxAtOnce, variablesAndFields).calculate(repoDir, new CKNotifier() {
+            @Override
+            public void notify(CKClassResult result) {
+                results.put(result.getClassName() + result.getType(), result);
+            }
+
+            @Override
+            public void notifyError(String sourceFilePath, Exception e) {
+                System.err.println("Erro em " + sourceFilePath + ": " + e);
+            }
+        });
+
+        ResultWriter writer = new ResultWriter(outputDir + "class.csv", outputDir + "method.csv",
+                outputDir + "variable.csv", outputDir + "field.csv", variablesAndFields);
+        for (CKClassResult result : results.values()) {
+            writer.printResult(result);
+        }
+        writer.flushAndClose();
+        return results.size();
+    }
+
+    private static long elapsedMillis(long start) {
+        return (System.nanoTime() - start) / 1_000_000;
+    }
+
+    private static void reply(String message) {
+        System.out.println(PREFIX + message);
+        System.out.flush();
+    }
+}
@@ -1,33 +1,72 @@
 import os
 import shutil
+import stat
 import subprocess
 import sys
+import argparse
+import threading
 import pandas as pd
-import requests
 import zipfile
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from utils.utils import get_github_token, generate_comments_by_class
+from utils.http_client import configure_http, get_session, count_stream_bytes, print_http_stats
+from utils.pipeline import DiskBudget, Stage, run_pipeline
+from utils.zipstream import stream_extract, StreamZipError
+from utils.snapshot_cache import SnapshotCache
+from utils.ck_worker import CKWorkerPool, CKWorkerError
+from utils.ck_budget import plan_ck_budget, count_java_files, run_measured, MAX_HEAP_MB
+from utils.manifest import ck_jar_info, read_manifest, write_manifest, manifest_is_current
+from utils.fastpath import analyze_repo, fastpath_info
+from utils.sampling import build_sample_tree, SAMPLE_METHOD
+from utils.timings import SweepTimings, TIMINGS_PATH, span, add_span, busy_time, print_report
+from utils.cost_model import CostModel, largest_first, schedule_eta, accuracy_summary
 from datetime import timedelta
 from urllib.parse import urlparse
 from git import repo
 
-def get_default_branch(repo_url):
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB por leitura no download
+CK_USE_JARS = True                 # CK resolve tipos usando os .jar do repositório
+# Arquivos gravados pela extração em fluxo; a variante do snapshot no cache diz
+# quais arquivos a árvore tem (uma árvore só com .java não serve ao modo full)
+STREAM_SUFFIXES = ('.java', '.jar') if CK_USE_JARS else ('.java',)
+STREAM_SNAPSHOT = "only" + "".join(STREAM_SUFFIXES)
+FULL_SNAPSHOT = "full"
+
+CK_TIMEOUT = 300                   # segundos por repositório
+PREVIEW_ROWS = 5                   # linhas lidas de cada CSV para validar e exibir
+
+# Argumentos passados ao CK (registrados no manifesto de cada saída)
+CK_OPTIONS = {
+    "use_jars": CK_USE_JARS,
+    "max_files_per_partition": 0,   # 0 = automático
+    "variables_and_fields": True,   # extrair métricas de variáveis e campos
+}
+
+def resolve_remote_head(repo_url):
     """
-    Detecta a default branch de forma robusta:
-    1. Tenta via git ls-remote
-    2. Fallback para API GitHub (se possível)
+    Detecta a default branch e o commit do HEAD de forma robusta:
+    1. Tenta via git ls-remote (branch e SHA na mesma chamada)
+    2. Fallback para API GitHub (se possível, apenas a branch)
     3. Fallback final: main/master/trunk
+    Retorna (branch, sha); sha é None quando não foi possível resolvê-lo.
     """
+    branch, sha = None, None
     try:
         result = subprocess.run(
             ["git", "ls-remote", "--symref", repo_url, "HEAD"],
             capture_output=True, text=True, timeout=30, check=True
         )
         for line in result.stdout.splitlines():
+            parts = line.split()
             if line.startswith("ref:"):
-                parts = line.split()
                 if len(parts) >= 3 and parts[1].startswith("refs/heads/"):
-                    return parts[1].replace("refs/heads/", "")
+                    branch = parts[1].replace("refs/heads/", "")
+            elif len(parts) == 2 and parts[1] == "HEAD":
+                sha = parts[0]
+        if branch:
+            return branch, sha
     except Exception as e:
         print(f"[!] Falha com git ls-remote: {e}")
 
@@ -41,101 +80,224 @@ def get_default_branch(repo_url):
                 token = get_github_token()
                 if token:
                     headers["Authorization"] = f"token {token}"
-                response = requests.get(api_url, headers=headers, timeout=30)
+                response = get_session().get(api_url, headers=headers, timeout=30)
                 if response.status_code == 200:
-                    return response.json().get("default_branch", "main")
+                    return response.json().get("default_branch", "main"), sha
     except Exception as e:
         print(f"[!] Falha na API do GitHub: {e}")
 
-    return "main"
-    
+    return "main", sha
 
-def clone_repo(repo_url, dest_dir='repo'):
-    import stat
-    def remove_readonly(func, path, excinfo):
-        os.chmod(path, stat.S_IWRITE)
-        func(path)
+def get_default_branch(repo_url):
+    """
+    Detecta a default branch (ver resolve_remote_head).
+    """
+    return resolve_remote_head(repo_url)[0]
     
+
+def get_zip_url(repo_url, head=None):
+    """
+    Monta a URL do ZIP (apenas para repositórios do GitHub). Quando o SHA do
+    HEAD é conhecido, baixa exatamente aquele commit; senão, a default branch.
+    head: (branch, sha) já resolvidos por resolve_remote_head, se houver.
+    """
+    if 'github.com' not in repo_url:
+        return None
+    clean_url = repo_url.replace('.git', '')
+    default_branch, sha = head if head else resolve_remote_head(repo_url)
+    if sha:
+        return f"{clean_url}/archive/{sha}.zip"
+    return f"{clean_url}/archive/refs/heads/{default_branch}.zip"
+
+def clone_repo(repo_url, dest_dir='repo', head=None):
+    """
+    Baixa o repositório em dest_dir (ZIP, com git clone como fallback).
+    head: (branch, sha) já conhecidos (ex.: de top_java_repos.csv); sem ele,
+    a default branch e o HEAD são descobertos pela rede.
+    """
     if os.path.exists(dest_dir):
-        shutil.rmtree(dest_dir, onerror=remove_readonly)
-    
+        shutil.rmtree(dest_dir, onerror=_remove_readonly)
+
+    parent_dir = os.path.dirname(dest_dir)
+    if parent_dir:
+        os.makedirs(parent_dir, exist_ok=True)
+
     print(f"[+] Baixando repositório de {repo_url} como ZIP...")
     
     try:
-        if 'github.com' in repo_url:
-            clean_url = repo_url.replace('.git', '')
-            default_branch = get_default_branch(repo_url)
-            zip_url = f"{clean_url}/archive/refs/heads/{default_branch}.zip"
-            
+        zip_url = get_zip_url(repo_url, head)
+        sha = head[1] if head else None
+        if zip_url:
             success = download_and_extract_zip(zip_url, dest_dir)
             
             if not success:
                 print("[!] Download ZIP falhou, tentando git clone...")
-                return clone_with_git(repo_url, dest_dir)
+                return clone_with_git(repo_url, dest_dir, sha)
                 
             return dest_dir
         else:
-            return clone_with_git(repo_url, dest_dir)
+            return clone_with_git(repo_url, dest_dir, sha)
             
     except Exception as e:
         print(f"[!] Erro no download ZIP: {e}")
-        return clone_with_git(repo_url, dest_dir)
+        return clone_with_git(repo_url, dest_dir, sha)
 
 def download_and_extract_zip(zip_url, dest_dir):
     """
-    Baixa e extrai um arquivo ZIP do repositório
+    Baixa e extrai um arquivo ZIP do repositório.
+    O ZIP e a pasta temporária de extração ficam ao lado de dest_dir, para que
+    workers paralelos (cada um com seu próprio dest_dir) não colidam.
+    """
+    zip_path = f"{dest_dir}.zip"
+    if not download_zip(zip_url, zip_path):
+        return False
+    return extract_zip(zip_path, dest_dir)
+
+def download_zip(zip_url, zip_path, io_stats=None):
+    """
+    Baixa o ZIP do repositório para zip_path (etapa de rede do pipeline).
+    io_stats, se informado, recebe bytes_downloaded.
     """
     try:
-        # Download do ZIP
         print(f"[+] Baixando ZIP de {zip_url}...")
-        response = requests.get(zip_url, stream=True, timeout=60)
-        response.raise_for_status()
-        
-        zip_path = f"{dest_dir}.zip"
-        
-        # Salva o arquivo ZIP
-        with open(zip_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
+        with get_session().get(zip_url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+
+            with open(zip_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+            count_stream_bytes(response, os.path.getsize(zip_path))
+            if io_stats is not None:
+                io_stats["bytes_downloaded"] = os.path.getsize(zip_path)
+        return True
+
+    except Exception as e:
+        print(f"[!] Erro no download do ZIP: {e}")
+        _remove_path(zip_path)
+        return False
+
+def download_and_stream_extract(zip_url, dest_dir, include_jars=CK_USE_JARS, io_stats=None):
+    """
+    Baixa o ZIP e extrai em fluxo, sem gravar o arquivo completo em disco.
+    Somente os arquivos usados pelo CK e pela contagem de comentários (.java e,
+    se o CK resolve JARs, .jar) são gravados, já sem a pasta raiz do ZIP.
+    Levanta StreamZipError se o ZIP não puder ser lido sequencialmente.
+    io_stats, se informado, recebe bytes_downloaded e bytes_written.
+    """
+    suffixes = ('.java', '.jar') if include_jars else ('.java',)
+    try:
+        print(f"[+] Baixando e extraindo ZIP de {zip_url} (somente {', '.join(suffixes)})...")
+        with get_session().get(zip_url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+            files, written, downloaded = stream_extract(chunks, dest_dir, suffixes)
+            # Consome o diretório central (pequeno) para a conexão voltar ao pool
+            for chunk in chunks:
+                downloaded += len(chunk)
+            count_stream_bytes(response, downloaded)
+        if io_stats is not None:
+            io_stats.update(bytes_downloaded=downloaded, bytes_written=written)
+        print(f"[✓] {files} arquivos extraídos para {dest_dir} "
+              f"({written / 1024 ** 2:.1f} MB gravados de {downloaded / 1024 ** 2:.1f} MB baixados)")
+        return True
+
+    except StreamZipError:
+        _remove_path(dest_dir)
+        raise
+    except Exception as e:
+        print(f"[!] Erro no download/extração do ZIP: {e}")
+        _remove_path(dest_dir)
+        return False
+
+def extract_zip(zip_path, dest_dir, io_stats=None):
+    """
+    Extrai zip_path para dest_dir removendo a pasta raiz do arquivo e apaga o ZIP
+    (etapa de disco do pipeline). io_stats, se informado, recebe bytes_written.
+    """
+    temp_extract = f"{dest_dir}_extract"
+    try:
         print(f"[+] Extraindo ZIP...")
         
         # Extrai o ZIP
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall('temp_extract')
+            zip_ref.extractall(temp_extract)
+            if io_stats is not None:
+                io_stats["bytes_written"] = sum(info.file_size for info in zip_ref.infolist())
         
         # Move o conteúdo da pasta extraída para o destino final
-        extracted_folders = os.listdir('temp_extract')
+        extracted_folders = os.listdir(temp_extract)
         if extracted_folders:
-            extracted_path = os.path.join('temp_extract', extracted_folders[0])
+            extracted_path = os.path.join(temp_extract, extracted_folders[0])
             shutil.move(extracted_path, dest_dir)
         
-        # Limpa arquivos temporários
-        os.remove(zip_path)
-        if os.path.exists('temp_extract'):
-            shutil.rmtree('temp_extract')
-        
         print(f"[✓] Repositório extraído com sucesso para {dest_dir}")
         return True
         
     except Exception as e:
-        print(f"[!] Erro no download/extração ZIP: {e}")
-        # Limpa arquivos temporários em caso de erro
-        for temp_file in [f"{dest_dir}.zip", 'temp_extract']:
-            if os.path.exists(temp_file):
-                try:
-                    if os.path.isfile(temp_file):
-                        os.remove(temp_file)
-                    else:
-                        shutil.rmtree(temp_file)
-                except:
-                    pass
+        print(f"[!] Erro na extração do ZIP: {e}")
+        return False
+
+    finally:
+        # Limpa arquivos temporários
+        for temp_file in [zip_path, temp_extract]:
+            _remove_path(temp_file)
+
+def _remove_readonly(func, path, excinfo):
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+def _remove_path(path):
+    """
+    Remove um arquivo ou pasta, ignorando erros (limpeza de temporários).
+    """
+    if not path or not os.path.exists(path):
+        return
+    try:
+        if os.path.isfile(path):
+            os.remove(path)
+        else:
+            shutil.rmtree(path, onerror=_remove_readonly)
+    except Exception:
+        pass
+
+def clone_at_commit(repo_url, dest_dir, sha):
+    """
+    Busca só o commit `sha` (git fetch --depth 1 <sha>, aceito pelo GitHub)
+    em dest_dir. Retorna False se o servidor não entregar o commit.
+    """
+    print(f"[+] Buscando o commit {sha[:10]} de {repo_url} com git...")
+    commands = [
+        ['git', 'init', '-q', dest_dir],
+        ['git', '-C', dest_dir, 'fetch', '-q', '--depth', '1', repo_url, sha],
+        ['git', '-C', dest_dir, 'checkout', '-q', 'FETCH_HEAD'],
+    ]
+    try:
+        for cmd in commands:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return True
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"[!] Commit {sha[:10]} não pôde ser buscado: {getattr(e, 'stderr', e)}")
+        _remove_path(dest_dir)
         return False
 
-def clone_with_git(repo_url, dest_dir):
+def cloned_head(dest_dir):
+    """
+    SHA do commit de um clone (None se não for um repositório git).
+    """
+    try:
+        result = subprocess.run(['git', '-C', dest_dir, 'rev-parse', 'HEAD'],
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip() or None
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+def clone_with_git(repo_url, dest_dir, sha=None):
     """
-    Fallback para git clone tradicional
+    Fallback para git clone tradicional. Com `sha`, tenta primeiro baixar
+    exatamente aquele commit; se não der, clona a default branch.
     """
+    if sha and clone_at_commit(repo_url, dest_dir, sha):
+        return dest_dir
     print(f"[+] Clonando com git de {repo_url}...")
     
     try:
@@ -153,34 +315,81 @@ def clone_with_git(repo_url, dest_dir):
             print(f"[!] Falha no clone alternativo: {git_error.stderr}")
             raise e
 
-def run_ck(jar_path, repo_dir, repo_name, output_base='ck_output'):
+def read_csv_preview(csv_path, nrows=PREVIEW_ROWS):
+    """
+    Leitura limitada às primeiras `nrows` linhas: valida o CSV (header e início
+    do arquivo) e já serve de prévia para os load_and_print_*.
+    """
+    return pd.read_csv(csv_path, nrows=nrows, encoding="utf-8", encoding_errors="ignore")
+
+def run_ck(jar_path, repo_dir, repo_name, output_base='ck_output', options=None, worker_pool=None,
+           budget=None, run_stats=None, previews=None):
     """
     Executa o CK Tool para um repositório e salva os CSVs em uma subpasta.
+    repo_name deve ser "owner/name" para que repositórios homônimos de donos
+    diferentes não sobrescrevam a mesma pasta.
+    Com worker_pool (CKWorkerPool), usa uma JVM persistente em vez de subir
+    `java -jar` a cada repositório; os CSVs gerados são os mesmos.
+    budget (ver utils.ck_budget.plan_ck_budget) define timeout, -Xmx e max files
+    per partition; sem ele valem CK_TIMEOUT e o heap padrão da JVM.
+    run_stats, se informado, recebe o tempo, o CPU e o pico de RSS do CK, se
+    houve timeout, e o tempo da validação e o tamanho dos CSVs gerados.
+    previews, se informado, recebe a prévia (PREVIEW_ROWS linhas) de cada CSV
+    válido, lida uma única vez junto com a validação.
     Se ocorrer erro, tenta retornar arquivos parciais.
     """
+    options = dict(options or CK_OPTIONS)
+    timeout = CK_TIMEOUT
+    jvm_args = []
+    if budget:
+        timeout = budget["timeout_s"]
+        jvm_args = [f"-Xmx{budget['xmx_mb']}m"]
+        options["max_files_per_partition"] = budget["max_files_per_partition"]
+
     output_dir = os.path.join(output_base, repo_name.replace("/", "_"))
     if os.path.exists(output_dir):
         shutil.rmtree(output_dir)
     os.makedirs(output_dir, exist_ok=True)
 
-    print(f"[+] Executando CK Tool em {repo_dir} ...")
+    print(f"[+] Executando CK Tool em {repo_dir} (timeout {timeout}s"
+          f"{', ' + jvm_args[0] if jvm_args else ''}) ...")
 
     cmd = [
-        'java', '-jar', jar_path,
+        'java', *jvm_args, '-jar', jar_path,
         repo_dir,
-        'true',      # usar JARs
-        '0',         # max files per partition = automático
-        'true',      # extrair métricas de variáveis e campos
+        str(options["use_jars"]).lower(),             # usar JARs
+        str(options["max_files_per_partition"]),      # max files per partition
+        str(options["variables_and_fields"]).lower(), # extrair métricas de variáveis e campos
         output_dir + os.sep
     ]
 
+    stats = {"mode": "persistent" if worker_pool else "process", "timed_out": False, "peak_rss_kb": None,
+             "cpu_time_s": None}
+    ck_start = time.time()
     try:
-        subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=300)
+        if worker_pool:
+            # No modo persistente o pico de RSS é o da JVM desde que ela subiu
+            _, stats["peak_rss_kb"] = worker_pool.run(repo_dir, output_dir, options, timeout)
+        else:
+            result = run_measured(cmd, timeout)
+            stats["peak_rss_kb"] = result["peak_rss_kb"]
+            stats["cpu_time_s"] = result["cpu_time_s"]
+            if result["timed_out"]:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            if result["returncode"] != 0:
+                raise subprocess.CalledProcessError(result["returncode"], cmd, stderr=result["stderr"])
         print(f"[✓] CK executado com sucesso para {repo_name}")
     except subprocess.CalledProcessError as e:
         print(f"[!] CK retornou erro para {repo_name}: {e.stderr}")
+    except CKWorkerError as e:
+        print(f"[!] CK retornou erro para {repo_name}: {e}")
     except subprocess.TimeoutExpired:
-        print(f"[!] Timeout ao executar CK para {repo_name} (>5min). Pulando...")
+        stats["timed_out"] = True
+        print(f"[!] Timeout ao executar CK para {repo_name} (>{timeout}s). Pulando...")
+    stats["wall_time_s"] = round(time.time() - ck_start, 2)
+
+    rss = f", pico RSS {stats['peak_rss_kb'] / 1024:.0f} MB" if stats["peak_rss_kb"] else ""
+    print(f"[⏱] CK ({stats['mode']}) em {repo_name}: {stats['wall_time_s']:.1f}s{rss}")
 
     # Mesmo com erro, tenta pegar arquivos gerados
     files = {
@@ -191,19 +400,26 @@ def run_ck(jar_path, repo_dir, repo_name, output_base='ck_output'):
     }
 
     # Filtra apenas arquivos existentes E não vazios
+    validation_start = time.time()
     existing_files = {}
     for k, v in files.items():
         if os.path.exists(v) and os.path.getsize(v) > 1:  # Arquivo existe e tem mais que 1 byte
             try:
-                # Testa se o arquivo pode ser lido pelo pandas
-                test_df = pd.read_csv(v, nrows=0)  # Lê apenas o header
+                # Testa se o arquivo pode ser lido pelo pandas (só o início dele)
+                preview = read_csv_preview(v)
                 existing_files[k] = v
+                if previews is not None:
+                    previews[k] = preview
                 print(f"[✓] Arquivo {k}.csv válido para {repo_name}")
             except Exception as csv_error:
                 print(f"[!] Arquivo {k}.csv corrompido para {repo_name}: {csv_error}")
         else:
             print(f"[!] Arquivo {k}.csv não existe ou está vazio para {repo_name}")
-    
+    stats["validation_wall_s"] = round(time.time() - validation_start, 2)
+    stats["csv_bytes"] = sum(os.path.getsize(v) for v in existing_files.values())
+    if run_stats is not None:
+        run_stats.update(stats)
+
     if not existing_files:
         print(f"[!] Nenhum CSV válido gerado para {repo_name}")
         return None
@@ -348,20 +564,25 @@ def run_ck(jar_path, repo_dir, repo_name, output_base='ck_output'):
         print(f"[!] Falha ao gravar {out_csv}: {e}")
         return None
 
-def load_and_print_class_metrics(class_csv_path):
+def load_and_print_class_metrics(class_csv_path, preview=None):
     """
     Carrega métricas por classe do CSV, seleciona colunas importantes e imprime as primeiras linhas.
+    Com preview (DataFrame de read_csv_preview), o CSV não é lido de novo.
     """
     print("\n[+] Lendo métricas por CLASSE ...")
     
     try:
-        df_class = pd.read_csv(class_csv_path, encoding="utf-8", encoding_errors="ignore")
+        if preview is not None:
+            df_class = preview
+        else:
+            df_class = pd.read_csv(class_csv_path, encoding="utf-8", encoding_errors="ignore")
         
         if df_class.empty:
             print("[!] Arquivo class.csv está vazio")
             return
             
-        print(f"[+] Encontradas {len(df_class)} classes")
+        if preview is None:
+            print(f"[+] Encontradas {len(df_class)} classes")
         
         # Colunas baseadas no class.csv
         class_columns = [
@@ -399,16 +620,20 @@ def load_and_print_class_metrics(class_csv_path):
     except Exception as e:
         print(f"[!] Erro ao ler class.csv: {e}")
 
-def load_and_print_method_metrics(method_csv_path):
+def load_and_print_method_metrics(method_csv_path, preview=None):
     """
     Carrega métricas por método do CSV, seleciona colunas importantes e imprime as primeiras linhas.
+    Com preview, o CSV não é lido de novo.
     """
     if not os.path.exists(method_csv_path):
         print("[!] method.csv não encontrado.")
         return
 
     print("\n[+] Lendo métricas por MÉTODO ...")
-    df_method = pd.read_csv(method_csv_path, encoding="utf-8", encoding_errors="ignore")
+    if preview is not None:
+        df_method = preview
+    else:
+        df_method = pd.read_csv(method_csv_path, encoding="utf-8", encoding_errors="ignore")
 
     # Colunas baseadas no method.csv
     method_columns = [
@@ -441,16 +666,20 @@ def load_and_print_method_metrics(method_csv_path):
     # print(df_method[available_method_cols].to_string(index=False))  # Sem índice numérico
     print(df_method[available_method_cols].head()) # Exibe as 5 primeiras linhas para visualização
 
-def load_and_print_field_metrics(field_csv_path):
+def load_and_print_field_metrics(field_csv_path, preview=None):
     """
     Carrega métricas por campo do CSV e imprime as primeiras linhas.
+    Com preview, o CSV não é lido de novo.
     """
     if not os.path.exists(field_csv_path):
         print("[!] field.csv não encontrado.")
         return
 
     print("\n[+] Lendo métricas por CAMPO ...")
-    df_field = pd.read_csv(field_csv_path, encoding="utf-8", encoding_errors="ignore")
+    if preview is not None:
+        df_field = preview
+    else:
+        df_field = pd.read_csv(field_csv_path, encoding="utf-8", encoding_errors="ignore")
 
     # Colunas conforme o field.csv
     field_columns = [
@@ -461,16 +690,20 @@ def load_and_print_field_metrics(field_csv_path):
     # print(df_field[available_field_cols].to_string(index=False))  # Sem índice numérico
     print(df_field[available_field_cols].head()) # Exibe as 5 primeiras linhas para visualização
 
-def load_and_print_variable_metrics(variable_csv_path):
+def load_and_print_variable_metrics(variable_csv_path, preview=None):
     """
     Carrega métricas por variável do CSV e imprime as primeiras linhas.
+    Com preview, o CSV não é lido de novo.
     """
     if not os.path.exists(variable_csv_path):
         print("[!] variable.csv não encontrado.")
         return
 
     print("\n[+] Lendo métricas por VARIÁVEL ...")
-    df_variable = pd.read_csv(variable_csv_path, encoding="utf-8", encoding_errors="ignore")
+    if preview is not None:
+        df_variable = preview
+    else:
+        df_variable = pd.read_csv(variable_csv_path, encoding="utf-8", encoding_errors="ignore")
 
     # Colunas conforme o variable.csv
     variable_columns = [
@@ -482,86 +715,615 @@ def load_and_print_variable_metrics(variable_csv_path):
     print(df_variable[available_variable_cols].head()) # Exibe as 5 primeiras linhas para visualização 
 
 
-def main():
-    print("== CK Metrics Extractor ==")
-    readCsv_repo_url = pd.read_csv("top_java_repos.csv")
+CK_JAR_PATH = os.path.join("ck", "target", "ck-0.7.1-SNAPSHOT-jar-with-dependencies.jar")
+SCRATCH_BASE = "work"
+CACHE_DIR = os.path.join("cache", "snapshots")
+OUTPUT_BASE = {"ck": "ck_output", "fastpath": "ck_fast_output"}  # saída por motor de análise
+MIN_DISK_RESERVE = 50 * 1024 * 1024  # reserva mínima por repositório (50 MB)
+DISK_RESERVE_FACTOR = 4              # ZIP + extração ocupam ~4x o tamanho do código (size_bytes)
 
-    total_repos = len(readCsv_repo_url)
-    start_time = time.time()
-    repo_times = []
-    success_count = 0
-
-    for idx, row in readCsv_repo_url.iterrows():
-        repo_start = time.time()
-        repo_url = row['url']
-        repo_name = row['name']
-
-        processed = idx + 1
-        if repo_times:
-            avg_time = sum(repo_times) / len(repo_times)
-            remaining = (total_repos - processed) * avg_time
-            eta = str(timedelta(seconds=int(remaining)))
-        else:
-            eta = "calculando..."
 
-        print(f"\n[📦 {processed}/{total_repos}] Usando repositório: {repo_name} ({repo_url})")
-        print(f"   ⏳ Estimativa de tempo restante: {eta}")
+def _csv_text(row, column):
+    # Texto de uma coluna opcional do CSV; None se ausente ou vazio
+    value = row.get(column, None)
+    if value is None or pd.isna(value):
+        return None
+    return str(value).strip() or None
+
+
+class SweepProgress:
+    """
+    Contadores de progresso da varredura, compartilhados entre os workers.
+    O ETA vem do modelo de custo (utils/cost_model.py), ajustado pelo tempo
+    de execução (sem filas) dos repositórios já concluídos: soma dos tempos
+    previstos para os que faltam (e do que resta dos em andamento), dividida
+    entre os `workers`.
+    """
+    def __init__(self, total_repos, workers=1, model=None):
+        self.total_repos = total_repos
+        self.workers = max(1, workers)
+        self.model = model or CostModel()
+        self.started = 0
+        self.finished = 0
+        self.success_count = 0
+        self.repo_times = []
+        self.predictions = []  # (previsto, real) das previsões feitas com o modelo ajustado
+        # Repositórios que ainda não começaram (ver plan) e os em andamento (id do job → início)
+        self.pending = {}
+        self.running = {}
+        self._lock = threading.Lock()
+
+    def plan(self, jobs, largest_first_order=False):
+        """
+        Registra os jobs da varredura para o ETA; com largest_first_order,
+        devolve-os do maior para o menor custo previsto.
+        """
+        jobs = list(jobs)
+        if largest_first_order:
+            jobs = largest_first(jobs, self.model)
+        with self._lock:
+            self.pending = {id(job): job for job in jobs}
+        return jobs
+
+    def start(self, job):
+        """
+        Marca o início do job e guarda em job["predicted_s"] o tempo previsto.
+        Retorna (número do repositório, ETA formatado).
+        """
+        with self._lock:
+            self.started += 1
+            self.pending.pop(id(job), None)
+            job["predicted_s"] = self.model.predict(job["size_bytes"], job["commits_count"])
+            job["prediction_calibrated"] = self.model.calibrated
+            self.running[id(job)] = (job, time.time())
+            return self.started, self._eta()
+
+    def finish(self, job, duration=None, success=False, cost=None):
+        """
+        duration: tempo total do repositório; cost: tempo de execução, sem as
+        filas (o que o modelo prevê).
+        """
+        with self._lock:
+            self.finished += 1
+            self.running.pop(id(job), None)
+            if success:
+                self.success_count += 1
+            if duration is not None:
+                self.repo_times.append(duration)
+            # Só repositórios analisados entram no ajuste (pulados/falhos não dizem o custo)
+            if cost is not None and success:
+                if job.get("prediction_calibrated"):
+                    self.predictions.append((job["predicted_s"], cost))
+                self.model.observe(job["size_bytes"], job["commits_count"], cost)
+
+    def _eta(self):
+        if not self.model.calibrated:
+            return "calculando..."
+        now = time.time()
+        pending = [self.model.predict(job["size_bytes"], job["commits_count"]) for job in self.pending.values()]
+        running = [max(0.0, self.model.predict(job["size_bytes"], job["commits_count"]) - (now - start))
+                   for job, start in self.running.values()]
+        return str(timedelta(seconds=int(schedule_eta(pending, running, self.workers))))
+
+    def print_accuracy(self):
+        summary = accuracy_summary(self.predictions)
+        if summary:
+            print(f"Previsão de tempo por repositório ({summary['repos']} repositórios com o modelo ajustado): "
+                  f"erro mediano {summary['median_abs_pct_error']:.0f}%, real/previsto mediano "
+                  f"{summary['median_ratio']:.2f}")
+
+
+class CKSweep:
+    """
+    Varredura em estágios (fetch → extract → CK → comentários → resumo).
+    Cada estágio é um método que recebe e devolve o dicionário `job` do
+    repositório; devolver None encerra o repositório naquele estágio.
+    """
+    def __init__(self, ck_jar_path, progress, disk_budget, scratch_dir=SCRATCH_BASE, extract_mode="stream",
+                 cache=None, analysis_config=None, incremental=False, worker_pool=None,
+                 adaptive_budget=True, comment_executor=None, comment_scan="mmap", summary_mode="preview",
+                 engine="ck", sampling=None, timings=None, known_heads=True):
+        self.ck_jar_path = ck_jar_path
+        self.progress = progress
+        self.disk_budget = disk_budget
+        self.scratch_dir = scratch_dir
+        self.extract_mode = extract_mode
+        self.cache = cache
+        self.analysis_config = analysis_config
+        self.incremental = incremental
+        self.worker_pool = worker_pool
+        self.adaptive_budget = adaptive_budget
+        self.comment_executor = comment_executor
+        self.comment_scan = comment_scan
+        self.summary_mode = summary_mode
+        self.engine = engine
+        self.output_base = OUTPUT_BASE[engine]
+        # {"above_bytes", "fraction", "seed"}: repositórios maiores que above_bytes
+        # (size_bytes) são analisados por amostra de arquivos; None = sempre inteiros
+        self.sampling = sampling
+        self.timings = timings  # SweepTimings: tempos por etapa de cada repositório
+        # Usa default_branch/head_sha de top_java_repos.csv em vez de consultar a rede
+        self.known_heads = known_heads
+
+    def new_job(self, row):
+        owner = row.get('owner', '')
+        folder = f"{owner}_{row['name']}" if owner else row['name']
+        size_bytes = row.get('size_bytes', 0)
+        size_bytes = int(size_bytes) if pd.notna(size_bytes) else 0
+        commits_count = row.get('commits_count', None)
+        commits_count = int(commits_count) if pd.notna(commits_count) else None
+        # Branch e HEAD coletados pelo main.py (CSVs antigos não têm as colunas)
+        sha = _csv_text(row, 'head_sha') if self.known_heads else None
+        branch = _csv_text(row, 'default_branch') or "main"
+        return {
+            "url": row['url'],
+            "name": row['name'],
+            "owner": owner,
+            "repo_id": f"{owner}/{row['name']}" if owner else row['name'],
+            "head_sha": None,
+            "known_head": (branch, sha) if sha else None,
+            "size_bytes": size_bytes,
+            "commits_count": commits_count,
+            "output_dir": os.path.join(self.output_base, folder.replace("/", "_")),
+            "repo_path": os.path.join(self.scratch_dir, folder),
+            "sample_path": None,      # árvore só com os arquivos sorteados (modo amostragem)
+            "sample": None,           # registro da amostra para o manifesto
+            "zip_path": None,
+            "cache_key": None,        # entrada do cache em uso (presa) por este job
+            "cache_store": False,     # guardar a árvore no cache após a extração
+            "disk_reserve": max(MIN_DISK_RESERVE, size_bytes * DISK_RESERVE_FACTOR),  # espaço a reservar
+            "reserved": 0,            # espaço de fato reservado no DiskBudget (liberado no cleanup)
+            "csv_paths": None,
+            "csv_previews": {},       # prévias lidas na validação dos CSVs (run_ck)
+            "ck_budget": None,
+            "ck_stats": {},
+            "comments_error": None,   # falha ao gerar comments_by_class.csv (manifesto incompleto)
+            "spans": [],              # etapas medidas (utils/timings.py)
+            "predicted_s": None,      # tempo previsto pelo modelo de custo ao começar
+            "prediction_calibrated": False,
+            "start": None,
+        }
+
+    def fetch(self, job):
+        processed, eta = self.progress.start(job)
+        job["start"] = time.time()
+        print(f"\n[📦 {processed}/{self.progress.total_repos}] Usando repositório: {job['name']} ({job['url']})")
+        print(f"   ⏳ Estimativa de tempo restante: {eta} "
+              f"(este repositório: ~{timedelta(seconds=int(job['predicted_s']))}"
+              f"{'' if job['prediction_calibrated'] else ', a priori'})")
+
+        # verificação antes de processar (o modo incremental precisa do SHA do HEAD)
+        head = self.resolve_head(job) if self.incremental else None
+        if self.already_processed(job):
+            self.progress.finish(job)
+            self.finish_timings(job, "skipped")
+            return None
+        if head is None:
+            head = self.resolve_head(job)
+
+        if self.cache is not None and job["head_sha"]:
+            # Um snapshot completo serve a qualquer modo; um só com STREAM_SUFFIXES, só ao modo stream
+            variants = [STREAM_SNAPSHOT, FULL_SNAPSHOT] if self.extract_mode == "stream" else [FULL_SNAPSHOT]
+            key, cached_path = self.cache.lookup_any(
+                [SnapshotCache.make_key(job["owner"], job["name"], job["head_sha"], v) for v in variants])
+            if cached_path:
+                print(f"[♻️] Snapshot {key} encontrado no cache, sem download.")
+                job["repo_path"] = cached_path
+                job["cache_key"] = key
+                return job
+            job["cache_store"] = True
+
+        # Backpressure: espera haver espaço de scratch antes de baixar
+        job["reserved"] = self.disk_budget.acquire(job["disk_reserve"])
+
+        repo_path = job["repo_path"]
+        _remove_path(repo_path)
+        os.makedirs(self.scratch_dir, exist_ok=True)
+
+        print(f"[+] Baixando repositório de {job['url']} como ZIP...")
+        zip_url = get_zip_url(job['url'], head if head[0] else None)
+        with span(job, "download") as io_stats:
+            if zip_url and self.extract_mode == "stream":
+                io_stats["method"] = "stream"
+                try:
+                    if download_and_stream_extract(zip_url, repo_path, io_stats=io_stats):
+                        return job
+                except StreamZipError as e:
+                    print(f"[!] ZIP não pode ser extraído em fluxo ({e}), baixando o arquivo completo...")
+                    io_stats["method"] = "zip"
+                    if download_zip(zip_url, f"{repo_path}.zip", io_stats=io_stats):
+                        job["zip_path"] = f"{repo_path}.zip"
+                        return job
+            elif zip_url and download_zip(zip_url, f"{repo_path}.zip", io_stats=io_stats):
+                io_stats["method"] = "zip"
+                job["zip_path"] = f"{repo_path}.zip"
+                return job
+
+            if zip_url:
+                print("[!] Download ZIP falhou, tentando git clone...")
+            io_stats["method"] = "git"
+            if job["head_sha"] and clone_at_commit(job['url'], repo_path, job["head_sha"]):
+                return job
+            # O clone pode não corresponder exatamente ao SHA resolvido: não vai para o cache
+            job["cache_store"] = False
+            clone_with_git(job['url'], repo_path)
+            # e o manifesto registra o commit que foi de fato clonado
+            job["head_sha"] = cloned_head(repo_path)
+            return job
+
+    def resolve_head(self, job):
+        """
+        (branch, sha) do repositório: os coletados pelo main.py em
+        top_java_repos.csv quando há SHA; senão, descobertos pela rede.
+        """
+        known = job["known_head"]
+        if known and known[1]:
+            add_span(job, "default_branch", 0.0, 0.0, source="csv")
+            head = known
+        else:
+            with span(job, "default_branch", source="remote"):
+                head = resolve_remote_head(job['url'])
+        job["head_sha"] = head[1]
+        return head
+
+    def already_processed(self, job):
+        """
+        Modo normal: pula se já existe algum CSV do CK na saída.
+        Modo incremental: pula só se o manifesto indica o mesmo commit e a
+        mesma configuração de análise.
+        """
+        output_dir = job["output_dir"]
+        if self.incremental:
+            manifest = read_manifest(output_dir)
+            if manifest_is_current(manifest, job["head_sha"], self.analysis_config, self.job_sampling(job)):
+                print(f"[⏭️] Repositório {job['repo_id']} sem mudanças desde {job['head_sha'][:10]}. Pulando...")
+                return True
+            if manifest and manifest.get("complete") is False:
+                print(f"[~] Saída de {job['repo_id']} incompleta ({', '.join(manifest.get('errors') or {})}). "
+                      f"Reprocessando...")
+            elif manifest:
+                print(f"[~] Repositório {job['repo_id']} mudou (HEAD, configuração do CK ou amostragem). "
+                      f"Reprocessando...")
+            return False
 
-        # verificação antes de processar
-        output_dir = os.path.join("ck_output", repo_name.replace("/", "_"))
         if os.path.exists(output_dir) and any(
-            os.path.exists(os.path.join(output_dir, f"{f}.csv")) 
+            os.path.exists(os.path.join(output_dir, f"{f}.csv"))
             for f in ["class", "method", "field", "variable"]
         ):
-            print(f"[⏭️] Repositório {repo_name} já processado. Pulando...")
-            continue
-
-        ck_jar_path = os.path.join("ck", "target", "ck-0.7.1-SNAPSHOT-jar-with-dependencies.jar")
-        if not os.path.exists(ck_jar_path):
-            print(f"Erro: {ck_jar_path} não encontrado.")
-            sys.exit(1)
-
-        repo_path = clone_repo(repo_url)
+            print(f"[⏭️] Repositório {job['repo_id']} já processado. Pulando...")
+            return True
+        return False
 
+    def extract(self, job):
+        if job["zip_path"]:
+            with span(job, "extract") as io_stats:
+                if not extract_zip(job["zip_path"], job["repo_path"], io_stats=io_stats):
+                    print("[!] Extração do ZIP falhou, tentando git clone...")
+                    io_stats["method"] = "git"
+                    _remove_path(job["repo_path"])
+                    if not (job["head_sha"] and clone_at_commit(job['url'], job["repo_path"], job["head_sha"])):
+                        job["cache_store"] = False
+                        clone_with_git(job['url'], job["repo_path"])
+                        job["head_sha"] = cloned_head(job["repo_path"])
+            job["zip_path"] = None
+
+        if job["cache_store"]:
+            # Só a extração em fluxo filtra arquivos; ZIP completo e git clone trazem a árvore inteira.
+            # O que um acerto futuro evita é o download, então é esse o tamanho registrado
+            downloads = [s for s in job["spans"] if s["stage"] == "download"]
+            variant = STREAM_SNAPSHOT if downloads and downloads[-1].get("method") == "stream" else FULL_SNAPSHOT
+            key = SnapshotCache.make_key(job["owner"], job["name"], job["head_sha"], variant)
+            job["repo_path"] = self.cache.store(
+                key, job["repo_path"], download_bytes=sum(s.get("bytes_downloaded") or 0 for s in downloads))
+            job["cache_key"] = key
+            job["cache_store"] = False
+        return job
+
+    def source_path(self, job):
+        # Diretório efetivamente analisado: a amostra, quando houver
+        return job["sample_path"] or job["repo_path"]
+
+    def job_sampling(self, job):
+        # Parâmetros de amostragem que valem para o repositório (None = analisado inteiro)
+        sampling = self.sampling
+        if not sampling or job["size_bytes"] <= sampling["above_bytes"]:
+            return None
+        return sampling
+
+    def sample(self, job):
+        sampling = self.job_sampling(job)
+        if sampling is None:
+            return
+        sample_path = os.path.join(self.scratch_dir, os.path.basename(job["output_dir"]) + ".sample")
+        job["sample"] = build_sample_tree(job["repo_path"], sample_path, sampling["fraction"],
+                                          seed=sampling["seed"], key=job["repo_id"])
+        job["sample_path"] = sample_path
+        print(f"[+] Amostra de {job['repo_id']}: {job['sample']['files_sampled']}/"
+              f"{job['sample']['files_total']} arquivos .java ({job['sample']['fraction']:.1%})")
+
+    def ck(self, job):
+        with span(job, "prepare"):
+            # Amostra (se houver) e orçamento do CK: contam os arquivos .java
+            self.sample(job)
+            if self.adaptive_budget and self.engine == "ck":
+                job["ck_budget"] = plan_ck_budget(
+                    java_files=count_java_files(self.source_path(job)),
+                    size_bytes=job["size_bytes"],
+                    commits_count=job["commits_count"],
+                )
+        if self.engine == "fastpath":
+            return self.fastpath(job)
+        stats = job["ck_stats"]
+        csv_paths = run_ck(self.ck_jar_path, self.source_path(job), job['repo_id'], worker_pool=self.worker_pool,
+                           budget=job["ck_budget"], run_stats=stats, previews=job["csv_previews"])
+        # run_ck mede o CK (CPU e pico de RSS do filho) e a validação dos CSVs separadamente
+        add_span(job, "ck", stats.get("wall_time_s"), stats.get("cpu_time_s"), mode=stats.get("mode"),
+                 peak_rss_kb=stats.get("peak_rss_kb"), timed_out=stats.get("timed_out"),
+                 bytes_written=stats.get("csv_bytes"))
+        add_span(job, "csv_validation", stats.get("validation_wall_s"))
+        if not csv_paths:
+            print(f"[!] Nenhum arquivo CSV válido gerado para {job['name']}. Pulando.")
+            self.fail(job)
+            return None
+        job["csv_paths"] = csv_paths
+        return job
+
+    def fastpath(self, job):
+        # Análise sem o CK (utils/fastpath.py): class.csv e comments_by_class.csv direto do código-fonte
+        start = time.time()
+        with span(job, "fastpath") as io_stats:
+            csv_paths = analyze_repo(self.source_path(job), job["output_dir"])
+            if csv_paths:
+                io_stats["bytes_written"] = sum(os.path.getsize(path) for path in csv_paths.values())
+        job["ck_stats"] = {"mode": "fastpath", "wall_time_s": round(time.time() - start, 2)}
+        if not csv_paths:
+            print(f"[!] Nenhum tipo Java encontrado em {job['name']}. Pulando.")
+            self.fail(job)
+            return None
+        job["csv_paths"] = {'class': csv_paths['class']}
+        job["csv_previews"]['class'] = read_csv_preview(csv_paths['class'])
+        return job
+
+    def comments(self, job):
+        # Gera CSV separado com contagem de comentários por classe (não modifica arquivos do CK)
+        csv_paths = job["csv_paths"]
         try:
-            csv_paths = run_ck(ck_jar_path, repo_path, repo_name)
+            # No fastpath os comentários já foram contados na mesma leitura dos arquivos
+            if 'class' in csv_paths and self.engine == "ck":
+                with span(job, "comments") as io_stats:
+                    out_csv = generate_comments_by_class(self.source_path(job), csv_paths['class'], job["output_dir"],
+                                                         executor=self.comment_executor, scan_mode=self.comment_scan)
+                    if out_csv:
+                        io_stats["bytes_written"] = os.path.getsize(out_csv)
+                    else:
+                        job["comments_error"] = "comments_by_class.csv não foi gerado"
         except Exception as e:
-            print(f"[!] Falha ao rodar CK no repositório {repo_name}. Pulando. Erro: {e}")
-            continue
+            print(f"[!] Falha ao gerar CSV de comentários para {job['name']}: {e}")
+            job["comments_error"] = str(e) or type(e).__name__
+        # O código-fonte não é mais necessário: libera o scratch para o prefetch
+        self.cleanup(job)
+        return job
+
+    def summarize(self, job):
+        # Imprime métricas já existentes: "preview" reaproveita as linhas lidas na
+        # validação, "full" relê os CSVs inteiros e "quiet" não imprime nada
+        csv_paths = job["csv_paths"]
+        with span(job, "summary"):
+            if self.summary_mode != "quiet":
+                previews = job["csv_previews"] if self.summary_mode == "preview" else {}
+                printers = [
+                    ('class', load_and_print_class_metrics),
+                    ('method', load_and_print_method_metrics),
+                    ('field', load_and_print_field_metrics),
+                    ('variable', load_and_print_variable_metrics),
+                ]
+                for kind, printer in printers:
+                    if kind in csv_paths:
+                        printer(csv_paths[kind], preview=previews.get(kind))
+            job["csv_previews"] = {}
+
+            # Sem o CSV de comentários a saída fica marcada como incompleta: o modo
+            # incremental reprocessa o repositório na próxima execução
+            errors = {"comments": job["comments_error"]} if job["comments_error"] else {}
+            write_manifest(job["output_dir"], job["owner"], job["name"], job["url"], job["head_sha"],
+                           self.analysis_config, csv_files=sorted(csv_paths),
+                           ck_budget=job["ck_budget"], ck_run=job["ck_stats"], sampling=job["sample"],
+                           complete=not errors, errors=errors)
+
+        repo_duration = time.time() - job["start"]
+        cost = busy_time(job)
+        self.progress.finish(job, repo_duration, success=True, cost=cost)
+        self.finish_timings(job, "ok")
+        print(f"   ✅ {job['name']} finalizado em: {str(timedelta(seconds=int(repo_duration)))} "
+              f"(em execução {cost:.1f}s, previsto {job['predicted_s']:.1f}s"
+              f"{'' if job['prediction_calibrated'] else ' a priori'}).")
+        return job
+
+    def cleanup(self, job):
+        _remove_path(job["zip_path"])
+        _remove_path(job["sample_path"])
+        if job["cache_key"]:
+            # Snapshot pertence ao cache: só libera para a remoção LRU
+            self.cache.release(job["cache_key"])
+            job["cache_key"] = None
+        else:
+            _remove_path(job["repo_path"])
+        self.disk_budget.release(job["reserved"])
+        job["reserved"] = 0
+
+    def finish_timings(self, job, status, error=None):
+        if self.timings is not None:
+            self.timings.finish(job, status, error)
+
+    def fail(self, job, error=None):
+        self.cleanup(job)
+        self.progress.finish(job)
+        self.finish_timings(job, "failed", error)
+
+    def on_error(self, stage_name, job, exc):
+        print(f"[!] Falha no estágio '{stage_name}' do repositório {job['name']}. Pulando. Erro: {exc}")
+        self.fail(job, f"{stage_name}: {exc}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extrai métricas CK dos repositórios de top_java_repos.csv")
+    parser.add_argument("--engine", choices=["ck", "fastpath"], default="ck",
+                        help="ck: métricas exatas com o CK (saída em ck_output); fastpath: análise só do "
+                             "código-fonte, sem JVM, para triagem do corpus (saída em ck_fast_output)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="execuções simultâneas do CK e da contagem de comentários (CPU, padrão: 1)")
+    parser.add_argument("--order", choices=["auto", "input", "largest"], default="auto",
+                        help="ordem da fila: input = a de top_java_repos.csv; largest = maior custo previsto "
+                             "primeiro; auto = largest com --workers > 1, senão input")
+    parser.add_argument("--fetch-workers", type=int, default=2,
+                        help="downloads/extrações simultâneos (rede e disco, padrão: 2)")
+    parser.add_argument("--prefetch", type=int, default=None,
+                        help="repositórios baixados aguardando o CK (padrão: 2x --workers)")
+    parser.add_argument("--scratch-dir", default=SCRATCH_BASE,
+                        help="pasta onde os repositórios são baixados e extraídos")
+    parser.add_argument("--extract-mode", choices=["stream", "full"], default="stream",
+                        help="stream: extrai só .java/.jar durante o download; full: baixa o ZIP inteiro e extrai tudo")
+    parser.add_argument("--ck-mode", choices=["process", "persistent"], default="process",
+                        help="process: um `java -jar` por repositório; persistent: JVMs do CK reaproveitadas (ck_driver/)")
+    parser.add_argument("--fixed-budget", action="store_true",
+                        help=f"usa timeout fixo de {CK_TIMEOUT}s e heap padrão em vez do orçamento por tamanho do repositório")
+    parser.add_argument("--sample-above-mb", type=float, default=None,
+                        help="repositórios com mais código que isso (size_bytes, MB) são analisados por amostra "
+                             "de arquivos .java sorteada por pacote (padrão: sempre inteiros)")
+    parser.add_argument("--sample-fraction", type=float, default=0.25,
+                        help="fração de arquivos .java sorteada nos repositórios amostrados")
+    parser.add_argument("--sample-seed", type=int, default=42,
+                        help="semente do sorteio (mesma semente e mesmo commit = mesma amostra)")
+    parser.add_argument("--remote-head", action="store_true",
+                        help="ignora default_branch/head_sha de top_java_repos.csv e descobre o HEAD atual "
+                             "pela rede (git ls-remote / API)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reprocessa apenas repositórios cujo HEAD ou configuração do CK mudou (via run_manifest.json)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR,
+                        help="pasta do cache de snapshots (owner/name@sha#variante) reaproveitados entre execuções")
+    parser.add_argument("--cache-size-gb", type=float, default=20.0,
+                        help="tamanho máximo do cache de snapshots; os menos usados são removidos (GB)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="desativa o cache de snapshots")
+    parser.add_argument("--comment-workers", type=int, default=1,
+                        help="processos que contam comentários dos arquivos .java de cada repositório (padrão: 1, sem pool)")
+    parser.add_argument("--comment-scan", choices=["mmap", "text"], default="mmap",
+                        help="mmap: varre os bytes do arquivo mapeado em memória; text: lê e decodifica o arquivo inteiro")
+    parser.add_argument("--summary", choices=["preview", "full", "quiet"], default="preview",
+                        help=f"preview: mostra as {PREVIEW_ROWS} linhas lidas na validação dos CSVs; "
+                             "full: relê cada CSV inteiro (conta as classes); quiet: não imprime as métricas")
+    parser.add_argument("--timings-file", default=TIMINGS_PATH,
+                        help="JSON lines com os tempos por etapa de cada repositório; o relatório "
+                             "final vai para <arquivo>_report.json")
+    parser.add_argument("--scratch-budget-gb", type=float, default=20.0,
+                        help="espaço máximo reservado para repositórios em andamento (GB)")
+    parser.add_argument("--min-free-gb", type=float, default=2.0,
+                        help="espaço livre mínimo a manter no disco de scratch (GB)")
+    args = parser.parse_args()
+    if not 0 < args.sample_fraction <= 1:
+        parser.error("--sample-fraction deve estar em (0, 1]")
+    return args
 
-        if not csv_paths:
-            print(f"[!] Nenhum arquivo CSV válido gerado para {repo_name}. Pulando.")
-            continue
 
-        # Imprime métricas já existentes
-        if 'class' in csv_paths:
-            load_and_print_class_metrics(csv_paths['class'])
-        if 'method' in csv_paths:
-            load_and_print_method_metrics(csv_paths['method'])
-        if 'field' in csv_paths:
-            load_and_print_field_metrics(csv_paths['field'])
-        if 'variable' in csv_paths:
-            load_and_print_variable_metrics(csv_paths['variable'])
+def main():
+    args = parse_args()
+    print("== CK Metrics Extractor ==")
+    readCsv_repo_url = pd.read_csv("top_java_repos.csv")
 
-        # Gera CSV separado com contagem de comentários por classe (não modifica arquivos do CK)
-        try:
-            if 'class' in csv_paths:
-                output_dir = os.path.join("ck_output", repo_name.replace("/", "_"))
-                generate_comments_by_class(repo_path, csv_paths['class'], output_dir)
-        except Exception as e:
-            print(f"[!] Falha ao gerar CSV de comentários para {repo_name}: {e}")
+    if args.engine == "ck" and not os.path.exists(CK_JAR_PATH):
+        print(f"Erro: {CK_JAR_PATH} não encontrado.")
+        sys.exit(1)
 
-        success_count += 1
-        repo_duration = time.time() - repo_start
-        repo_times.append(repo_duration)
+    total_repos = len(readCsv_repo_url)
+    workers = max(1, args.workers)
+    fetch_workers = max(1, args.fetch_workers)
+    prefetch = args.prefetch if args.prefetch is not None else 2 * workers
+    start_time = time.time()
 
-        print(f"   ✅ Finalizado em: {str(timedelta(seconds=int(repo_duration)))}.")
+    # Uma conexão keep-alive por thread que faz requisições (fetch + ls-remote/API)
+    configure_http(pool_size=fetch_workers + workers)
+
+    os.makedirs(args.scratch_dir, exist_ok=True)
+    progress = SweepProgress(total_repos, workers)
+    disk_budget = DiskBudget(
+        max_bytes=int(args.scratch_budget_gb * 1024 ** 3),
+        path=args.scratch_dir,
+        min_free_bytes=int(args.min_free_gb * 1024 ** 3),
+    )
+    cache = None
+    if not args.no_cache:
+        cache = SnapshotCache(args.cache_dir, int(args.cache_size_gb * 1024 ** 3))
+    worker_pool = None
+    if args.ck_mode == "persistent" and args.engine == "ck":
+        # A JVM é compartilhada entre repositórios: usa o maior heap do orçamento
+        jvm_args = [] if args.fixed_budget else [f"-Xmx{MAX_HEAP_MB}m"]
+        worker_pool = CKWorkerPool(CK_JAR_PATH, workers, jvm_args)
+    comment_executor = None
+    if args.comment_workers > 1:
+        # Um pool só para a varredura inteira, compartilhado pelas threads do estágio de comentários.
+        # Os processos nascem sob demanda, com as threads do pipeline já rodando: um fork
+        # copiaria locks presos (pool HTTP, filas, print) e poderia travar o filho, então
+        # usa forkserver (spawn onde ele não existe)
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        comment_executor = ProcessPoolExecutor(max_workers=args.comment_workers,
+                                               mp_context=multiprocessing.get_context(start_method))
+
+    if args.engine == "fastpath":
+        analysis_config = fastpath_info()
+    else:
+        analysis_config = {
+            **ck_jar_info(CK_JAR_PATH),
+            "options": CK_OPTIONS,
+            "budget": "fixed" if args.fixed_budget else "adaptive",
+        }
+    sampling = None
+    if args.sample_above_mb is not None:
+        sampling = {
+            "method": SAMPLE_METHOD,
+            "above_bytes": int(args.sample_above_mb * 1024 ** 2),
+            "fraction": args.sample_fraction,
+            "seed": args.sample_seed,
+        }
+    timings = SweepTimings(args.timings_file)
+    sweep = CKSweep(CK_JAR_PATH, progress, disk_budget, args.scratch_dir, args.extract_mode, cache,
+                    analysis_config, args.incremental, worker_pool, not args.fixed_budget,
+                    comment_executor, args.comment_scan, args.summary, args.engine, sampling, timings,
+                    not args.remote_head)
+
+    # fetch/extract são limitados por rede e disco; CK e comentários, por CPU
+    stages = [
+        Stage("fetch", sweep.fetch, workers=fetch_workers),
+        Stage("extract", sweep.extract, workers=fetch_workers, maxsize=fetch_workers),
+        Stage("ck", sweep.ck, workers=workers, maxsize=max(1, prefetch)),
+        Stage("comments", sweep.comments, workers=workers, maxsize=workers),
+        Stage("summarize", sweep.summarize, workers=1, maxsize=workers),
+    ]
+    # Em modo paralelo, os maiores repositórios primeiro (menor tempo total da varredura)
+    largest = args.order == "largest" or (args.order == "auto" and workers > 1)
+    jobs = progress.plan((sweep.new_job(row) for _, row in readCsv_repo_url.iterrows()), largest)
+    if largest:
+        print("[+] Fila ordenada do maior para o menor repositório (custo previsto por size_bytes/commits_count)")
+    try:
+        run_pipeline(jobs, stages, on_error=sweep.on_error)
+    finally:
+        if worker_pool:
+            worker_pool.close()
+        if comment_executor:
+            comment_executor.shutdown()
+        timing_report = timings.close()
 
     total_duration = time.time() - start_time
+    success_count = progress.success_count
     print("\n=== Processo concluído ===")
     print(f"Tempo total de execução: {str(timedelta(seconds=int(total_duration)))}")
     print(f"Repositórios com CK processados: {success_count}/{total_repos}")
     print(f"Repositórios com CK falhados: {total_repos - success_count}/{total_repos}")
+    progress.print_accuracy()
+    if cache is not None:
+        cache.print_stats()
+    print_http_stats()
+    print_report(timing_report)
+    print(f"[+] Tempos por repositório em {args.timings_file}")
 
 if __name__ == "__main__":
     main()
@@ -577,4 +1339,5 @@ if __name__ == "__main__":
 
 # Execute o script:
 # python ck_metrics.py
+# python ck_metrics.py --workers 8 --fetch-workers 4   # 8 execuções do CK, 4 downloads em paralelo
 # Repo de exemplo: https://github.com/spring-projects/spring-petclinic
\ No newline at end of file
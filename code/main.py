@@ -1,145 +1,414 @@
+import os
 import time
 import csv
-import requests
+import json
+import re
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from tqdm import tqdm
 from utils.utils import get_github_token
+from utils.http_client import configure_http, get_session, print_http_stats
 
-GRAPHQL_URL = "https://api.github.com/graphql"
+GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
 MAX_REPOS = 1000
 BATCH_SIZE = 25
 MAX_RETRIES = 5
+DETAIL_WORKERS = 4
+SHARD_WORKERS = 2
+SEARCH_BASE = "language:Java sort:stars-desc"
+SEARCH_RESULT_CAP = 1000  # a busca do GitHub não devolve mais que 1000 resultados por consulta
+CHECKPOINT_PATH = "results/top_java_repos.checkpoint.jsonl"
+# Grava as respostas da API para testes com o servidor local (utils/graphql_stub.py)
+RECORD_PATH = os.getenv("GITHUB_GRAPHQL_RECORD")
+_record_lock = threading.Lock()
 
-def make_graphql_request(query, variables, headers, max_retries=MAX_RETRIES):
+# Campos baratos: vêm junto com a paginação da busca
+SEARCH_QUERY = """
+query($search: String!, $after: String, $batch_size: Int!) {
+  rateLimit { cost remaining resetAt }
+  search(query: $search, type: REPOSITORY, first: $batch_size, after: $after) {
+    pageInfo {
+      endCursor
+      hasNextPage
+    }
+    edges {
+      node {
+        ... on Repository {
+          id
+          name
+          owner { login }
+          url
+          stargazerCount
+          forkCount
+          createdAt
+          pushedAt
+          updatedAt
+          primaryLanguage { name }
+          languages(first: 10) {
+            edges {
+              size
+              node {
+                name
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Campos caros (contagens de conexões): buscados em paralelo, em lote por node ID
+DETAILS_QUERY = """
+query($ids: [ID!]!) {
+  rateLimit { cost remaining resetAt }
+  nodes(ids: $ids) {
+    ... on Repository {
+      id
+      releases {
+        totalCount
+      }
+      defaultBranchRef {
+        name
+        target {
+          oid
+          ... on Commit {
+            history {
+              totalCount
+            }
+          }
+        }
+      }
+      pullRequests(states: MERGED) {
+        totalCount
+      }
+      issues {
+        totalCount
+      }
+      closed: issues(states: CLOSED) {
+        totalCount
+      }
+    }
+  }
+}
+"""
+
+
+class RateLimiter:
+    """
+    Acompanha o rateLimit { cost remaining resetAt } devolvido pelo GitHub e
+    segura novas requisições quando o saldo (descontando as que estão em voo)
+    não cobre o custo estimado, esperando até resetAt.
+    """
+    def __init__(self, safety_margin=50):
+        self.safety_margin = safety_margin
+        self.remaining = None
+        self.reset_at = None
+        self.in_flight = 0
+        self.last_cost = {}
+        self._cond = threading.Condition()
+
+    def acquire(self, kind, default_cost=1):
+        cost = self.last_cost.get(kind, default_cost)
+        with self._cond:
+            while (self.remaining is not None
+                   and self.remaining - self.in_flight - cost < self.safety_margin):
+                wait = (self.reset_at - datetime.now(timezone.utc)).total_seconds() + 1
+                if wait <= 0:
+                    # Janela renovada: o saldo volta a ser conhecido na próxima resposta
+                    self.remaining = None
+                    break
+                if self.in_flight:
+                    # Respostas em voo podem atualizar o saldo antes do reset
+                    self._cond.wait(timeout=min(wait, 5))
+                else:
+                    print(f"[rate limit] Saldo {self.remaining}, aguardando {wait:.0f}s até o reset...")
+                    self._cond.wait(timeout=wait)
+            self.in_flight += cost
+        return cost
+
+    def release(self, kind, reserved, rate_limit=None):
+        with self._cond:
+            self.in_flight -= reserved
+            if rate_limit:
+                self.last_cost[kind] = rate_limit["cost"]
+                self.remaining = rate_limit["remaining"]
+                self.reset_at = datetime.fromisoformat(rate_limit["resetAt"].replace('Z', '+00:00'))
+            self._cond.notify_all()
+
+
+def record_graphql_exchange(query, variables, response):
+    """
+    Anexa o par requisição/resposta em RECORD_PATH (JSONL), para ser
+    reproduzido depois pelo servidor local utils/graphql_stub.py.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"errors": [{"message": response.text}]}
+    with _record_lock, open(RECORD_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"query": query, "variables": variables,
+                            "status": response.status_code, "response": body}) + "\n")
+
+
+def make_graphql_request(query, variables, headers, max_retries=MAX_RETRIES, rate_limiter=None, kind="query"):
     """
     Faz uma requisição GraphQL ao GitHub com retries e backoff exponencial.
+    Com rate_limiter, agenda a requisição pelo saldo de pontos da API.
     """
     for attempt in range(max_retries):
-        response = requests.post(GRAPHQL_URL, json={"query": query, "variables": variables}, headers=headers)
+        reserved = rate_limiter.acquire(kind) if rate_limiter else 0
+        rate_limit = None
+        try:
+            response = get_session().post(GRAPHQL_URL, json={"query": query, "variables": variables},
+                                          headers=headers, timeout=60)
 
-        if response.status_code == 200:
-            data = response.json()
-            if "errors" in data:
-                raise Exception(f"[ERRO] {data['errors']}")
-            return data
+            if RECORD_PATH:
+                record_graphql_exchange(query, variables, response)
 
-        wait_time = 2 ** attempt
+            if response.status_code == 200:
+                data = response.json()
+                if "errors" in data:
+                    raise Exception(f"[ERRO] {data['errors']}")
+                rate_limit = (data.get("data") or {}).get("rateLimit")
+                return data
+        finally:
+            if rate_limiter:
+                rate_limiter.release(kind, reserved, rate_limit)
+
+        # Limite secundário/primário: o GitHub informa quanto esperar
+        retry_after = response.headers.get("Retry-After")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if retry_after and retry_after.isdigit():
+            wait_time = int(retry_after)
+        elif response.status_code in (403, 429) and reset and reset.isdigit():
+            wait_time = max(1, int(reset) - int(time.time()))
+        else:
+            wait_time = 2 ** attempt
         print(f"Erro {response.status_code}, retry em {wait_time}s...")
         time.sleep(wait_time)
 
     raise Exception(f"Falha após {max_retries} tentativas: {response.text}")
 
 
-def fetch_repositories(total, batch_size):
+def fetch_details(ids, headers, rate_limiter):
     """
-    Busca os repositórios mais populares em Java com paginação.
+    Busca os campos caros de um lote de repositórios; retorna {id: node}.
     """
-    token = get_github_token()
-    headers = {"Authorization": f"Bearer {token}"}
+    result = make_graphql_request(DETAILS_QUERY, {"ids": ids}, headers,
+                                  rate_limiter=rate_limiter, kind="details")
+    return {node["id"]: node for node in result["data"]["nodes"] if node}
 
-    query = """
-    query($after: String, $batch_size: Int!) {
-      search(query: "language:Java sort:stars-desc", type: REPOSITORY, first: $batch_size, after: $after) {
-        pageInfo {
-          endCursor
-          hasNextPage
-        }
-        edges {
-          node {
-            ... on Repository {
-              name
-              owner { login }
-              url
-              stargazerCount
-              forkCount
-              createdAt
-              pushedAt
-              updatedAt
-              primaryLanguage { name }
-              releases {
-                totalCount
-              }
 
-              defaultBranchRef {
-                target {
-                  ... on Commit {
-                    history {
-                      totalCount
-                    }
-                  }
-                }
-              }
-              pullRequests(states: MERGED) {
-                totalCount
-              }
-              issues {
-                totalCount
-              }
-              closed: issues(states: CLOSED) {
-                totalCount
-              }
-              languages(first: 10) {
-                edges {
-                  size
-                  node {
-                    name
-                  }
-                }
-              }
-            }
-          }
-        }
-      }
+def build_repo_row(node, details):
+    """
+    Monta a linha do CSV a partir do nó da busca e dos detalhes do repositório.
+    """
+    created_date = datetime.fromisoformat(node["createdAt"].replace('Z', '+00:00'))
+    age_years = (datetime.now().astimezone() - created_date).days / 365.25
+
+    total_size = sum(edge["size"] for edge in node["languages"]["edges"])
+    branch = details["defaultBranchRef"]
+
+    return {
+        # "name": f"{node['owner']['login']}/{node['name']}",
+        "name": node["name"],
+        "owner": node["owner"]["login"],
+        "url": node["url"],
+        "stars": node["stargazerCount"],
+        "created_at": node["createdAt"],
+        "pushed_at": node["pushedAt"],
+        "updated_at": node["updatedAt"],
+        "language": node["primaryLanguage"]["name"] if node["primaryLanguage"] else None,
+        "releases_count": details["releases"]["totalCount"],
+        "forks_count": node["forkCount"],
+        "issues_count": details["issues"]["totalCount"],
+        "closed_issues_count": details["closed"]["totalCount"],
+        "merged_pr_count": details["pullRequests"]["totalCount"],
+        "commits_count": branch["target"]["history"]["totalCount"] if branch else 0,
+        "age_years": round(age_years, 2),
+        "size_bytes": total_size,
+        # Branch e commit do HEAD na coleta: o ck_metrics.py baixa exatamente esse
+        # commit sem consultar a rede de novo
+        "default_branch": branch["name"] if branch else None,
+        "head_sha": branch["target"]["oid"] if branch else None,
     }
+
+
+class CollectionCheckpoint:
     """
+    Checkpoint da coleta em disco (JSONL). Cada linha é uma página já concluída
+    de uma consulta de busca (shard): as linhas do CSV, o endCursor e se há
+    próxima página. Na retomada cada shard continua do último cursor gravado;
+    repositórios repetidos são deduplicados por owner/name.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.rows = {}
+        self.shards = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
 
-    repos = []
-    after_cursor = None
-
-    with tqdm(total=total, desc="Coletando repositórios", unit="repo") as pbar:
-        while len(repos) < total:
-            variables = {"after": after_cursor, "batch_size": batch_size}
-            result = make_graphql_request(query, variables, headers)
-
-            search = result["data"]["search"]
-            for edge in search["edges"]:
-                node = edge["node"]
-                
-                from datetime import datetime
-                created_date = datetime.fromisoformat(node["createdAt"].replace('Z', '+00:00'))
-                age_years = (datetime.now().astimezone() - created_date).days / 365.25
-                
-                total_size = sum(edge["size"] for edge in node["languages"]["edges"])
-                
-                repos.append({
-                    # "name": f"{node['owner']['login']}/{node['name']}",
-                    "name": node["name"],
-                    "owner": node["owner"]["login"],
-                    "url": node["url"],
-                    "stars": node["stargazerCount"],
-                    "created_at": node["createdAt"],
-                    "pushed_at": node["pushedAt"],
-                    "updated_at": node["updatedAt"],
-                    "language": node["primaryLanguage"]["name"] if node["primaryLanguage"] else None,
-                    "releases_count": node["releases"]["totalCount"],
-                    "forks_count": node["forkCount"],
-                    "issues_count": node["issues"]["totalCount"],
-                    "closed_issues_count": node["closed"]["totalCount"],
-                    "merged_pr_count": node["pullRequests"]["totalCount"],
-                    "commits_count": node["defaultBranchRef"]["target"]["history"]["totalCount"] if node["defaultBranchRef"] else 0,
-                    "age_years": round(age_years, 2),
-                    "size_bytes": total_size
-                })
-                pbar.update(1)
-
-                if len(repos) >= total:
-                    break
+    def _load(self):
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # linha cortada por uma interrupção no meio da escrita
+                self._apply(entry)
+                valid_bytes += len(line)
+        if valid_bytes != os.path.getsize(self.path):
+            print(f"[!] Checkpoint com linha incompleta, descartando o final de {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+        if self.shards:
+            print(f"[+] Retomando do checkpoint {self.path}: {len(self.rows)} repositórios já coletados")
+
+    def _apply(self, entry):
+        state = self.shard_state(entry["shard"])
+        state["cursor"] = entry["cursor"]
+        state["has_next"] = entry["has_next"]
+        state["count"] += entry["fetched"]
+        for row in entry["rows"]:
+            self.rows[(row["owner"], row["name"])] = row
+
+    def shard_state(self, search):
+        return self.shards.setdefault(search, {"cursor": None, "has_next": True, "count": 0})
+
+    def append(self, search, cursor, has_next, fetched, rows):
+        entry = {"shard": search, "cursor": cursor, "has_next": has_next,
+                 "fetched": fetched, "rows": rows}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(entry)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def build_searches(star_ranges=None):
+    """
+    Uma consulta de busca por faixa de estrelas ("50000..*", "20000..49999", ...).
+    Cada consulta devolve no máximo 1000 resultados, então dividir por faixas
+    permite passar de 1000 repositórios.
+    """
+    if not star_ranges:
+        return [SEARCH_BASE]
+    searches = []
+    for star_range in star_ranges:
+        star_range = star_range.strip()
+        if not re.fullmatch(r"\d+\.\.(\d+|\*)", star_range):
+            raise ValueError(f"Faixa de estrelas inválida: {star_range!r} (use ex.: 1000..4999 ou 50000..*)")
+        searches.append(f"{SEARCH_BASE} stars:{star_range}")
+    return searches
+
+
+def checkpoint_pages(search, pending, checkpoint, pbar, wait=False):
+    """
+    Grava no checkpoint as páginas cujos detalhes já chegaram, sempre em ordem
+    de paginação: o cursor de uma página só é salvo depois de todas as anteriores.
+    Se os detalhes de uma página falharam, a exceção sobe e a página continua
+    no início da fila: nenhuma página seguinte (com um endCursor mais adiante)
+    é gravada depois dela.
+    """
+    while pending and (wait or pending[0][1] is None or pending[0][1].done()):
+        nodes, future, cursor, has_next = pending[0]
+        details = future.result() if future else {}
+        pending.popleft()
+        rows = []
+        for node in nodes:
+            if node["id"] in details:
+                rows.append(build_repo_row(node, details[node["id"]]))
+            else:
+                print(f"[!] Detalhes não retornados para {node['owner']['login']}/{node['name']}")
+        checkpoint.append(search, cursor, has_next, len(nodes), rows)
+        pbar.update(len(nodes))
+
+
+def collect_shard(search, limit, batch_size, headers, rate_limiter, detail_executor, checkpoint, pbar):
+    """
+    Pagina uma consulta de busca até `limit` resultados, a partir do último
+    cursor do checkpoint. A paginação é sequencial (cada página depende do
+    endCursor da anterior); os campos caros de cada página são buscados em
+    paralelo por node ID enquanto a próxima página é paginada.
+    """
+    state = checkpoint.shard_state(search)
+    collected, after_cursor, has_next = state["count"], state["cursor"], state["has_next"]
+    pending = deque()  # (nós da página, future dos detalhes, endCursor, hasNextPage)
 
-            if not search["pageInfo"]["hasNextPage"]:
-                break
+    try:
+        while has_next and collected < limit:
+            # Nunca pede mais do que falta: o endCursor gravado não pode pular repositórios
+            variables = {"search": search, "after": after_cursor,
+                         "batch_size": min(batch_size, limit - collected)}
+            result = make_graphql_request(SEARCH_QUERY, variables, headers,
+                                          rate_limiter=rate_limiter, kind="search")
 
-            after_cursor = search["pageInfo"]["endCursor"]
+            search_data = result["data"]["search"]
+            nodes = [edge["node"] for edge in search_data["edges"] if edge["node"]]
+            has_next = search_data["pageInfo"]["hasNextPage"]
+            after_cursor = search_data["pageInfo"]["endCursor"]
+            future = None
+            if nodes:
+                future = detail_executor.submit(fetch_details, [n["id"] for n in nodes], headers, rate_limiter)
+            pending.append((nodes, future, after_cursor, has_next))
+            collected += len(nodes)
 
-    return repos
+            checkpoint_pages(search, pending, checkpoint, pbar)
+    except Exception:
+        # Salva as páginas que já estavam em andamento antes de propagar o erro
+        # (só as anteriores à primeira página que falhou)
+        try:
+            checkpoint_pages(search, pending, checkpoint, pbar, wait=True)
+        except Exception:
+            pass
+        raise
+
+    checkpoint_pages(search, pending, checkpoint, pbar, wait=True)
+
+
+def fetch_repositories(total, batch_size, detail_workers=DETAIL_WORKERS, star_ranges=None,
+                       shard_workers=SHARD_WORKERS, checkpoint_path=CHECKPOINT_PATH):
+    """
+    Busca os repositórios mais populares em Java com paginação.
+    Cada página concluída vai para o checkpoint em disco; uma execução
+    interrompida continua de onde parou. Com star_ranges, a busca é dividida
+    em faixas de estrelas coletadas em paralelo (shard_workers).
+    """
+    token = get_github_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    rate_limiter = RateLimiter()
+    checkpoint = CollectionCheckpoint(checkpoint_path)
+
+    searches = build_searches(star_ranges)
+    limit = min(total, SEARCH_RESULT_CAP) if len(searches) > 1 else total
+    already = sum(min(checkpoint.shard_state(s)["count"], limit) for s in searches)
+
+    with ThreadPoolExecutor(max_workers=detail_workers) as detail_executor, \
+            ThreadPoolExecutor(max_workers=shard_workers) as shard_executor, \
+            tqdm(total=limit * len(searches), initial=already, desc="Coletando repositórios", unit="repo") as pbar:
+        futures = {
+            shard_executor.submit(collect_shard, search, limit, batch_size, headers,
+                                  rate_limiter, detail_executor, checkpoint, pbar): search
+            for search in searches
+        }
+        for future in as_completed(futures):
+            # Se um shard falhar, os demais terminam e ficam no checkpoint
+            future.result()
+
+    repos = sorted(checkpoint.rows.values(), key=lambda row: row["stars"], reverse=True)
+    return repos[:total], checkpoint
 
 
 def save_to_csv(repos, filename="results/top_java_repos.csv"):
@@ -151,24 +420,54 @@ def save_to_csv(repos, filename="results/top_java_repos.csv"):
             f,
             fieldnames=["name", "owner", "url", "stars", "created_at", "pushed_at", "updated_at", 
                        "language", "releases_count", "commits_count", "age_years", "size_bytes",
-                       "forks_count", "issues_count", "closed_issues_count", "merged_pr_count"]
+                       "forks_count", "issues_count", "closed_issues_count", "merged_pr_count",
+                       "default_branch", "head_sha"]
         )
         writer.writeheader()
         writer.writerows(repos)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Coleta os repositórios Java mais populares do GitHub")
+    parser.add_argument("--max-repos", type=int, default=MAX_REPOS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--detail-workers", type=int, default=DETAIL_WORKERS,
+                        help="consultas de detalhes (releases, PRs, issues, commits) em paralelo")
+    parser.add_argument("--star-ranges", type=lambda value: value.split(","), default=None,
+                        help="divide a busca em faixas de estrelas, ex.: 50000..*,20000..49999,10000..19999")
+    parser.add_argument("--shard-workers", type=int, default=SHARD_WORKERS,
+                        help="faixas de estrelas coletadas em paralelo")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH,
+                        help="arquivo JSONL com as páginas já coletadas (retomada automática)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="descarta o checkpoint existente e coleta do zero")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     print("== Coletor de Repositórios Java no GitHub ==")
     start_time = time.time()
+    configure_http(pool_size=args.detail_workers + args.shard_workers)
+
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
 
-    repos = fetch_repositories(total=MAX_REPOS, batch_size=BATCH_SIZE)
+    repos, checkpoint = fetch_repositories(total=args.max_repos, batch_size=args.batch_size,
+                                           detail_workers=args.detail_workers,
+                                           star_ranges=args.star_ranges,
+                                           shard_workers=args.shard_workers,
+                                           checkpoint_path=args.checkpoint)
     save_to_csv(repos)
+    # CSV salvo: o checkpoint não é mais necessário
+    checkpoint.remove()
 
     end_time = time.time()
     elapsed = end_time - start_time
 
     print(f"Arquivo 'top_java_repos.csv' gerado com {len(repos)} repositórios.")
     print(f"✅ Tempo total de execução: {elapsed:.2f} segundos")
+    print_http_stats()
 
 
 
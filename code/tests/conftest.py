@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os scripts rodam a partir de code/ e importam "utils.X"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import os
+import subprocess
+
+import pytest
+
+from utils import ck_worker
+from utils.ck_worker import CKWorker
+
+OPTIONS = {"use_jars": False, "max_files_per_partition": 0, "variables_and_fields": False}
+
+
+def _fake_java(tmp_path, monkeypatch, script):
+    # "java" falso no PATH no lugar da JVM com o CKDriver
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    java = bin_dir / "java"
+    java.write_text("#!/bin/sh\n" + script)
+    java.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_startup_timeout_stops_jvm(tmp_path, monkeypatch):
+    _fake_java(tmp_path, monkeypatch, "exec sleep 30\n")
+    monkeypatch.setattr(ck_worker, "STARTUP_TIMEOUT", 0.5)
+    worker = CKWorker("ck.jar")
+    with pytest.raises(subprocess.TimeoutExpired):
+        worker.run(str(tmp_path), str(tmp_path), OPTIONS, timeout=5)
+    assert worker.process is None
+
+
+def test_restarts_after_failed_startup(tmp_path, monkeypatch):
+    _fake_java(tmp_path, monkeypatch, 'echo "@@CKDRIVER NOTREADY"\nexec sleep 30\n')
+    worker = CKWorker("ck.jar")
+    with pytest.raises(ck_worker.CKWorkerError):
+        worker.run(str(tmp_path), str(tmp_path), OPTIONS, timeout=5)
+    assert worker.process is None
+
+    (tmp_path / "bin" / "java").write_text(
+        '#!/bin/sh\necho "@@CKDRIVER READY"\nread line\necho "@@CKDRIVER OK\t3"\nexec sleep 30\n')
+    try:
+        classes, _ = worker.run(str(tmp_path), str(tmp_path), OPTIONS, timeout=5)
+        assert classes == 3
+    finally:
+        worker.stop(force=True)
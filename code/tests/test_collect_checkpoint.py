@@ -0,0 +1,96 @@
+import json
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import main
+from utils.graphql_stub import serve
+
+SEARCH = main.SEARCH_BASE
+
+
+def _node(i):
+    return {"id": f"id{i}", "name": f"r{i}", "owner": {"login": "o"}, "url": f"https://github.com/o/r{i}",
+            "stargazerCount": 100 - i, "forkCount": 0, "createdAt": "2020-01-01T00:00:00Z",
+            "pushedAt": "2024-01-01T00:00:00Z", "updatedAt": "2024-01-01T00:00:00Z",
+            "primaryLanguage": {"name": "Java"}, "languages": {"edges": [{"size": 10, "node": {"name": "Java"}}]}}
+
+
+def _details(i):
+    return {"id": f"id{i}", "releases": {"totalCount": 0}, "issues": {"totalCount": 0},
+            "closed": {"totalCount": 0}, "pullRequests": {"totalCount": 0},
+            "defaultBranchRef": {"name": "main", "target": {"oid": "a" * 40, "history": {"totalCount": 1}}}}
+
+
+def _recording(path):
+    # Três páginas de um repositório; os detalhes da primeira voltam com erro
+    entries = []
+    cursors = [None, "c1", "c2", "c3"]
+    for i in (1, 2, 3):
+        page = {"pageInfo": {"endCursor": cursors[i], "hasNextPage": i < 3}, "edges": [{"node": _node(i)}]}
+        entries.append({"query": main.SEARCH_QUERY, "status": 200, "response": {"data": {"search": page}},
+                        "variables": {"search": SEARCH, "after": cursors[i - 1], "batch_size": 1}})
+        details = ({"errors": [{"message": "falhou"}]} if i == 1
+                   else {"data": {"nodes": [_details(i)]}})
+        entries.append({"query": main.DETAILS_QUERY, "variables": {"ids": [f"id{i}"]},
+                        "status": 200, "response": details})
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+class DeferredFirstExecutor:
+    """
+    Executa na hora, mas só conclui o future da primeira página quando a
+    segunda é submetida: a falha aparece com páginas posteriores na fila.
+    """
+    def __init__(self):
+        self.held = None
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            result = fn(*args)
+            finish = lambda: future.set_result(result)
+        except Exception as e:
+            finish = lambda error=e: future.set_exception(error)
+        self.submitted += 1
+        if self.submitted == 1:
+            self.held = finish
+            return future
+        if self.held:
+            self.held, held = None, self.held
+            held()
+        finish()
+        return future
+
+
+class _Bar:
+    def update(self, n):
+        pass
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    recording = tmp_path / "gravacao.jsonl"
+    _recording(recording)
+    server = serve(str(recording), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(main, "GRAPHQL_URL", f"http://127.0.0.1:{server.server_address[1]}/graphql")
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def test_failed_page_stops_checkpoint(stub, tmp_path):
+    checkpoint = main.CollectionCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    with pytest.raises(Exception, match="falhou"):
+        main.collect_shard(SEARCH, 10, 1, {}, main.RateLimiter(), DeferredFirstExecutor(), checkpoint, _Bar())
+
+    # Nada depois da página que falhou: a retomada recomeça da primeira página
+    reloaded = main.CollectionCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    assert reloaded.rows == {}
+    assert reloaded.shard_state(SEARCH)["cursor"] is None
@@ -0,0 +1,45 @@
+import time
+
+from utils.fastpath import outline_java
+
+
+def _types(content):
+    return {t["name"]: t["kind"] for t in outline_java(content)[3]}
+
+
+def test_pathological_inputs_are_linear():
+    for content in ["class A { }" + "\n" * 200,
+                    "class A { int x = 1" + " ;" * 200 + "'",
+                    "class A { @Override" + " x" * 200 + '"']:
+        start = time.perf_counter()
+        outline_java(content)
+        assert time.perf_counter() - start < 1.0
+
+
+def test_outline_with_trailing_blank_lines():
+    content = "package p;\nimport q.Dep;\npublic class A extends Dep {\n  class B { }\n}" + "\n" * 50
+    package, imports, _, types, _ = outline_java(content)
+    assert package == "p"
+    assert imports == {"Dep": "q.Dep"}
+    assert {t["name"]: (t["kind"], t["start"], t["end"]) for t in types} == {
+        "p.A": ("class", 3, 5), "p.A$B": ("innerclass", 4, 4)}
+    assert types[0]["extends"] == ["Dep"]
+
+
+def test_unterminated_quote_is_skipped():
+    assert _types("class A {\n  char c = ';\n  Foo f;\n}\n") == {"A": "class"}
+
+
+def test_record_is_contextual():
+    content = (
+        "package p;\n"
+        "class A {\n"
+        "  void m(Object record) {\n"
+        "    if (record instanceof String) { }\n"
+        "  }\n"
+        "  record Ponto(int x, int y) { }\n"
+        "}\n"
+    )
+    types = outline_java(content)[3]
+    assert {t["name"]: t["kind"] for t in types} == {"p.A": "class", "p.A$Ponto": "record"}
+    assert types[0]["inner"] == 1
@@ -0,0 +1,24 @@
+import json
+import threading
+
+from utils import http_client
+from utils.graphql_stub import serve
+
+
+def test_post_is_not_retried_on_status(tmp_path):
+    # 502 seguido de 200: a sessão devolve o 502 e deixa o retry para make_graphql_request
+    recording = tmp_path / "gravacao.jsonl"
+    with open(recording, "w", encoding="utf-8") as f:
+        for status in (502, 200):
+            f.write(json.dumps({"query": "{ viewer }", "variables": {}, "status": status,
+                                "response": {"data": {}}}) + "\n")
+    server = serve(str(recording), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        session = http_client.configure_http(retries=3)
+        url = f"http://127.0.0.1:{server.server_address[1]}/graphql"
+        assert session.post(url, json={"query": "{ viewer }", "variables": {}}, timeout=10).status_code == 502
+        assert session.post(url, json={"query": "{ viewer }", "variables": {}}, timeout=10).status_code == 200
+    finally:
+        server.shutdown()
+        server.server_close()
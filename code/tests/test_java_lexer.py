@@ -0,0 +1,69 @@
+import time
+
+from utils.java_lexer import TOKEN_RE, count_comments_by_type
+
+# Entradas que faziam o regex retroceder exponencialmente pelo prefixo
+# (linhas em branco no fim do arquivo, aspa sem fechamento); com 200
+# repetições o tempo antigo seria astronômico.
+PATHOLOGICAL = [
+    "class A { }" + "\n" * 200,
+    "class A { // c\n }" + "\n" * 200,
+    "class A { int x = 1" + " ;" * 200 + "'",
+    'class A { int x = 1' + ' ;' * 200 + '"',
+]
+
+
+def _counts(content):
+    return {name: c["total_comments"] for name, c in count_comments_by_type(content).items()}
+
+
+def test_pathological_inputs_are_linear():
+    for content in PATHOLOGICAL:
+        start = time.perf_counter()
+        count_comments_by_type(content)
+        count_comments_by_type(content.encode("utf-8"))
+        assert time.perf_counter() - start < 1.0
+
+
+def test_trailing_blank_lines_keep_counts():
+    assert _counts("package p;\nclass A { // c\n }" + "\n" * 50) == {"p.A": 1}
+
+
+def test_unterminated_quote_is_skipped():
+    content = "class A {\n  char c = ';\n  // depois da aspa\n}\n"
+    assert _counts(content) == {"A": 1}
+    assert _counts(content.encode("utf-8")) == {"A": 1}
+
+
+def test_literals_and_nesting():
+    content = (
+        "package p.q;\n"
+        "/** doc */\n"
+        "public class Outer {\n"
+        '  String s = "// nao e comentario {";\n'
+        "  Class<?> k = Foo.class; // c1\n"
+        "  static class Inner { /* c2 */ }\n"
+        "}\n"
+    )
+    assert _counts(content) == {"<file_level>": 1, "p.q.Outer": 1, "p.q.Outer$Inner": 1}
+
+
+def test_record_is_contextual():
+    content = (
+        "class A {\n"
+        "  void m(Object record) {\n"
+        "    if (record instanceof String) { // c1\n"
+        "    }\n"
+        "  }\n"
+        "  record Ponto(int x, int y) { /* c2 */ }\n"
+        "  record Par<T>(T a, T b) { /* c3 */ }\n"
+        "}\n"
+    )
+    assert _counts(content) == {"A": 1, "A$Ponto": 1, "A$Par": 1}
+    assert _counts(content.encode("utf-8")) == {"A": 1, "A$Ponto": 1, "A$Par": 1}
+
+
+def test_keyword_is_not_a_type_name():
+    decls = [m.group("name") for m in TOKEN_RE.finditer("class extends record instanceof(x) class Ok")
+             if m.lastgroup == "decl"]
+    assert decls == ["Ok"]
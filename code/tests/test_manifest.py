@@ -0,0 +1,37 @@
+from utils.manifest import manifest_is_current, read_manifest, write_manifest
+
+CONFIG = {"ck_version": "0.7.1", "options": {"use_jars": False}}
+
+
+def test_incomplete_output_is_not_current(tmp_path):
+    write_manifest(str(tmp_path), "o", "r", "u", "abc", CONFIG, complete=False,
+                   errors={"comments": "disco cheio"})
+    assert not manifest_is_current(read_manifest(str(tmp_path)), "abc", CONFIG)
+
+    write_manifest(str(tmp_path), "o", "r", "u", "abc", CONFIG, complete=True, errors={})
+    assert manifest_is_current(read_manifest(str(tmp_path)), "abc", CONFIG)
+
+
+def test_manifest_without_complete_flag_is_current(tmp_path):
+    # Manifestos gravados antes do campo "complete"
+    write_manifest(str(tmp_path), "o", "r", "u", "abc", CONFIG)
+    assert manifest_is_current(read_manifest(str(tmp_path)), "abc", CONFIG)
+    assert not manifest_is_current(read_manifest(str(tmp_path)), "def", CONFIG)
+
+
+def test_sampling_compared_per_repo(tmp_path):
+    params = {"method": "systematic-by-package", "fraction": 0.25, "seed": 0, "above_bytes": 1}
+    record = {"method": "systematic-by-package", "requested_fraction": 0.25, "seed": 0, "fraction": 0.26}
+
+    # Repositório abaixo do limite: analisado inteiro, não depende da amostragem
+    write_manifest(str(tmp_path), "o", "r", "u", "abc", CONFIG, sampling=None)
+    manifest = read_manifest(str(tmp_path))
+    assert manifest_is_current(manifest, "abc", CONFIG, None)
+    assert not manifest_is_current(manifest, "abc", CONFIG, params)
+
+    write_manifest(str(tmp_path), "o", "r", "u", "abc", CONFIG, sampling=record)
+    manifest = read_manifest(str(tmp_path))
+    assert manifest_is_current(manifest, "abc", CONFIG, params)
+    assert manifest_is_current(manifest, "abc", CONFIG, {**params, "above_bytes": 2})
+    assert not manifest_is_current(manifest, "abc", CONFIG, {**params, "fraction": 0.5})
+    assert not manifest_is_current(manifest, "abc", CONFIG, None)
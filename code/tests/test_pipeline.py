@@ -0,0 +1,22 @@
+import threading
+
+from utils.pipeline import Stage, run_pipeline
+
+
+def test_failing_error_handler_does_not_hang():
+    done = []
+
+    def first(item):
+        if item == 2:
+            raise ValueError("falhou")
+        return item
+
+    def on_error(stage_name, item, exc):
+        raise RuntimeError("handler quebrado")
+
+    stages = [Stage("first", first), Stage("second", done.append)]
+    thread = threading.Thread(target=run_pipeline, args=([1, 2, 3], stages, on_error), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert sorted(done) == [1, 3]
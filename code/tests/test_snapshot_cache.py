@@ -0,0 +1,27 @@
+from utils.snapshot_cache import SnapshotCache
+
+
+def _tree(path, names):
+    path.mkdir()
+    for name in names:
+        (path / name).write_text("x" * 10)
+    return str(path)
+
+
+def test_variants_and_download_bytes(tmp_path):
+    cache = SnapshotCache(str(tmp_path / "cache"), 10 ** 9)
+    stream_key = SnapshotCache.make_key("o", "r", "abc", "only.java.jar")
+    full_key = SnapshotCache.make_key("o", "r", "abc")
+    assert stream_key != full_key
+
+    cache.store(stream_key, _tree(tmp_path / "s", ["A.java"]), download_bytes=5000)
+    cache.release(stream_key)
+
+    # Árvore só com .java não atende o modo full
+    assert cache.lookup_any([full_key]) == (None, None)
+    key, path = cache.lookup_any([stream_key, full_key])
+    assert key == stream_key and path
+    cache.release(key)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.bytes_saved == 5000
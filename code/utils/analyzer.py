@@ -1,72 +1,288 @@
 import os
+import json
+import hashlib
 import time
+import argparse
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from columnar import DATASET_DIR, partition_is_current, partition_path, read_ck_columns, split_folder
+from stats_kernel import describe_frame, describe_ci, correlations as correlation_matrices
+from rollups import summarize_members
+from manifest import MANIFEST_FILE, read_manifest
 
 BASE_DIR = "../ck_output"
 CSV_NAME = "class.csv"
 COMMENTS_CSV = "comments_by_class.csv"
+MEMBER_TABLES = ("method", "field", "variable")
 TARGET_COLS = ["cbo", "dit", "loc", "lcom"]
+COMMENT_COLS = ["class", "comment_lines"]
+RESULTS_CSV = "../results/metrics_results.csv"
+CORRELATIONS_CSV = "../results/metrics_correlations.csv"
+# Intervalos de confiança de 95% das estatísticas dos repositórios analisados
+# por amostra (ck_metrics.py --sample-above-mb)
+CONFIDENCE_CSV = "../results/metrics_confidence.csv"
+# Linhas já calculadas vão sendo gravadas aqui (uma por repositório) durante a agregação
+PARTIAL_PATH = "../results/metrics_results.partial.jsonl"
+# Resumo de cada repositório junto com a impressão digital das entradas usadas;
+# na próxima execução só os repositórios novos ou alterados são recalculados
+CACHE_PATH = "../results/metrics_results.cache.jsonl"
+# Incrementar quando as colunas do resumo mudarem: entradas de outra versão são recalculadas
+SUMMARY_VERSION = 3
+HASH_CHUNK = 1024 * 1024
+
+# Origem das saídas agregadas: o CK (ck_metrics.py) ou a análise rápida só do
+# código-fonte (ck_metrics.py --engine fastpath, sem LCOM nem dataset Parquet).
+# Cada origem tem seus próprios arquivos em results/.
+SOURCES = {
+    "ck": {"base_dir": "../ck_output", "dataset_dir": DATASET_DIR,
+           "metric_cols": TARGET_COLS, "suffix": ""},
+    "fastpath": {"base_dir": "../ck_fast_output", "dataset_dir": None,
+                 "metric_cols": ["cbo", "dit", "loc"], "suffix": "_fastpath"},
+}
+# Colunas de TARGET_COLS presentes na origem configurada (ver configure)
+METRIC_COLS = TARGET_COLS
+
+# Tipos explícitos na leitura: métricas como float64 (convertidas de volta para
+# inteiro quando a coluna é inteira, como a inferência do pandas faria)
+TARGET_DTYPES = {col: "float64" for col in TARGET_COLS}
+COMMENT_DTYPES = {"class": "object", "comment_lines": "float64"}
+# Arquivo de cada classe: conglomerado da amostra nos intervalos de confiança
+SAMPLE_DTYPES = {**TARGET_DTYPES, "file": "object"}
+# Thresholds conhecidos na literatura: classes críticas que passaram deles
+# (14 para CBO = alto acoplamento, 7 para DIT = herança muito profunda, 500 para LOC = candidata a God Class)
+THRESHOLDS = {"cbo": 14, "dit": 7, "loc": 500}
 
-results = []
-correlations = []
+rename_map = {
+    "total_classes": "Total_Classes",
+    "sample_fraction": "Fração_Amostra",
 
-start_time = time.time()
+    "cbo_mean": "CBO_Média",
+    "cbo_median": "CBO_Mediana",
+    "cbo_mode": "CBO_Moda",
+    "cbo_std": "CBO_DesvioPadrao",
+    "cbo_min": "CBO_Mínimo",
+    "cbo_max": "CBO_Máximo",
+    "cbo_p90": "CBO_P90",
+    "cbo_outlier_pct": "%CBO_Outliers",
 
-for folder in os.listdir(BASE_DIR):
-    folder_path = os.path.join(BASE_DIR, folder)
-    if not os.path.isdir(folder_path):
-        continue
+    "dit_mean": "DIT_Média",
+    "dit_median": "DIT_Mediana",
+    "dit_mode": "DIT_Moda",
+    "dit_std": "DIT_DesvioPadrao",
+    "dit_min": "DIT_Mínimo",
+    "dit_max": "DIT_Máximo",
+    "dit_p90": "DIT_P90",
+    "dit_outlier_pct": "%DIT_Outliers",
 
-    csv_path = os.path.join(folder_path, CSV_NAME)
-    comments_path = os.path.join(folder_path, COMMENTS_CSV)
+    "loc_mean": "LOC_Média",
+    "loc_median": "LOC_Mediana",
+    "loc_mode": "LOC_Moda",
+    "loc_std": "LOC_DesvioPadrao",
+    "loc_min": "LOC_Mínimo",
+    "loc_max": "LOC_Máximo",
+    "loc_p90": "LOC_P90",
+    "loc_outlier_pct": "%LOC_Outliers",
+
+    "lcom_mean": "LCOM_Média",
+    "lcom_median": "LCOM_Mediana",
+    "lcom_mode": "LCOM_Moda",
+    "lcom_std": "LCOM_DesvioPadrao",
+    "lcom_min": "LCOM_Mínimo",
+    "lcom_max": "LCOM_Máximo",
+    "lcom_p90": "LCOM_P90",
+    "lcom_outlier_pct": "%LCOM_Outliers",
+
+    "pct_cbo_high": "%CBO_Acima_14",
+    "pct_dit_high": "%DIT_Acima_7",
+    "pct_loc_high": "%LOC_Acima_500",
+
+    "mean_comment_lines_per_class": "Média_Coment_Classe",
+    "ratio_comment_lines_loc": "Coment/LOC",
+    "mean_comment_lines_per_repo": "Média_Coment_Repo",
+
+    # Agregações de method.csv, field.csv e variable.csv (rollups.py)
+    "total_methods": "Total_Métodos",
+    "method_wmc_mean": "WMC_Método_Média",
+    "method_wmc_median": "WMC_Método_Mediana",
+    "method_wmc_p90": "WMC_Método_P90",
+    "class_wmc_mean": "WMC_Classe_Média",
+    "class_wmc_median": "WMC_Classe_Mediana",
+    "class_wmc_p90": "WMC_Classe_P90",
+    "params_mean": "Parâmetros_Média",
+    "params_p90": "Parâmetros_P90",
+    "pct_methods_javadoc": "%Métodos_JavaDoc",
+    "fields_per_class_mean": "Campos_Usados_Classe",
+    "field_usage_mean": "Uso_Campo_Média",
+    "variables_per_method_mean": "Variáveis_Método_Média",
+    "variable_usage_mean": "Uso_Variável_Média"
+}
 
+ordered_cols = [
+    "owner", "repo", "Total_Classes",
+    "CBO_Média", "CBO_Mediana", "CBO_Moda", "CBO_DesvioPadrao", "CBO_Mínimo", "CBO_Máximo", "CBO_P90", "%CBO_Outliers", "%CBO_Acima_14",
+    "DIT_Média", "DIT_Mediana", "DIT_Moda", "DIT_DesvioPadrao", "DIT_Mínimo", "DIT_Máximo", "DIT_P90", "%DIT_Outliers", "%DIT_Acima_7",
+    "LOC_Média", "LOC_Mediana", "LOC_Moda", "LOC_DesvioPadrao", "LOC_Mínimo", "LOC_Máximo", "LOC_P90", "%LOC_Outliers", "%LOC_Acima_500",
+    "LCOM_Média", "LCOM_Mediana", "LCOM_Moda", "LCOM_DesvioPadrao", "LCOM_Mínimo", "LCOM_Máximo", "LCOM_P90", "%LCOM_Outliers",
+    "Média_Coment_Classe", "Coment/LOC", "Média_Coment_Repo",
+    "Total_Métodos", "WMC_Método_Média", "WMC_Método_Mediana", "WMC_Método_P90",
+    "WMC_Classe_Média", "WMC_Classe_Mediana", "WMC_Classe_P90", "Parâmetros_Média", "Parâmetros_P90",
+    "%Métodos_JavaDoc", "Campos_Usados_Classe", "Uso_Campo_Média", "Variáveis_Método_Média", "Uso_Variável_Média",
+    # Colunas novas entram no fim: quem lê o CSV por posição não é afetado
+    "Fração_Amostra"
+]
+
+
+def configure(source):
+    """
+    Aponta o módulo para uma origem de SOURCES (também chamada na
+    inicialização de cada processo do pool).
+    """
+    global BASE_DIR, DATASET_DIR, METRIC_COLS, RESULTS_CSV, CORRELATIONS_CSV, CONFIDENCE_CSV, PARTIAL_PATH, CACHE_PATH
+    config = SOURCES[source]
+    BASE_DIR = config["base_dir"]
+    DATASET_DIR = config["dataset_dir"]
+    METRIC_COLS = config["metric_cols"]
+    suffix = config["suffix"]
+    RESULTS_CSV = f"../results/metrics_results{suffix}.csv"
+    CORRELATIONS_CSV = f"../results/metrics_correlations{suffix}.csv"
+    CONFIDENCE_CSV = f"../results/metrics_confidence{suffix}.csv"
+    PARTIAL_PATH = f"../results/metrics_results{suffix}.partial.jsonl"
+    CACHE_PATH = f"../results/metrics_results{suffix}.cache.jsonl"
+
+
+def _restore_int_columns(df):
+    # Coluna sem NaN e só com valores inteiros volta a int64 (moda/mín/máx saem como inteiros)
+    for col in df.columns:
+        if df[col].dtype == "float64" and df[col].notna().all() and (df[col] % 1 == 0).all():
+            df[col] = df[col].astype("int64")
+    return df
+
+
+def read_ck_table(folder, csv_path, table, columns, dtypes=None):
+    """
+    Lê apenas `columns` de uma tabela do CK: do dataset Parquet (utils/columnar.py)
+    quando ele existe e não é mais velho que o CSV; senão, do próprio CSV.
+    Retorna None se nenhum dos dois existir.
+    """
+    owner, repo = split_folder(folder)
+    if DATASET_DIR and partition_is_current(DATASET_DIR, table, owner, repo, csv_path):
+        return read_ck_columns(DATASET_DIR, table, owner, repo, columns)
     if not os.path.exists(csv_path):
-        print(f"[AVISO] CSV de métricas não encontrado em: {folder}")
-        continue
+        return None
+    wanted = {c.strip().lower() for c in columns}
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtype = {c: dtypes[c.strip().lower()] for c in header if dtypes and c.strip().lower() in wanted}
+    df = pd.read_csv(csv_path, usecols=lambda c: c.strip().lower() in wanted, dtype=dtype)
+    return _restore_int_columns(df)
+
+
+def _plain(value):
+    # Escalares do numpy → tipos do Python, para gravar a linha em JSON
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def sample_fraction(folder_path):
+    """
+    Fração de arquivos .java analisada, registrada pelo ck_metrics.py no
+    manifesto (1.0 quando o repositório foi analisado inteiro).
+    """
+    manifest = read_manifest(folder_path) or {}
+    sampling = manifest.get("sampling") or {}
+    return float(sampling.get("fraction", 1.0))
+
+
+def confidence_rows(owner, repo, df, stats, fraction):
+    """
+    Linhas de metrics_confidence: intervalo de 95% de cada estatística que
+    depende da amostra (média, mediana, P90, % outliers e % acima dos
+    thresholds), com as classes agrupadas pelo arquivo sorteado.
+    """
+    clusters = df["file"].astype(str).to_numpy() if "file" in df.columns else None
+    rows = []
+    for col in METRIC_COLS:
+        thresholds = [THRESHOLDS[col]] if col in THRESHOLDS else []
+        intervals = describe_ci(df[col].to_numpy(dtype=np.float64), clusters, fraction, thresholds=thresholds)
+        keys = {"mean": f"{col}_mean", "median": f"{col}_median", "quantile": f"{col}_p90",
+                "outlier_pct": f"{col}_outlier_pct"}
+        keys.update({f"above_{t}": f"pct_{col}_high" for t in thresholds})
+        for stat, key in keys.items():
+            low, high = intervals[stat]
+            rows.append({
+                "owner": owner, "repo": repo, "statistic": rename_map[key], "value": stats[key],
+                "ci_low": _plain(low), "ci_high": _plain(high), "sample_fraction": fraction,
+            })
+    return rows
+
+
+def summarize_repo(folder):
+    """
+    Estatísticas de um repositório (uma pasta de ck_output). Roda nos processos
+    do pool; devolve (linha de metrics_results, linhas de metrics_correlations,
+    linhas de metrics_confidence) ou (None, [], []) quando a pasta é ignorada.
+    """
+    folder_path = os.path.join(BASE_DIR, folder)
+    csv_path = os.path.join(folder_path, CSV_NAME)
+    comments_path = os.path.join(folder_path, COMMENTS_CSV)
+    correlations = []
+    confidence = []
 
     try:
-        df = pd.read_csv(csv_path)
+        fraction = sample_fraction(folder_path)
+        sampled = fraction < 1
+        if sampled:
+            df = read_ck_table(folder, csv_path, "class", METRIC_COLS + ["file"], SAMPLE_DTYPES)
+        else:
+            df = read_ck_table(folder, csv_path, "class", METRIC_COLS, TARGET_DTYPES)
+        if df is None:
+            print(f"[AVISO] CSV de métricas não encontrado em: {folder}")
+            return None, [], []
         df.columns = df.columns.str.strip().str.lower()
 
-        if not all(col in df.columns for col in TARGET_COLS):
+        if not all(col in df.columns for col in METRIC_COLS):
             print(f"[AVISO] Colunas faltando no CSV de métricas em {folder}")
-            continue
+            return None, [], []
 
-        if df.empty or df[TARGET_COLS].dropna(how="all").empty:
+        if df.empty or df[METRIC_COLS].dropna(how="all").empty:
             print(f"[AVISO] CSV de métricas vazio em {folder}")
-            continue
+            return None, [], []
 
         stats = {}
 
-        # Total de classes
-        stats["total_classes"] = int(df[TARGET_COLS].dropna(how="all").shape[0])
+        # Total de classes (analisadas: numa amostra, só as dos arquivos sorteados)
+        stats["total_classes"] = int(df[METRIC_COLS].dropna(how="all").shape[0])
+        stats["sample_fraction"] = fraction
 
-        # Estatísticas CK
+        # Estatísticas CK: uma passada por coluna (stats_kernel.py), com os mesmos
+        # valores que mean/median/mode/std/min/max/quantile do pandas
+        summary, matrix = describe_frame(df, METRIC_COLS,
+                                         thresholds={col: [t] for col, t in THRESHOLDS.items()})
         for col in TARGET_COLS:
-            stats[f"{col}_mean"] = df[col].mean() # média
-            stats[f"{col}_median"] = df[col].median() # mediana
-            stats[f"{col}_mode"] = df[col].mode().iloc[0] # moda
-            stats[f"{col}_std"] = df[col].std() # desvio padrão
-            stats[f"{col}_min"] = df[col].min() # mínimo
-            stats[f"{col}_max"] = df[col].max() # máximo
-            stats[f"{col}_p90"] = df[col].quantile(0.9) # percentil 90 (serve para entender a cauda da distribuição, que seria o "pico" dos valores mais altos)
-
+            if col not in summary:
+                # Métrica que a origem não calcula (LCOM no fastpath)
+                for key in ("mean", "median", "mode", "std", "min", "max", "p90", "outlier_pct"):
+                    stats[f"{col}_{key}"] = None
+                continue
+            col_stats = summary[col]
+            if col_stats["mode"] is None:
+                raise ValueError(f"coluna '{col}' sem valores")
+            stats[f"{col}_mean"] = col_stats["mean"] # média
+            stats[f"{col}_median"] = col_stats["median"] # mediana
+            stats[f"{col}_mode"] = col_stats["mode"] # moda
+            stats[f"{col}_std"] = col_stats["std"] # desvio padrão
+            stats[f"{col}_min"] = col_stats["min"] # mínimo
+            stats[f"{col}_max"] = col_stats["max"] # máximo
+            stats[f"{col}_p90"] = col_stats["quantile"] # percentil 90 (serve para entender a cauda da distribuição, que seria o "pico" dos valores mais altos)
             # % outliers (|z| > 2): serve para identificar classes que estão acima de 2 desvios padrão da média
-            if df[col].std(ddof=0) != 0:
-                zscores = (df[col] - df[col].mean()) / df[col].std(ddof=0)
-                stats[f"{col}_outlier_pct"] = (abs(zscores) > 2).mean() * 100
-            else:
-                stats[f"{col}_outlier_pct"] = 0.0
+            stats[f"{col}_outlier_pct"] = col_stats["outlier_pct"]
 
-        # Percentuais acima dos thresholds: classes críticas que passaram de thresholds conhecidos na literatura 
-        # (14 para CBO = alto acoplamento, 7 para DIT = herança muito profunda, 500 para LOC = candidata a God Class)
-        stats["pct_cbo_high"] = (df["cbo"] > 14).mean() * 100
-        stats["pct_dit_high"] = (df["dit"] > 7).mean() * 100
-        stats["pct_loc_high"] = (df["loc"] > 500).mean() * 100
+        # Percentuais acima dos thresholds
+        for col, threshold in THRESHOLDS.items():
+            stats[f"pct_{col}_high"] = summary[col][f"above_{threshold}"]
 
         # Comentários
-        if os.path.exists(comments_path):
-            df_comments = pd.read_csv(comments_path)
+        df_comments = read_ck_table(folder, comments_path, "comments_by_class", COMMENT_COLS, COMMENT_DTYPES)
+        if df_comments is not None:
             df_comments = df_comments[df_comments["class"] != "<file_level>"].copy()
 
             if not df_comments.empty:
@@ -93,19 +309,22 @@ for folder in os.listdir(BASE_DIR):
             stats["ratio_comment_lines_loc"] = None
             stats["mean_comment_lines_per_repo"] = None
 
+        # Métodos, campos e variáveis (lidos em blocos, memória limitada)
+        stats.update(summarize_members(folder, folder_path, DATASET_DIR))
+
         # Correlações (apenas entre TARGET_COLS: cbo, dit, loc, lcom)
-        corr_pearson = df[TARGET_COLS].corr(method="pearson")
-        corr_spearman = df[TARGET_COLS].corr(method="spearman")
+        corr_pearson, corr_spearman = correlation_matrices(matrix)
 
-        for i, col1 in enumerate(TARGET_COLS):
-            for col2 in TARGET_COLS[i+1:]:
+        for i, col1 in enumerate(METRIC_COLS):
+            for j in range(i + 1, len(METRIC_COLS)):
+                col2 = METRIC_COLS[j]
                 correlations.append({
                     "owner": folder.split("_", 1)[0] if "_" in folder else folder,
                     "repo": folder.split("_", 1)[1] if "_" in folder else "",
                     "metric_x": col1,
                     "metric_y": col2,
-                    "pearson": corr_pearson.loc[col1, col2],
-                    "spearman": corr_spearman.loc[col1, col2]
+                    "pearson": _plain(corr_pearson[i, j]),
+                    "spearman": _plain(corr_spearman[i, j])
                 })
 
         # Extrair owner/repo
@@ -115,87 +334,254 @@ for folder in os.listdir(BASE_DIR):
         else:
             owner, repo = format_folder_name, ""
 
-        results.append({
-            "owner": owner,
-            "repo": repo,
-            **stats
-        })
+        result = {"owner": owner, "repo": repo}
+        result.update({key: _plain(value) for key, value in stats.items()})
+        if sampled:
+            confidence = confidence_rows(owner, repo, df, result, fraction)
+        return result, correlations, confidence
 
     except Exception as e:
         print(f"[ERRO] Falha ao processar {folder}: {e}")
+        return None, [], []
 
-# DataFrames finais
-df_results = pd.DataFrame(results).dropna(how="all").round(3)
-df_corr = pd.DataFrame(correlations).round(3)
 
-rename_map = {
-    "total_classes": "Total_Classes",
+def list_repo_folders(base_dir=BASE_DIR):
+    return [folder for folder in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, folder))]
 
-    "cbo_mean": "CBO_Média",
-    "cbo_median": "CBO_Mediana",
-    "cbo_mode": "CBO_Moda",
-    "cbo_std": "CBO_DesvioPadrao",
-    "cbo_min": "CBO_Mínimo",
-    "cbo_max": "CBO_Máximo",
-    "cbo_p90": "CBO_P90",
-    "cbo_outlier_pct": "%CBO_Outliers",
 
-    "dit_mean": "DIT_Média",
-    "dit_median": "DIT_Mediana",
-    "dit_mode": "DIT_Moda",
-    "dit_std": "DIT_DesvioPadrao",
-    "dit_min": "DIT_Mínimo",
-    "dit_max": "DIT_Máximo",
-    "dit_p90": "DIT_P90",
-    "dit_outlier_pct": "%DIT_Outliers",
-
-    "loc_mean": "LOC_Média",
-    "loc_median": "LOC_Mediana",
-    "loc_mode": "LOC_Moda",
-    "loc_std": "LOC_DesvioPadrao",
-    "loc_min": "LOC_Mínimo",
-    "loc_max": "LOC_Máximo",
-    "loc_p90": "LOC_P90",
-    "loc_outlier_pct": "%LOC_Outliers",
-
-    "lcom_mean": "LCOM_Média",
-    "lcom_median": "LCOM_Mediana",
-    "lcom_mode": "LCOM_Moda",
-    "lcom_std": "LCOM_DesvioPadrao",
-    "lcom_min": "LCOM_Mínimo",
-    "lcom_max": "LCOM_Máximo",
-    "lcom_p90": "LCOM_P90",
-    "lcom_outlier_pct": "%LCOM_Outliers",
-
-    "pct_cbo_high": "%CBO_Acima_14",
-    "pct_dit_high": "%DIT_Acima_7",
-    "pct_loc_high": "%LOC_Acima_500",
-
-    "mean_comment_lines_per_class": "Média_Coment_Classe",
-    "ratio_comment_lines_loc": "Coment/LOC",
-    "mean_comment_lines_per_repo": "Média_Coment_Repo"
-}
-
-df_results.rename(columns=rename_map, inplace=True)
-
-ordered_cols = [
-    "owner", "repo", "Total_Classes",
-    "CBO_Média", "CBO_Mediana", "CBO_Moda", "CBO_DesvioPadrao", "CBO_Mínimo", "CBO_Máximo", "CBO_P90", "%CBO_Outliers", "%CBO_Acima_14",
-    "DIT_Média", "DIT_Mediana", "DIT_Moda", "DIT_DesvioPadrao", "DIT_Mínimo", "DIT_Máximo", "DIT_P90", "%DIT_Outliers", "%DIT_Acima_7",
-    "LOC_Média", "LOC_Mediana", "LOC_Moda", "LOC_DesvioPadrao", "LOC_Mínimo", "LOC_Máximo", "LOC_P90", "%LOC_Outliers", "%LOC_Acima_500",
-    "LCOM_Média", "LCOM_Mediana", "LCOM_Moda", "LCOM_DesvioPadrao", "LCOM_Mínimo", "LCOM_Máximo", "LCOM_P90", "%LCOM_Outliers",
-    "Média_Coment_Classe", "Coment/LOC", "Média_Coment_Repo"
-]
-
-df_results = df_results[ordered_cols]
-
-# Salvar arquivos
-df_results.to_csv("../results/metrics_results.csv", index=False)
-df_corr.to_csv("../results/metrics_correlations.csv", index=False)
+def _source_paths(folder):
+    """
+    Arquivos de onde o resumo de um repositório pode ser lido: os CSVs e as
+    partições Parquet de class, comments_by_class, method, field e variable,
+    e o manifesto (fração amostrada).
+    """
+    owner, repo = split_folder(folder)
+    folder_path = os.path.join(BASE_DIR, folder)
+    paths = {MANIFEST_FILE: os.path.join(folder_path, MANIFEST_FILE)}
+    for table in ("class", "comments_by_class") + MEMBER_TABLES:
+        paths[f"{table}.csv"] = os.path.join(folder_path, f"{table}.csv")
+        if DATASET_DIR:
+            paths[f"{table}.parquet"] = partition_path(DATASET_DIR, table, owner, repo)
+    return paths
 
-print(df_results)
-print("\n✅ Arquivos 'metrics_results.csv' e 'metrics_correlations.csv' gerados com sucesso!")
 
-end_time = time.time()
-elapsed_time = end_time - start_time
-print(f"Tempo total de execução: {elapsed_time:.2f} segundos")
\ No newline at end of file
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {"size": st.st_size, "mtime": st.st_mtime_ns}
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stats_unchanged(folder, fingerprint):
+    """
+    Verificação barata (só stat): tamanho e mtime de todas as entradas iguais
+    aos da impressão digital guardada.
+    """
+    if not fingerprint:
+        return False
+    for name, path in _source_paths(folder).items():
+        current, previous = _stat(path), fingerprint.get(name)
+        if current is None or previous is None:
+            if current is not previous:
+                return False
+        elif current["size"] != previous["size"] or current["mtime"] != previous["mtime"]:
+            return False
+    return True
+
+
+def repo_fingerprint(folder, previous=None):
+    """
+    {arquivo: {size, mtime, sha256}} das entradas do repositório (None para as
+    que não existem). O hash de um arquivo com mesmo tamanho e mtime da
+    impressão anterior é reaproveitado em vez de reler o arquivo.
+    """
+    previous = previous or {}
+    fingerprint = {}
+    for name, path in _source_paths(folder).items():
+        current = _stat(path)
+        if current is not None:
+            old = previous.get(name)
+            if old and old["size"] == current["size"] and old["mtime"] == current["mtime"]:
+                current["sha256"] = old["sha256"]
+            else:
+                current["sha256"] = _sha256(path)
+        fingerprint[name] = current
+    return fingerprint
+
+
+def _same_content(fingerprint, previous):
+    # Só o conteúdo importa: um arquivo regravado igual (outro mtime) não força recálculo
+    if not previous or fingerprint.keys() != previous.keys():
+        return False
+    for name, current in fingerprint.items():
+        old = previous[name]
+        if (current is None) != (old is None):
+            return False
+        if current is not None and current["sha256"] != old["sha256"]:
+            return False
+    return True
+
+
+def process_repo(task):
+    """
+    Roda no pool: recalcula o repositório, a não ser que o conteúdo das
+    entradas seja o mesmo da entrada em cache (`cached`, pode ser None).
+    Devolve (entrada para o cache, se foi recalculado).
+    """
+    folder, cached = task
+    fingerprint = repo_fingerprint(folder, cached and cached["fingerprint"])
+    if cached and _same_content(fingerprint, cached["fingerprint"]):
+        return dict(cached, fingerprint=fingerprint), False
+
+    result, correlations, confidence = summarize_repo(folder)
+    # Se o ck_metrics.py ainda estava gravando o repositório durante a leitura,
+    # o resumo pode não corresponder à impressão digital: não guarda nenhuma,
+    # e o repositório é recalculado na próxima execução
+    if not stats_unchanged(folder, fingerprint):
+        fingerprint = None
+    return {"folder": folder, "version": SUMMARY_VERSION, "fingerprint": fingerprint,
+            "result": result, "correlations": correlations, "confidence": confidence}, True
+
+
+def load_cache(cache_path=CACHE_PATH):
+    """
+    {pasta: entrada} da última agregação. Uma última linha truncada e entradas
+    de outra SUMMARY_VERSION são ignoradas.
+    """
+    cache = {}
+    if not os.path.exists(cache_path):
+        return cache
+    with open(cache_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("version") == SUMMARY_VERSION:
+                cache[entry["folder"]] = entry
+    return cache
+
+
+def aggregate(folders, workers, partial_path=PARTIAL_PATH, cache=None, source="ck"):
+    """
+    Calcula as estatísticas de cada repositório em um pool de processos e grava
+    cada resultado no arquivo parcial assim que fica pronto (na ordem de
+    `folders`): em memória fica no máximo um repositório por worker.
+    Repositórios do `cache` cujas entradas não mudaram (mesmo tamanho e mtime)
+    são copiados sem passar pelo pool; os demais conferem o hash do conteúdo
+    antes de recalcular. Retorna (reaproveitados, recalculados).
+    """
+    cache = cache or {}
+    tasks = []
+    for folder in folders:
+        cached = cache.get(folder)
+        if cached and stats_unchanged(folder, cached["fingerprint"]):
+            tasks.append(cached)
+        else:
+            tasks.append((folder, cached))
+    pending = [task for task in tasks if isinstance(task, tuple)]
+
+    reused = recomputed = 0
+    with open(partial_path, "w", encoding="utf-8") as partial:
+        if workers > 1 and len(pending) > 1:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=configure, initargs=(source,))
+            processed = executor.map(process_repo, pending)
+        else:
+            executor = None
+            processed = map(process_repo, pending)
+        try:
+            for task in tasks:
+                if isinstance(task, tuple):
+                    entry, changed = next(processed)
+                else:
+                    entry, changed = task, False
+                recomputed += changed
+                reused += not changed
+                partial.write(json.dumps(entry) + "\n")
+                partial.flush()
+        finally:
+            if executor:
+                executor.shutdown()
+    return reused, recomputed
+
+
+def write_outputs(partial_path=PARTIAL_PATH, results_csv=RESULTS_CSV, correlations_csv=CORRELATIONS_CSV,
+                  confidence_csv=CONFIDENCE_CSV):
+    """
+    Monta metrics_results.csv e metrics_correlations.csv a partir do arquivo
+    parcial, com a mesma formatação de sempre (arredondamento, nomes e ordem das colunas),
+    e metrics_confidence.csv quando algum repositório foi analisado por amostra.
+    """
+    results = []
+    correlations = []
+    confidence = []
+    with open(partial_path, "r", encoding="utf-8") as partial:
+        for line in partial:
+            entry = json.loads(line)
+            if entry["result"] is not None:
+                results.append(entry["result"])
+            correlations.extend(entry["correlations"])
+            confidence.extend(entry["confidence"])
+
+    # DataFrames finais
+    df_results = pd.DataFrame(results).dropna(how="all").round(3)
+    df_corr = pd.DataFrame(correlations).round(3)
+
+    df_results.rename(columns=rename_map, inplace=True)
+    df_results = df_results[ordered_cols]
+
+    # Salvar arquivos
+    df_results.to_csv(results_csv, index=False)
+    df_corr.to_csv(correlations_csv, index=False)
+    if confidence:
+        pd.DataFrame(confidence).round(3).to_csv(confidence_csv, index=False)
+    elif os.path.exists(confidence_csv):
+        # Nenhum repositório amostrado nesta agregação: não deixa intervalos velhos
+        os.remove(confidence_csv)
+    return df_results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Agrega as métricas CK de ck_output por repositório")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processos que leem e resumem os repositórios em paralelo")
+    parser.add_argument("--full", action="store_true",
+                        help="ignora o cache e recalcula todos os repositórios")
+    parser.add_argument("--source", choices=list(SOURCES), default="ck",
+                        help="ck: saídas do CK (ck_output); fastpath: análise rápida sem o CK "
+                             "(ck_fast_output, gera metrics_results_fastpath.csv)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start_time = time.time()
+
+    configure(args.source)
+    cache = {} if args.full else load_cache(CACHE_PATH)
+    reused, recomputed = aggregate(list_repo_folders(BASE_DIR), max(1, args.workers), PARTIAL_PATH,
+                                   cache=cache, source=args.source)
+    print(f"[+] {recomputed} repositório(s) recalculado(s), {reused} reaproveitado(s) do cache")
+    df_results = write_outputs(PARTIAL_PATH, RESULTS_CSV, CORRELATIONS_CSV, CONFIDENCE_CSV)
+    # O arquivo parcial completo vira o cache da próxima execução
+    os.replace(PARTIAL_PATH, CACHE_PATH)
+
+    print(df_results)
+    print(f"\n✅ Arquivos '{os.path.basename(RESULTS_CSV)}' e '{os.path.basename(CORRELATIONS_CSV)}' gerados com sucesso!")
+
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+    print(f"Tempo total de execução: {elapsed_time:.2f} segundos")
+
+
+if __name__ == "__main__":
+    main()
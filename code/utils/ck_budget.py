@@ -0,0 +1,108 @@
+import os
+import time
+import subprocess
+import tempfile
+
+# Limites do orçamento adaptativo do CK
+MIN_TIMEOUT = 60           # segundos
+MAX_TIMEOUT = 3600
+SECONDS_PER_FILE = 0.25
+MIN_HEAP_MB = 512
+MAX_HEAP_MB = 8192
+HEAP_MB_PER_FILE = 0.25
+LARGE_REPO_FILES = 5000    # acima disso o CK analisa em partições explícitas
+BYTES_PER_JAVA_FILE = 4000  # estimativa usada quando ainda não há contagem de arquivos
+
+POLL_INTERVAL = 0.2
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def count_java_files(repo_dir):
+    total = 0
+    for _, _, files in os.walk(repo_dir):
+        total += sum(1 for name in files if name.endswith(".java"))
+    return total
+
+
+def plan_ck_budget(java_files=None, size_bytes=None, commits_count=None, max_heap_mb=MAX_HEAP_MB):
+    """
+    Escolhe timeout, heap (-Xmx) e max files per partition para um repositório.
+    A base é a quantidade de arquivos .java (contada após a extração); sem ela,
+    estima a partir de size_bytes (bytes de código coletados por main.py).
+    commits_count não entra na conta, apenas é registrado para calibração.
+    """
+    if java_files is None:
+        java_files = int((size_bytes or 0) / BYTES_PER_JAVA_FILE)
+
+    timeout = int(_clamp(MIN_TIMEOUT + SECONDS_PER_FILE * java_files, MIN_TIMEOUT, MAX_TIMEOUT))
+    heap_mb = int(_clamp(MIN_HEAP_MB + HEAP_MB_PER_FILE * java_files, MIN_HEAP_MB, max_heap_mb))
+    # 0 = o CK decide pela memória livre; repositórios grandes usam partições fixas
+    max_files = 0
+    if java_files > LARGE_REPO_FILES:
+        max_files = int(_clamp(heap_mb // 2, 500, LARGE_REPO_FILES))
+
+    return {
+        "timeout_s": timeout,
+        "xmx_mb": heap_mb,
+        "max_files_per_partition": max_files,
+        "java_files": java_files,
+        "size_bytes": size_bytes,
+        "commits_count": commits_count,
+    }
+
+
+def run_measured(cmd, timeout):
+    """
+    Executa cmd esperando no máximo `timeout` segundos e mede o pico de memória
+    (RSS) do processo filho. Retorna dict com returncode, stderr, timed_out,
+    wall_time_s, peak_rss_kb e cpu_time_s (usuário + sistema do filho); os dois
+    últimos são None onde os.wait4 não existe (ex.: Windows).
+    """
+    start = time.time()
+    # stderr vai para um arquivo temporário para o filho não travar com o pipe cheio
+    with open(os.devnull, "w") as devnull, \
+            tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as stderr_file:
+        process = subprocess.Popen(cmd, stdout=devnull, stderr=stderr_file)
+        timed_out = False
+        peak_rss_kb = cpu_time_s = None
+
+        if hasattr(os, "wait4"):
+            while True:
+                pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+                if pid:
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    peak_rss_kb = usage.ru_maxrss  # KB no Linux
+                    cpu_time_s = usage.ru_utime + usage.ru_stime
+                    break
+                if time.time() - start > timeout:
+                    timed_out = True
+                    process.kill()
+                    _, status, usage = os.wait4(process.pid, 0)
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    peak_rss_kb = usage.ru_maxrss
+                    cpu_time_s = usage.ru_utime + usage.ru_stime
+                    break
+                time.sleep(POLL_INTERVAL)
+        else:
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                process.kill()
+                process.wait()
+
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+
+    return {
+        "returncode": process.returncode,
+        "stderr": stderr,
+        "timed_out": timed_out,
+        "wall_time_s": round(time.time() - start, 2),
+        "peak_rss_kb": peak_rss_kb,
+        "cpu_time_s": round(cpu_time_s, 2) if cpu_time_s is not None else None,
+    }
+
@@ -0,0 +1,188 @@
+import os
+import queue
+import subprocess
+import threading
+from collections import deque
+
+DRIVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ck_driver")
+DRIVER_SOURCE = os.path.join(DRIVER_DIR, "CKDriver.java")
+DRIVER_BUILD_DIR = os.path.join(DRIVER_DIR, "build")
+DRIVER_CLASS = "CKDriver"
+PROTOCOL_PREFIX = "@@CKDRIVER "
+STARTUP_TIMEOUT = 120
+
+
+class CKWorkerError(Exception):
+    pass
+
+
+def build_driver(ck_jar_path):
+    """
+    Compila ck_driver/CKDriver.java contra o JAR do CK (somente se o .class
+    não existir ou estiver mais velho que o fonte/JAR).
+    """
+    class_file = os.path.join(DRIVER_BUILD_DIR, f"{DRIVER_CLASS}.class")
+    newest_input = max(os.path.getmtime(DRIVER_SOURCE), os.path.getmtime(ck_jar_path))
+    if os.path.exists(class_file) and os.path.getmtime(class_file) >= newest_input:
+        return DRIVER_BUILD_DIR
+
+    os.makedirs(DRIVER_BUILD_DIR, exist_ok=True)
+    print(f"[+] Compilando {DRIVER_SOURCE} ...")
+    result = subprocess.run(
+        ["javac", "-cp", ck_jar_path, "-d", DRIVER_BUILD_DIR, DRIVER_SOURCE],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise CKWorkerError(f"Falha ao compilar o driver do CK: {result.stderr}")
+    return DRIVER_BUILD_DIR
+
+
+class CKWorker:
+    """
+    Uma JVM de longa duração rodando o CKDriver. Cada chamada a run() envia um
+    repositório pelo stdin e espera a resposta do protocolo no stdout.
+    Em timeout ou queda do processo a JVM é encerrada e recriada na próxima chamada.
+    """
+    def __init__(self, ck_jar_path, jvm_args=None):
+        self.ck_jar_path = ck_jar_path
+        self.jvm_args = list(jvm_args or [])
+        self.process = None
+        self.repos_served = 0
+        self._replies = None
+        self._stderr_tail = deque(maxlen=50)
+
+    def _start(self):
+        classpath = os.pathsep.join([os.path.abspath(self.ck_jar_path), DRIVER_BUILD_DIR])
+        cmd = ['java', *self.jvm_args, '-cp', classpath, DRIVER_CLASS]
+        self.process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace", bufsize=1
+        )
+        self.repos_served = 0
+        self._replies = queue.Queue()
+        self._stderr_tail.clear()
+        threading.Thread(target=self._read_stdout, args=(self.process, self._replies), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self.process,), daemon=True).start()
+
+        try:
+            reply = self._wait_reply(STARTUP_TIMEOUT)
+            if reply != "READY":
+                raise CKWorkerError(f"Driver do CK não iniciou: {reply}")
+        except Exception:
+            # Sem o READY a JVM não pode ficar viva: a próxima chamada a run()
+            # mandaria trabalho para ela e leria um READY atrasado como resposta
+            self.stop(force=True)
+            raise
+
+    @staticmethod
+    def _read_stdout(process, replies):
+        # Linhas sem o prefixo são log do próprio CK e são descartadas
+        for line in process.stdout:
+            if line.startswith(PROTOCOL_PREFIX):
+                replies.put(line[len(PROTOCOL_PREFIX):].rstrip("\n"))
+        replies.put(None)
+
+    def _read_stderr(self, process):
+        for line in process.stderr:
+            self._stderr_tail.append(line.rstrip("\n"))
+
+    def _wait_reply(self, timeout):
+        try:
+            reply = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            raise subprocess.TimeoutExpired("CKDriver", timeout)
+        if reply is None:
+            raise CKWorkerError("JVM do CK encerrou inesperadamente: " + " | ".join(self._stderr_tail))
+        return reply
+
+    def run(self, repo_dir, output_dir, options, timeout):
+        """
+        Analisa repo_dir gravando os CSVs em output_dir (mesmo contrato do
+        `java -jar ck.jar`). Retorna (classes, pico de RSS em KB); levanta
+        subprocess.TimeoutExpired ou CKWorkerError em caso de falha.
+        """
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+
+        request = "\t".join([
+            os.path.abspath(repo_dir),
+            os.path.abspath(output_dir) + os.sep,
+            str(options["use_jars"]).lower(),
+            str(options["max_files_per_partition"]),
+            str(options["variables_and_fields"]).lower(),
+        ])
+        try:
+            self.process.stdin.write(request + "\n")
+            self.process.stdin.flush()
+            reply = self._wait_reply(timeout)
+        except Exception:
+            # JVM em estado desconhecido (timeout, pipe quebrado...): descarta
+            self.stop(force=True)
+            raise
+
+        self.repos_served += 1
+        status, _, rest = reply.partition("\t")
+        if status == "OK":
+            return int(rest.split("\t")[-1]), self.peak_rss_kb()
+        raise CKWorkerError(rest)
+
+    def peak_rss_kb(self):
+        """
+        Pico de memória (VmHWM) da JVM desde que ela subiu (apenas Linux).
+        """
+        if self.process is None:
+            return None
+        try:
+            with open(f"/proc/{self.process.pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return None
+
+    def stop(self, force=False):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        try:
+            if force:
+                self.process.kill()
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+
+class CKWorkerPool:
+    """
+    Pool de JVMs do CK reaproveitadas entre repositórios. acquire()/release()
+    emprestam um worker para a thread que está rodando o estágio de CK.
+    """
+    def __init__(self, ck_jar_path, size, jvm_args=None):
+        build_driver(ck_jar_path)
+        self.workers = [CKWorker(ck_jar_path, jvm_args) for _ in range(max(1, size))]
+        self._free = queue.Queue()
+        for worker in self.workers:
+            self._free.put(worker)
+
+    def acquire(self):
+        return self._free.get()
+
+    def release(self, worker):
+        self._free.put(worker)
+
+    def run(self, repo_dir, output_dir, options, timeout):
+        worker = self.acquire()
+        try:
+            return worker.run(repo_dir, output_dir, options, timeout)
+        finally:
+            self.release(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
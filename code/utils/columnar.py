@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Dataset colunar com as saídas do CK, particionado por repositório:
+#   <dataset>/<tabela>/owner=<owner>/repo=<repo>/part-0.parquet
+# Converter (a partir de code/utils/):  python columnar.py [--remove-csv]
+BASE_DIR = "../ck_output"
+DATASET_DIR = "../ck_dataset"
+CK_TABLES = ("class", "method", "field", "variable", "comments_by_class")
+PARQUET_FILE = "part-0.parquet"
+COMPRESSION = "zstd"
+
+
+def available():
+    return pq is not None
+
+
+def split_folder(folder):
+    """
+    Pasta de saída do CK (<owner>_<name>) → (owner, repo). Logins do GitHub
+    não têm '_', então o primeiro '_' separa os dois.
+    """
+    if "_" in folder:
+        owner, repo = folder.split("_", 1)
+        return owner, repo
+    return folder, ""
+
+
+def partition_path(dataset_dir, table, owner, repo):
+    return os.path.join(dataset_dir, table, f"owner={owner}", f"repo={repo}", PARQUET_FILE)
+
+
+def _to_arrow(df):
+    # Colunas de texto (file, class, method, type...) se repetem em quase todas
+    # as linhas: viram dicionário; as numéricas ficam com o tipo inferido
+    for col in df.columns:
+        if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def convert_ck_output(output_dir, dataset_dir=DATASET_DIR, owner=None, repo=None, remove_csv=False):
+    """
+    Converte os CSVs do CK de um repositório (class, method, field, variable e
+    comments_by_class) para Parquet na partição owner/repo do dataset.
+    Tabelas cujo Parquet já é mais novo que o CSV são mantidas.
+    Retorna (bytes em CSV, bytes em Parquet) das tabelas convertidas.
+    """
+    if not available():
+        raise RuntimeError("pyarrow não instalado: pip install pyarrow")
+    if owner is None:
+        owner, repo = split_folder(os.path.basename(os.path.normpath(output_dir)))
+
+    csv_bytes = parquet_bytes = 0
+    for table in CK_TABLES:
+        csv_path = os.path.join(output_dir, f"{table}.csv")
+        if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+            continue
+        out_path = partition_path(dataset_dir, table, owner, repo)
+        if not (os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(csv_path)):
+            df = pd.read_csv(csv_path, encoding="utf-8", encoding_errors="ignore", low_memory=False)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            tmp_path = out_path + ".tmp"
+            pq.write_table(_to_arrow(df), tmp_path, compression=COMPRESSION)
+            os.replace(tmp_path, out_path)
+
+        csv_bytes += os.path.getsize(csv_path)
+        parquet_bytes += os.path.getsize(out_path)
+        if remove_csv:
+            os.remove(csv_path)
+    return csv_bytes, parquet_bytes
+
+
+def has_table(dataset_dir, table, owner, repo):
+    return available() and os.path.exists(partition_path(dataset_dir, table, owner, repo))
+
+
+def partition_is_current(dataset_dir, table, owner, repo, csv_path):
+    """
+    True se a partição existe e não é mais velha que o CSV (ou o CSV não existe):
+    nesse caso ela pode ser lida no lugar do CSV.
+    """
+    if not has_table(dataset_dir, table, owner, repo):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(partition_path(dataset_dir, table, owner, repo)) >= os.path.getmtime(csv_path)
+
+
+def _selected_names(path, columns):
+    # Comparação sem diferenciar maiúsculas/espaços, como o analyzer faz com os CSVs
+    wanted = {c.strip().lower() for c in columns}
+    return [name for name in pq.read_schema(path).names if name.strip().lower() in wanted]
+
+
+def _plain_text(df):
+    # Dicionários voltam como texto comum, igual à leitura do CSV
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+
+def read_ck_columns(dataset_dir, table, owner, repo, columns):
+    """
+    Lê só as colunas pedidas de uma tabela do repositório.
+    """
+    path = partition_path(dataset_dir, table, owner, repo)
+    return _plain_text(pq.read_table(path, columns=_selected_names(path, columns)).to_pandas())
+
+
+def iter_ck_columns(dataset_dir, table, owner, repo, columns, batch_rows):
+    """
+    Como read_ck_columns, mas em DataFrames de até `batch_rows` linhas
+    (memória limitada para method/field/variable de repositórios grandes).
+    """
+    path = partition_path(dataset_dir, table, owner, repo)
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=_selected_names(path, columns)):
+        yield _plain_text(batch.to_pandas())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte as saídas do CK (ck_output) para um dataset Parquet")
+    parser.add_argument("--base-dir", default=BASE_DIR)
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    parser.add_argument("--remove-csv", action="store_true",
+                        help="apaga os CSVs depois de convertidos (o analyzer passa a ler só o Parquet)")
+    args = parser.parse_args()
+
+    if not available():
+        print("[!] pyarrow não instalado: pip install pyarrow")
+        sys.exit(1)
+
+    start_time = time.time()
+    total_csv = total_parquet = 0
+    for folder in sorted(os.listdir(args.base_dir)):
+        folder_path = os.path.join(args.base_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        try:
+            csv_bytes, parquet_bytes = convert_ck_output(folder_path, args.dataset_dir,
+                                                         remove_csv=args.remove_csv)
+        except Exception as e:
+            print(f"[!] Falha ao converter {folder}: {e}")
+            continue
+        total_csv += csv_bytes
+        total_parquet += parquet_bytes
+        print(f"[✓] {folder}: {csv_bytes / 1024 ** 2:.1f} MB CSV → {parquet_bytes / 1024 ** 2:.1f} MB Parquet")
+
+    ratio = total_csv / total_parquet if total_parquet else 0
+    print(f"\nTotal: {total_csv / 1024 ** 2:.1f} MB CSV → {total_parquet / 1024 ** 2:.1f} MB Parquet ({ratio:.1f}x menor)")
+    print(f"Tempo total de execução: {time.time() - start_time:.2f} segundos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import math
+import numpy as np
+
+# Modelo de custo por repositório para o ETA e a ordem da varredura do
+# ck_metrics.py. O tempo de um repositório varia três ordens de grandeza com o
+# tamanho do código, então a média dos tempos já vistos não serve para prever
+# os próximos (a lista vem ordenada por estrelas). O modelo é uma regressão em
+# escala log, refeita a cada repositório concluído:
+#     log(segundos) = b0 + b1·log(1 + size_bytes) + b2·log(1 + commits_count)
+# com o fator de smearing de Duan para voltar à escala de segundos sem viés.
+# Antes de MIN_SAMPLES repositórios vale a estimativa a priori (sobrecarga
+# fixa + bytes de código a uma vazão típica), usada só para ordenar a fila.
+MIN_SAMPLES = 5
+PRIOR_OVERHEAD_S = 5.0
+PRIOR_BYTES_PER_SECOND = 200 * 1024
+
+
+def _features(size_bytes, commits_count):
+    return [1.0, math.log1p(max(0, size_bytes or 0)), math.log1p(max(0, commits_count or 0))]
+
+
+class CostModel:
+    """
+    Tempo previsto (segundos) de um repositório a partir de size_bytes e
+    commits_count. observe() alimenta o ajuste com os tempos reais.
+    """
+    def __init__(self, min_samples=MIN_SAMPLES):
+        self.min_samples = min_samples
+        self.rows = []
+        self.targets = []
+        self.coef = None
+        self.smearing = 1.0
+
+    @property
+    def calibrated(self):
+        return self.coef is not None
+
+    def observe(self, size_bytes, commits_count, seconds):
+        self.rows.append(_features(size_bytes, commits_count))
+        self.targets.append(math.log(max(seconds, 0.01)))
+        if len(self.rows) >= self.min_samples:
+            self._fit()
+
+    def _fit(self):
+        X = np.array(self.rows)
+        y = np.array(self.targets)
+        # lstsq lida com colunas colineares (ex.: commits_count ausente em todos)
+        coef, *_ = np.linalg.lstsq(X, y, rcond=None)
+        residuals = y - X @ coef
+        self.coef = coef
+        self.smearing = float(np.exp(residuals).mean())
+
+    def predict(self, size_bytes, commits_count=None):
+        if self.coef is None:
+            return PRIOR_OVERHEAD_S + (size_bytes or 0) / PRIOR_BYTES_PER_SECOND
+        return float(np.exp(np.dot(self.coef, _features(size_bytes, commits_count)))) * self.smearing
+
+
+def largest_first(jobs, model):
+    """
+    Jobs em ordem decrescente de custo previsto: em modo paralelo, começar
+    pelos maiores evita que um repositório enorme fique sozinho no fim da
+    varredura (menor makespan). Empates mantêm a ordem original.
+    """
+    return sorted(jobs, key=lambda job: -model.predict(job["size_bytes"], job["commits_count"]))
+
+
+def schedule_eta(pending, running, workers):
+    """
+    Segundos até o fim da varredura: o trabalho restante previsto dividido
+    entre os workers, mas nunca menos que o maior repositório restante.
+    pending: custos previstos dos que não começaram; running: custos que
+    ainda faltam dos que estão em andamento.
+    """
+    remaining = list(pending) + list(running)
+    if not remaining:
+        return 0.0
+    return max(sum(remaining) / max(1, workers), max(remaining))
+
+
+def accuracy_summary(pairs):
+    """
+    Erro das previsões já conferidas ([(previsto, real)]): mediana do erro
+    relativo absoluto e mediana da razão real/previsto.
+    """
+    if not pairs:
+        return None
+    predicted = np.array([p for p, _ in pairs], dtype=np.float64)
+    actual = np.array([a for _, a in pairs], dtype=np.float64)
+    valid = predicted > 0
+    if not valid.any():
+        return None
+    ratio = actual[valid] / predicted[valid]
+    return {
+        "repos": int(valid.sum()),
+        "median_abs_pct_error": float(np.median(np.abs(ratio - 1)) * 100),
+        "median_ratio": float(np.median(ratio)),
+    }
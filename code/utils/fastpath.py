@@ -0,0 +1,323 @@
+import os
+import re
+import sys
+import time
+from itertools import accumulate
+import pandas as pd
+from utils.java_lexer import KEYWORDS_PATTERN, count_comments_by_type
+from utils.utils import COMMENT_FIELDS, write_comments_csv
+
+# Análise sem o CK: lê só o código-fonte e gera class.csv (e
+# comments_by_class.csv) no mesmo layout da saída do CK, com as colunas que
+# dá para calcular sintaticamente. Serve de primeira passada no corpus
+# inteiro (triagem); o CK continua sendo a fonte das métricas exatas.
+#   LOC: linhas com código entre a declaração e o '}' do tipo (sem linhas
+#        em branco nem só de comentário), como o LOC do CK
+#   DIT: 1 + profundidade do pai resolvido no repositório; pai externo
+#        (fora do repositório, exceto Object) conta como mais um nível
+#   CBO: tipos distintos referenciados (corpo, extends, implements) que são
+#        do repositório ou importados de fora do JDK (java.* e javax.* são
+#        ignorados, como no CK)
+# Classes anônimas não viram linhas: contam para o tipo que as contém.
+FASTPATH_VERSION = 2
+CLASS_COLUMNS = ["file", "class", "type", "cbo", "dit", "loc", "innerClassesQty"]
+JDK_PREFIXES = ("java.", "javax.")
+
+# Mesma ideia do TOKEN_RE de java_lexer.py: o prefixo pula palavras que não
+# interessam e pontuação; literais e comentários são consumidos inteiros.
+# Nomes com inicial maiúscula são as referências a tipos. Também aqui cada
+# passo do prefixo consome uma sequência inteira e a última alternativa sempre
+# casa, para não retroceder exponencialmente no fim do arquivo ou numa aspa
+# sem fechamento (sem a sintaxe possessiva do Python 3.11); "record" e
+# palavras reservadas seguem as mesmas regras de declaração do TOKEN_RE.
+OUTLINE_RE = re.compile(r'''
+    (?:[^"'/{}\w$@]+(?![^"'/{}\w$@])
+     | (?!(?:class|interface|enum|record|package|import)\b)[a-z_$\d][\w$]*(?![\w$])
+     | @(?!interface\b))*
+    (?:
+        (?P<literal>"""(?:\\.|[^\\])*?""" | "(?:\\.|[^"\\\n])*" | '(?:\\.|[^'\\\n])*')
+      | (?P<comment>//[^\r\n]* | /\*.*?\*/)
+      | (?P<package>package\s+(?P<package_name>[\w$.\s]+?)\s*;)
+      | (?P<import>import\s+(?P<static>static\s+)?(?P<import_name>[\w$.\s*]+?)\s*;)
+      | (?P<decl>(?P<annotation>@)?(?P<kind>class|interface|enum|record(?=\s+[\w$]+\s*[(<]))
+                 \s+(?!(?:%(keywords)s)\b)(?P<name>[A-Za-z_$][\w$]*))
+      | (?P<open>\{)
+      | (?P<close>\})
+      | (?P<ref>[A-Z][\w$]*)
+      | [\w$]+ | / | @ | ["'] | \Z
+    )
+''' % {"keywords": KEYWORDS_PATTERN}, re.DOTALL | re.VERBOSE)
+COMMENT_RE = re.compile(r'//[^\r\n]*|/\*.*?\*/', re.DOTALL)
+ANGLE_RE = re.compile(r'<[^<>]*>')
+PARENS_RE = re.compile(r'\([^()]*\)')
+HEADER_LIST_RE = {
+    "extends": re.compile(r'\bextends\s+(.*?)(?=\bimplements\b|\bpermits\b|$)', re.DOTALL),
+    "implements": re.compile(r'\bimplements\s+(.*?)(?=\bpermits\b|$)', re.DOTALL),
+}
+
+
+def _type_names(text):
+    # "a.b.Foo<X>, Bar" → ["a.b.Foo", "Bar"] (sem argumentos genéricos)
+    return [name for name in ("".join(part.split()) for part in text.split(",")) if name]
+
+
+def parse_header(header):
+    """
+    Trecho entre o nome do tipo e o '{': parâmetros de tipo, extends e implements.
+    """
+    header = COMMENT_RE.sub(" ", header)
+    type_params = set()
+    stripped = header.lstrip()
+    if stripped.startswith("<"):
+        depth = 0
+        for i, ch in enumerate(stripped):
+            depth += (ch == "<") - (ch == ">")
+            if depth == 0:
+                params = ANGLE_RE.sub("", stripped[1:i]) if i else ""
+                type_params = {p.split()[0] for p in params.split(",") if p.split()}
+                break
+    # Remove argumentos genéricos (e os componentes de um record) antes de ler as listas
+    previous = None
+    while previous != header:
+        previous, header = header, PARENS_RE.sub(" ", ANGLE_RE.sub(" ", header))
+    lists = {}
+    for key, pattern in HEADER_LIST_RE.items():
+        m = pattern.search(header)
+        lists[key] = _type_names(m.group(1)) if m else []
+    return type_params, lists["extends"], lists["implements"]
+
+
+def outline_java(content):
+    """
+    Tipos declarados em um arquivo .java (uma passada de OUTLINE_RE), com os
+    nomes no formato da coluna `class` do CK (pacote.Outer$Inner).
+    Retorna (pacote, imports {nome simples: nome qualificado}, imports com '*',
+    lista de tipos). Cada tipo é um dict com name, kind, parent, start/end
+    (linhas), extends, implements, type_params, refs e inner.
+    """
+    package = None
+    imports = {}
+    wildcards = []
+    types = []
+    scopes = []       # tipo dono de cada '{' aberto (None fora de qualquer tipo)
+    pending = None    # tipo declarado cujo '{' ainda não apareceu
+    comment_spans = []
+    line, last = 1, 0
+
+    for m in OUTLINE_RE.finditer(content):
+        kind = m.lastgroup
+        if kind is None or kind == "literal":
+            continue
+        if kind == "comment":
+            comment_spans.append((m.start(kind), m.end(kind)))
+        elif kind == "ref":
+            owner = pending or (scopes[-1] if scopes else None)
+            if owner is not None:
+                owner["refs"].add(m.group(kind))
+        elif kind == "open":
+            outer = scopes[-1] if scopes else None
+            if pending is None:
+                scopes.append(outer)
+                continue
+            type_params, extends, implements = parse_header(content[pending.pop("header_start"):m.start(kind)])
+            pending.update(type_params=type_params, extends=extends, implements=implements)
+            if outer is not None:
+                pending["name"] = f"{outer['name']}${pending['simple']}"
+                pending["parent"] = outer["name"]
+                outer["inner"] += 1
+                if pending["kind"] == "class":
+                    pending["kind"] = "innerclass"
+            elif package:
+                pending["name"] = f"{package}.{pending['simple']}"
+            types.append(pending)
+            scopes.append(pending)
+            pending = None
+        elif kind == "close":
+            if scopes:
+                owner = scopes.pop()
+                if owner is not None and (not scopes or scopes[-1] is not owner):
+                    line += content.count("\n", last, m.start(kind))
+                    last = m.start(kind)
+                    owner["end"] = line
+        elif kind == "decl":
+            # "Foo.class" não é declaração
+            start = m.start(kind)
+            if content[start - 1:start] == ".":
+                continue
+            line += content.count("\n", last, start)
+            last = start
+            decl_kind = "annotation" if m.group("annotation") else m.group("kind")
+            simple = m.group("name")
+            pending = {"simple": simple, "name": simple, "kind": decl_kind, "parent": None,
+                       "start": line, "end": line, "refs": set(), "inner": 0,
+                       "header_start": m.end(kind)}
+        elif kind == "package":
+            if package is None and not scopes:
+                package = "".join(m.group("package_name").split())
+        elif kind == "import":
+            name = "".join(m.group("import_name").split())
+            if m.group("static"):
+                continue
+            if name.endswith(".*"):
+                wildcards.append(name[:-2])
+            else:
+                imports[name.rsplit(".", 1)[-1]] = name
+
+    return package, imports, wildcards, types, comment_spans
+
+
+def code_line_counts(content, comment_spans):
+    """
+    Soma acumulada de linhas com código (sem comentários e não vazias):
+    counts[n] = linhas de código entre a linha 1 e a linha n.
+    """
+    pieces = []
+    last = 0
+    for start, end in comment_spans:
+        pieces.append(content[last:start])
+        pieces.append("\n" * content.count("\n", start, end))
+        last = end
+    pieces.append(content[last:])
+    flags = [bool(text.strip()) for text in "".join(pieces).split("\n")]
+    return [0, *accumulate(flags)]
+
+
+class TypeIndex:
+    """
+    Tipos do repositório inteiro, para resolver nomes de extends/implements e
+    referências do corpo na ordem do compilador: tipos aninhados do escopo,
+    imports explícitos, mesmo pacote e imports com '*'.
+    """
+    def __init__(self, records):
+        self.by_name = {t["name"]: t for t in records}
+
+    def resolve(self, name, record):
+        if name in self.by_name:
+            return name
+        first, _, rest = name.partition(".")
+        scope = record["name"]
+        candidates = []
+        while scope:
+            candidates.append(f"{scope}${first}")
+            scope = self.by_name[scope]["parent"] if scope in self.by_name else None
+        if first in record["imports"]:
+            candidates.append(record["imports"][first])
+        if record["package"]:
+            candidates.append(f"{record['package']}.{first}")
+        candidates.extend(f"{w}.{first}" for w in record["wildcards"])
+        candidates.append(first)
+        for candidate in candidates:
+            if candidate in self.by_name:
+                # "Outer.Inner": o aninhado se ele existir, senão o de fora
+                nested = f"{candidate}${rest.replace('.', '$')}"
+                return nested if rest and nested in self.by_name else candidate
+        return None
+
+    def dit(self, record, seen=None):
+        if "dit" in record:
+            return record["dit"]
+        seen = seen or set()
+        seen.add(record["name"])
+        dit = 1
+        if record["kind"] in ("class", "innerclass") and record["extends"]:
+            parent = self.resolve(record["extends"][0], record)
+            if parent and parent not in seen:
+                dit = 1 + self.dit(self.by_name[parent], seen)
+            elif not parent and record["extends"][0].rsplit(".", 1)[-1] != "Object":
+                dit = 2
+        record["dit"] = dit
+        return dit
+
+    def cbo(self, record):
+        coupled = set()
+        names = set(record["refs"]) | set(record["extends"]) | set(record["implements"])
+        for name in names - record["type_params"]:
+            resolved = self.resolve(name, record)
+            if resolved:
+                coupled.add(resolved)
+            else:
+                first = name.split(".")[0]
+                qualified = record["imports"].get(first, name if "." in name else None)
+                if qualified and not qualified.startswith(JDK_PREFIXES):
+                    coupled.add(qualified)
+        coupled.discard(record["name"])
+        return len(coupled)
+
+
+def java_files(repo_dir):
+    for root, _, files in os.walk(repo_dir):
+        for name in files:
+            if name.endswith(".java"):
+                yield os.path.join(root, name)
+
+
+def analyze_repo(repo_dir, output_dir):
+    """
+    Gera output_dir/class.csv (colunas CLASS_COLUMNS) e
+    output_dir/comments_by_class.csv a partir dos .java de repo_dir.
+    Retorna {"class": caminho, "comments_by_class": caminho} ou None se não
+    houver nenhum tipo.
+    """
+    start = time.time()
+    records = []
+    comment_records = []
+    total_bytes = 0
+    files = 0
+    for path in java_files(repo_dir):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read()
+        except OSError as e:
+            print(f"[!] Não foi possível abrir {path}: {e}")
+            continue
+        files += 1
+        total_bytes += len(content)
+        package, imports, wildcards, types, comment_spans = outline_java(content)
+        counts = code_line_counts(content, comment_spans)
+        for record in types:
+            record.update(file=path, package=package, imports=imports, wildcards=wildcards,
+                          loc=counts[record["end"]] - counts[record["start"] - 1])
+        records.extend(types)
+        for cname, vals in count_comments_by_type(content).items():
+            comment_records.append((path, cname, *(vals[field] for field in COMMENT_FIELDS)))
+
+    if not records:
+        print(f"[!] Nenhuma classe encontrada em {repo_dir}")
+        return None
+
+    index = TypeIndex(records)
+    df_class = pd.DataFrame({
+        "file": [r["file"] for r in records],
+        "class": [r["name"] for r in records],
+        "type": [r["kind"] for r in records],
+        "cbo": [index.cbo(r) for r in records],
+        "dit": [index.dit(r) for r in records],
+        "loc": [r["loc"] for r in records],
+        "innerClassesQty": [r["inner"] for r in records],
+    }, columns=CLASS_COLUMNS)
+
+    os.makedirs(output_dir, exist_ok=True)
+    class_csv = os.path.join(output_dir, "class.csv")
+    df_class.to_csv(class_csv, index=False)
+    comments_csv = write_comments_csv(comment_records, df_class, output_dir)
+
+    elapsed = max(time.time() - start, 1e-6)
+    print(f"[✓] Análise rápida: {files} arquivos, {len(df_class)} tipos, "
+          f"{total_bytes / 1024 ** 2:.1f} MB em {elapsed:.2f}s")
+    paths = {"class": class_csv}
+    if comments_csv:
+        paths["comments_by_class"] = comments_csv
+    return paths
+
+
+def fastpath_info():
+    # Entra no manifesto no lugar da versão do JAR do CK
+    return {"engine": "fastpath", "fastpath_version": FASTPATH_VERSION}
+
+
+if __name__ == "__main__":
+    # Executar a partir de code/:  python -m utils.fastpath <repositório> <pasta de saída>
+    if len(sys.argv) != 3:
+        print("Uso: python -m utils.fastpath <repositório> <pasta de saída>")
+        sys.exit(1)
+    analyze_repo(sys.argv[1], sys.argv[2])
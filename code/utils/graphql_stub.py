@@ -0,0 +1,75 @@
+import sys
+import json
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidor GraphQL local que reproduz respostas gravadas pelo coletor.
+#
+# Gravação (uma vez, com token real):
+#   GITHUB_GRAPHQL_RECORD=gravacao.jsonl python main.py --max-repos 50
+# Reprodução (sem rede nem token de verdade):
+#   python utils/graphql_stub.py gravacao.jsonl --port 8787
+#   GITHUB_GRAPHQL_URL=http://127.0.0.1:8787/graphql GITHUB_TOKEN=stub python main.py --max-repos 50
+
+
+def request_key(query, variables):
+    """
+    Chave da requisição: query sem diferenças de espaço + variáveis ordenadas.
+    """
+    normalized = " ".join(query.split())
+    payload = json.dumps({"query": normalized, "variables": variables or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_recording(path):
+    responses = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                key = request_key(entry["query"], entry["variables"])
+                responses.setdefault(key, []).append((entry["status"], entry["response"]))
+    return responses
+
+
+def make_handler(responses):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            key = request_key(body.get("query", ""), body.get("variables"))
+
+            replies = responses.get(key)
+            if replies:
+                # Repete a sequência gravada (ex.: um 502 seguido de 200); a última resposta fica
+                status, payload = replies.pop(0) if len(replies) > 1 else replies[0]
+            else:
+                status, payload = 404, {"errors": [{"message": "requisição não gravada"}]}
+
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            sys.stderr.write("[stub] " + fmt % args + "\n")
+
+    return StubHandler
+
+
+def serve(recording_path, host="127.0.0.1", port=8787):
+    server = ThreadingHTTPServer((host, port), make_handler(load_recording(recording_path)))
+    print(f"[+] Stub GraphQL em http://{host}:{server.server_address[1]}/graphql ({recording_path})")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduz respostas GraphQL gravadas pelo coletor")
+    parser.add_argument("recording", help="arquivo JSONL gerado com GITHUB_GRAPHQL_RECORD")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    args = parser.parse_args()
+    serve(args.recording, args.host, args.port).serve_forever()
@@ -0,0 +1,127 @@
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+BACKOFF_FACTOR = 1.0
+BACKOFF_JITTER = 1.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Só GET/HEAD (downloads do ck_metrics.py) repetem em 429/5xx e erros de
+# leitura. O POST do GraphQL fica só com os retries de conexão: o loop de
+# make_graphql_request já repete esses status passando pelo RateLimiter, e um
+# retry aqui dormiria no Retry-After com a reserva de pontos ainda presa.
+RETRY_METHODS = frozenset({"GET", "HEAD"})
+
+_session = None
+_session_lock = threading.RLock()
+_stats = defaultdict(lambda: {"requests": 0, "errors": 0, "bytes": 0, "seconds": 0.0})
+_stats_lock = threading.Lock()
+
+
+def _build_retry(retries):
+    kwargs = dict(
+        total=retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,           # devolve a última resposta para quem chamou tratar
+    )
+    try:
+        return Retry(backoff_jitter=BACKOFF_JITTER, **kwargs)
+    except TypeError:
+        # urllib3 < 2 não tem jitter
+        return Retry(**kwargs)
+
+
+def _record_response(response, *args, **kwargs):
+    host = urlparse(response.url).hostname or "?"
+    with _stats_lock:
+        stats = _stats[host]
+        stats["requests"] += 1
+        stats["seconds"] += response.elapsed.total_seconds()
+        if response.status_code >= 400:
+            stats["errors"] += 1
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit():
+            stats["bytes"] += int(length)
+
+
+def count_stream_bytes(response, nbytes):
+    """
+    Contabiliza bytes de respostas em streaming sem Content-Length (ex.: ZIPs
+    do codeload.github.com, enviados em chunks).
+    """
+    if "Content-Length" in response.headers:
+        return
+    host = urlparse(response.url).hostname or "?"
+    with _stats_lock:
+        _stats[host]["bytes"] += nbytes
+
+
+def configure_http(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES):
+    """
+    (Re)cria a sessão HTTP compartilhada: keep-alive com pool de `pool_size`
+    conexões por host (use o número de workers), gzip e retries com jitter
+    que respeitam Retry-After (status 429/5xx só em RETRY_METHODS).
+    """
+    global _session
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=_build_retry(retries))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    session.hooks["response"].append(_record_response)
+    with _session_lock:
+        old, _session = _session, session
+    if old is not None:
+        old.close()
+    return session
+
+
+def get_session():
+    """
+    Sessão HTTP compartilhada por main.py e ck_metrics.py.
+    """
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                configure_http()
+    return _session
+
+
+def _connection_counts():
+    """
+    Conexões abertas e requisições por host, lidas dos pools do urllib3.
+    """
+    counts = defaultdict(lambda: [0, 0])
+    if _session is None:
+        return counts
+    for adapter in set(_session.adapters.values()):
+        pools = getattr(adapter.poolmanager, "pools", None)
+        for key in (list(pools.keys()) if pools is not None else []):
+            pool = pools.get(key)
+            if pool is not None:
+                counts[pool.host][0] += getattr(pool, "num_connections", 0)
+                counts[pool.host][1] += getattr(pool, "num_requests", 0)
+    return counts
+
+
+def print_http_stats():
+    with _stats_lock:
+        stats = {host: dict(values) for host, values in _stats.items()}
+    if not stats:
+        return
+    connections = _connection_counts()
+    print("\n=== HTTP por host ===")
+    for host, values in sorted(stats.items(), key=lambda kv: -kv[1]["requests"]):
+        opened = connections[host][0] if host in connections else "?"
+        avg = values["seconds"] / values["requests"] if values["requests"] else 0.0
+        print(f"{host}: {values['requests']} requisições, {opened} conexões abertas, "
+              f"{values['errors']} erros, {values['bytes'] / 1024 ** 2:.1f} MB, {avg:.2f}s em média")
@@ -0,0 +1,120 @@
+import re
+from collections import defaultdict
+
+FILE_LEVEL = "<file_level>"
+
+# Palavras reservadas e identificadores restritos (record, var, yield, sealed,
+# permits) não podem ser nome de tipo: "class"/"record" seguidos de uma delas
+# não são declaração (ex.: "if (record instanceof String)").
+JAVA_KEYWORDS = (
+    "abstract", "assert", "boolean", "break", "byte", "case", "catch", "char", "class", "const",
+    "continue", "default", "do", "double", "else", "enum", "extends", "final", "finally", "float",
+    "for", "goto", "if", "implements", "import", "instanceof", "int", "interface", "long", "native",
+    "new", "package", "private", "protected", "public", "return", "short", "static", "strictfp",
+    "super", "switch", "synchronized", "this", "throw", "throws", "transient", "try", "void",
+    "volatile", "while", "true", "false", "null", "var", "yield", "record", "sealed", "permits",
+)
+KEYWORDS_PATTERN = "|".join(JAVA_KEYWORDS)
+
+# Um único regex percorre o arquivo uma vez: literais (que podem conter "//",
+# "/*" e chaves) são consumidos inteiros, então nada dentro deles conta como
+# comentário, chave ou declaração. O prefixo pula de uma vez o texto sem
+# interesse (palavras inteiras e pontuação), para o loop em Python só ver
+# os tokens que importam. %(high)s inclui bytes não ASCII em identificadores
+# na versão em bytes (UTF-8 não decodificado).
+# Cada passo do prefixo consome uma sequência inteira (o lookahead impede que
+# ela seja dividida) e a última alternativa sempre casa (aspa solta, fim do
+# texto): sem isso, uma aspa sem fechamento ou linhas em branco no fim do
+# arquivo faziam o regex retroceder exponencialmente pelo prefixo. Não usa
+# quantificadores possessivos, que só existem a partir do Python 3.11.
+# "record" é palavra contextual: só é declaração quando vem seguido do nome e
+# de '(' ou '<' (record Ponto(int x, int y)); fora disso é um identificador.
+_TOKEN_PATTERN = r'''
+    (?:[^"'/{}\w$%(high)s]+(?![^"'/{}\w$%(high)s])
+     | (?!(?:class|interface|enum|record|package)\b)[\w$%(high)s]+(?![\w$%(high)s]))*
+    (?:
+        (?P<text_block>"""(?:\\.|[^\\])*?""")
+      | (?P<string>"(?:\\.|[^"\\\n])*")
+      | (?P<char>'(?:\\.|[^'\\\n])*')
+      | (?P<line_comment>//[^\r\n]*)
+      | (?P<block_comment>/\*.*?\*/)
+      | (?P<package>package\s+(?P<package_name>[\w$.\s%(high)s]+?)\s*;)
+      | (?P<decl>(?:class|interface|enum|record(?=\s+[\w$%(high)s]+\s*[(<]))
+                 \s+(?!(?:%(keywords)s)\b)(?P<name>[A-Za-z_$%(high)s][\w$%(high)s]*))
+      | (?P<open>\{)
+      | (?P<close>\})
+      | [\w$%(high)s]+ | / | ["'] | \Z
+    )
+'''
+TOKEN_RE = re.compile(_TOKEN_PATTERN % {"high": "", "keywords": KEYWORDS_PATTERN},
+                      re.DOTALL | re.VERBOSE)
+# Delimitadores de comentário, chaves e aspas são ASCII: dá para varrer os bytes
+# (inclusive um mmap) sem decodificar o arquivo
+BYTES_TOKEN_RE = re.compile(
+    (_TOKEN_PATTERN % {"high": r"\x80-\xff", "keywords": KEYWORDS_PATTERN}).encode("ascii"),
+    re.DOTALL | re.VERBOSE)
+
+
+def _new_counter():
+    return {"line_comments": 0, "block_comments": 0, "comment_lines": 0, "total_comments": 0}
+
+
+def count_comments_by_type(content):
+    """
+    Conta comentários de um arquivo .java por tipo (class/interface/enum/record)
+    em uma única passada. Cada '{' empilha o tipo mais interno daquele nível
+    (o tipo recém-declarado, ou o do nível de fora para blocos de método,
+    classes anônimas etc.), então o dono de um comentário é o topo da pilha.
+    Comentários fora de qualquer tipo vão para '<file_level>'.
+
+    Os nomes seguem a coluna `class` do CK: pacote + tipos aninhados separados
+    por '$' (com.exemplo.Outer$Inner). Classes anônimas não são separadas: seus
+    comentários contam para o tipo que as contém.
+    `content` pode ser str ou bytes/mmap; em bytes só os nomes dos tipos
+    são decodificados.
+    Retorna {nome qualificado do tipo: contadores}.
+    """
+    counters = defaultdict(_new_counter)
+    scopes = []
+    package = None
+    pending = None  # tipo declarado cujo '{' ainda não apareceu
+    is_text = isinstance(content, str)
+    token_re, dot, newline = (TOKEN_RE, ".", "\n") if is_text else (BYTES_TOKEN_RE, b".", b"\n")
+
+    for m in token_re.finditer(content):
+        kind = m.lastgroup
+        if kind == "open":
+            outer = scopes[-1] if scopes else None
+            if pending is None:
+                scopes.append(outer)
+            elif outer:
+                scopes.append(f"{outer}${pending}")
+            else:
+                scopes.append(f"{package}.{pending}" if package else pending)
+            pending = None
+        elif kind == "close":
+            if scopes:
+                scopes.pop()
+        elif kind == "package":
+            if package is None and not scopes:
+                name = m.group("package_name")
+                name = name if is_text else name.decode("utf-8", "ignore")
+                package = "".join(name.split())
+        elif kind == "decl":
+            # "Foo.class" não é declaração
+            start = m.start("decl")
+            if content[start - 1:start] != dot:
+                name = m.group("name")
+                pending = name if is_text else name.decode("utf-8", "ignore")
+        elif kind == "line_comment" or kind == "block_comment":
+            owner = scopes[-1] if scopes and scopes[-1] else FILE_LEVEL
+            counter = counters[owner]
+            if kind == "block_comment":
+                counter["block_comments"] += 1
+                counter["comment_lines"] += m.group(kind).count(newline) + 1
+            else:
+                counter["line_comments"] += 1
+                counter["comment_lines"] += 1
+            counter["total_comments"] += 1
+
+    return counters
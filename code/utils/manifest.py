@@ -0,0 +1,83 @@
+import os
+import re
+import json
+import hashlib
+from datetime import datetime, timezone
+
+MANIFEST_FILE = "run_manifest.json"
+
+
+def ck_jar_info(jar_path):
+    """
+    Identifica a versão do CK usada: versão tirada do nome do JAR
+    (ck-<versão>-jar-with-dependencies.jar) e SHA-256 do arquivo, já que
+    builds SNAPSHOT mudam sem mudar o nome.
+    """
+    match = re.search(r"ck-(.+?)-jar-with-dependencies\.jar$", os.path.basename(jar_path))
+    digest = hashlib.sha256()
+    with open(jar_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return {
+        "ck_version": match.group(1) if match else "desconhecida",
+        "ck_jar_sha256": digest.hexdigest(),
+    }
+
+
+def read_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(output_dir, owner, name, url, commit_sha, analysis_config, **extra):
+    """
+    Grava o manifesto da execução do CK para um diretório de saída:
+    de qual commit e com qual configuração de análise os CSVs foram gerados.
+    """
+    manifest = {
+        "owner": owner,
+        "name": name,
+        "url": url,
+        "commit_sha": commit_sha,
+        "analysis": analysis_config,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **extra,
+    }
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def sampling_matches(recorded, expected):
+    """
+    True se a amostra gravada no manifesto (`sampling` de write_manifest, ou
+    None para análise completa) foi feita com os parâmetros esperados para o
+    repositório ({"method", "fraction", "seed"} ou None).
+    """
+    if not expected:
+        return not recorded
+    return bool(recorded) and (
+        recorded.get("method") == expected["method"]
+        and recorded.get("requested_fraction") == expected["fraction"]
+        and recorded.get("seed") == expected["seed"]
+    )
+
+
+def manifest_is_current(manifest, commit_sha, analysis_config, sampling=None):
+    """
+    True se a saída foi gerada para o mesmo commit, com a mesma configuração e,
+    para repositórios amostrados, com os mesmos parâmetros de amostragem
+    (`sampling`; None = o repositório deve ser analisado inteiro).
+    Sem SHA conhecido não dá para garantir nada, então a saída é tida como velha;
+    uma saída marcada como incompleta (complete=False) também.
+    """
+    if not manifest or not commit_sha or manifest.get("complete") is False:
+        return False
+    return (manifest.get("commit_sha") == commit_sha and manifest.get("analysis") == analysis_config
+            and sampling_matches(manifest.get("sampling"), sampling))
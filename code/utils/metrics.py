@@ -1,4 +1,6 @@
 import pandas as pd
+import numpy as np
+from stats_kernel import describe_column, mean_ci, quantile_ci
 from scipy import stats
 from datetime import datetime, timezone
 
@@ -36,18 +38,31 @@ metricas = {
 # Função para extrair estatísticas
 def estatisticas(col):
     serie = df[col].dropna()
-    media = serie.mean()
-    mediana = serie.median()
-    moda = serie.mode().iloc[0] if not serie.mode().empty else None
-    desvio = serie.std()
-    minimo = serie.min()
-    maximo = serie.max()
-    return media, mediana, moda, desvio, minimo, maximo
+    # Uma ordenação só para mediana, moda, mínimo e máximo (stats_kernel.py)
+    s = describe_column(serie.to_numpy(dtype="float64"),
+                        integer=pd.api.types.is_integer_dtype(serie))
+    return s["mean"], s["median"], s["mode"], s["std"], s["min"], s["max"]
+
+# Intervalos de confiança de 95% da média e da mediana entre os repositórios.
+# A variação entre repositórios já inclui o erro dos que foram analisados por
+# amostra; os intervalos de cada um estão em metrics_confidence.csv.
+def intervalos(col):
+    valores = df[col].dropna().to_numpy(dtype="float64")
+    media_inf, media_sup, _ = mean_ci(valores)
+    mediana_inf, mediana_sup = quantile_ci(np.sort(valores), 0.5, len(valores))
+    return (media_inf, media_sup), (mediana_inf, mediana_sup)
+
+if 'Fração_Amostra' in df.columns and (df['Fração_Amostra'] < 1).any():
+    amostrados = df[df['Fração_Amostra'] < 1]
+    print(f"Repositórios analisados por amostra: {len(amostrados)}/{len(df)} "
+          f"(fração média {amostrados['Fração_Amostra'].mean():.0%}, ver metrics_confidence.csv)")
 
 # Extrai e imprime os valores para cada métrica
 for nome, coluna in metricas.items():
     if coluna and coluna in df.columns:
         X, Y, Z, A, B, C = estatisticas(coluna)
-        print(f"{nome}: Média={X:.2f}, Mediana={Y:.2f}, Moda={Z}, Desvio Padrão={A:.2f}, Mínimo={B}, Máximo={C}")
+        (X1, X2), (Y1, Y2) = intervalos(coluna)
+        print(f"{nome}: Média={X:.2f} (IC95% {X1:.2f}–{X2:.2f}), Mediana={Y:.2f} (IC95% {Y1:.2f}–{Y2:.2f}), "
+              f"Moda={Z}, Desvio Padrão={A:.2f}, Mínimo={B}, Máximo={C}")
     else:
         print(f"{nome}: coluna não encontrada ou requer cálculo manual.")
\ No newline at end of file
@@ -0,0 +1,117 @@
+import shutil
+import threading
+import queue
+
+# Marcador de fim de fluxo entre os estágios
+_DONE = object()
+
+
+class DiskBudget:
+    """
+    Controla quanto espaço em disco os repositórios em andamento podem ocupar.
+    acquire() bloqueia enquanto a reserva estourar o limite (ou o disco estiver
+    quase cheio), o que segura o prefetch de downloads. Uma reserva maior que o
+    limite total é liberada quando não houver mais nada em andamento, para que
+    repositórios gigantes ainda possam ser processados (sozinhos).
+    """
+    def __init__(self, max_bytes, path=".", min_free_bytes=0):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.min_free_bytes = min_free_bytes
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def _disk_has_room(self, nbytes):
+        if not self.min_free_bytes:
+            return True
+        try:
+            free = shutil.disk_usage(self.path).free
+        except OSError:
+            return True
+        return free - nbytes >= self.min_free_bytes
+
+    def acquire(self, nbytes):
+        with self._cond:
+            while self.used > 0 and (
+                self.used + nbytes > self.max_bytes or not self._disk_has_room(nbytes)
+            ):
+                # Timeout curto para reavaliar o espaço livre real do disco
+                self._cond.wait(timeout=5)
+            self.used += nbytes
+            return nbytes
+
+    def release(self, nbytes):
+        if not nbytes:
+            return
+        with self._cond:
+            self.used = max(0, self.used - nbytes)
+            self._cond.notify_all()
+
+
+class Stage:
+    """
+    Estágio do pipeline: `func(item)` roda em `workers` threads e devolve o item
+    para o próximo estágio (ou None para descartá-lo). A fila de entrada do
+    estágio tem tamanho `maxsize` (0 = ilimitada), o que gera backpressure.
+    """
+    def __init__(self, name, func, workers=1, maxsize=0):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+
+
+def run_pipeline(items, stages, on_error=None):
+    """
+    Executa os itens pelos estágios em sequência, cada estágio com seu próprio
+    pool de threads e fila limitada. on_error(stage_name, item, exc) é chamado
+    quando um estágio levanta exceção; o item é então descartado.
+    """
+    queues = [queue.Queue(maxsize=stage.maxsize) for stage in stages]
+    remaining = [stage.workers for stage in stages]
+    lock = threading.Lock()
+
+    def worker(i):
+        stage = stages[i]
+        in_q = queues[i]
+        out_q = queues[i + 1] if i + 1 < len(stages) else None
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                break
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                if on_error:
+                    try:
+                        on_error(stage.name, item, e)
+                    except Exception as handler_error:
+                        # Uma falha no tratamento não pode matar o worker: sem ele o
+                        # _DONE não chega ao próximo estágio e o pipeline trava
+                        print(f"[!] Erro ao tratar falha no estágio {stage.name}: {handler_error}")
+                continue
+            if result is not None and out_q is not None:
+                out_q.put(result)
+
+        # O último worker do estágio avisa o próximo estágio que acabou
+        with lock:
+            remaining[i] -= 1
+            last = remaining[i] == 0
+        if last and out_q is not None:
+            for _ in range(stages[i + 1].workers):
+                out_q.put(_DONE)
+
+    threads = []
+    for i, stage in enumerate(stages):
+        for n in range(stage.workers):
+            t = threading.Thread(target=worker, args=(i,), name=f"{stage.name}-{n}", daemon=True)
+            t.start()
+            threads.append(t)
+
+    for item in items:
+        queues[0].put(item)
+    for _ in range(stages[0].workers):
+        queues[0].put(_DONE)
+
+    for t in threads:
+        t.join()
@@ -0,0 +1,159 @@
+import os
+from collections import Counter
+import numpy as np
+import pandas as pd
+from columnar import DATASET_DIR, iter_ck_columns, partition_is_current, split_folder
+from stats_kernel import quantile_from_counts
+
+# Agregações por classe e por repositório de method.csv, field.csv e
+# variable.csv. Esses arquivos chegam a milhões de linhas em repositórios
+# grandes, então são lidos em blocos de CHUNK_ROWS linhas (do Parquet quando
+# ele está atualizado) e só acumuladores pequenos ficam em memória:
+# histogramas de valores inteiros, somas por classe e totais.
+CHUNK_ROWS = 200_000
+METHOD_COLS = ["class", "wmc", "parametersqty", "hasjavadoc"]
+FIELD_COLS = ["class", "variable", "usage"]
+VARIABLE_COLS = ["usage"]
+
+ROLLUP_KEYS = [
+    "total_methods",
+    "method_wmc_mean", "method_wmc_median", "method_wmc_p90",
+    "class_wmc_mean", "class_wmc_median", "class_wmc_p90",
+    "params_mean", "params_p90",
+    "pct_methods_javadoc",
+    "fields_per_class_mean", "field_usage_mean",
+    "variables_per_method_mean", "variable_usage_mean",
+]
+
+
+def iter_ck_chunks(folder, csv_path, table, columns, chunk_rows=CHUNK_ROWS, dataset_dir=DATASET_DIR):
+    """
+    Blocos de até `chunk_rows` linhas com as colunas pedidas de uma tabela do
+    CK (nomes em minúsculas, sem espaços). Não gera nada se a tabela não existir.
+    Com dataset_dir=None, só o CSV é lido.
+    """
+    owner, repo = split_folder(folder)
+    if dataset_dir and partition_is_current(dataset_dir, table, owner, repo, csv_path):
+        chunks = iter_ck_columns(dataset_dir, table, owner, repo, columns, chunk_rows)
+    elif os.path.exists(csv_path) and os.path.getsize(csv_path) > 0:
+        wanted = {c.strip().lower() for c in columns}
+        chunks = pd.read_csv(csv_path, usecols=lambda c: c.strip().lower() in wanted, chunksize=chunk_rows,
+                             encoding="utf-8", encoding_errors="ignore")
+    else:
+        return
+    for chunk in chunks:
+        chunk.columns = chunk.columns.str.strip().str.lower()
+        yield chunk
+
+
+class Histogram:
+    """
+    Contagem de cada valor de uma métrica inteira: média e quantis exatos com
+    memória proporcional ao número de valores distintos, não de linhas.
+    """
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, series):
+        self.counts.update(pd.to_numeric(series, errors="coerce").dropna().value_counts().to_dict())
+
+    def summary(self):
+        if not self.counts:
+            return None, None, None
+        keys = sorted(self.counts)
+        values = np.array(keys, dtype=np.float64)
+        counts = np.array([self.counts[v] for v in keys], dtype=np.int64)
+        mean = float((values * counts).sum() / counts.sum())
+        return mean, float(quantile_from_counts(values, counts, 0.5)), float(quantile_from_counts(values, counts, 0.9))
+
+
+def _is_true(series):
+    # hasJavaDoc vem como bool (CSV só com true/false) ou como texto
+    return series.astype(str).str.strip().str.lower() == "true"
+
+
+def method_rollups(folder, csv_path, dataset_dir=DATASET_DIR):
+    stats = {}
+    method_wmc = Histogram()
+    params = Histogram()
+    class_wmc = pd.Series(dtype="float64")
+    total = with_javadoc = 0
+
+    for chunk in iter_ck_chunks(folder, csv_path, "method", METHOD_COLS, dataset_dir=dataset_dir):
+        total += len(chunk)
+        if "wmc" in chunk.columns:
+            wmc = pd.to_numeric(chunk["wmc"], errors="coerce")
+            method_wmc.add(wmc)
+            if "class" in chunk.columns:
+                # WMC da classe = soma da complexidade ciclomática dos seus métodos
+                class_wmc = class_wmc.add(wmc.groupby(chunk["class"]).sum(), fill_value=0)
+        if "parametersqty" in chunk.columns:
+            params.add(chunk["parametersqty"])
+        if "hasjavadoc" in chunk.columns:
+            with_javadoc += int(_is_true(chunk["hasjavadoc"]).sum())
+
+    if total == 0:
+        return stats
+    stats["total_methods"] = total
+    stats["method_wmc_mean"], stats["method_wmc_median"], stats["method_wmc_p90"] = method_wmc.summary()
+    if not class_wmc.empty:
+        stats["class_wmc_mean"] = float(class_wmc.mean())
+        stats["class_wmc_median"] = float(class_wmc.median())
+        stats["class_wmc_p90"] = float(class_wmc.quantile(0.9))
+    stats["params_mean"], _, stats["params_p90"] = params.summary()
+    stats["pct_methods_javadoc"] = with_javadoc / total * 100
+    return stats
+
+
+def field_rollups(folder, csv_path, dataset_dir=DATASET_DIR):
+    # field.csv: uma linha por campo usado em cada método (class, method, variable, usage)
+    usage_by_field = None
+    for chunk in iter_ck_chunks(folder, csv_path, "field", FIELD_COLS, dataset_dir=dataset_dir):
+        if not {"class", "variable", "usage"} <= set(chunk.columns):
+            return {}
+        usage = pd.to_numeric(chunk["usage"], errors="coerce")
+        part = usage.groupby([chunk["class"], chunk["variable"]]).sum()
+        usage_by_field = part if usage_by_field is None else usage_by_field.add(part, fill_value=0)
+
+    if usage_by_field is None or usage_by_field.empty:
+        return {}
+    return {
+        "fields_per_class_mean": float(usage_by_field.groupby(level=0).size().mean()),
+        "field_usage_mean": float(usage_by_field.mean()),
+    }
+
+
+def variable_rollups(folder, csv_path, total_methods, dataset_dir=DATASET_DIR):
+    # variable.csv: uma linha por variável local de cada método
+    rows = 0
+    usage_total = 0.0
+    for chunk in iter_ck_chunks(folder, csv_path, "variable", VARIABLE_COLS, dataset_dir=dataset_dir):
+        rows += len(chunk)
+        if "usage" in chunk.columns:
+            usage_total += float(pd.to_numeric(chunk["usage"], errors="coerce").sum())
+
+    if rows == 0:
+        return {}
+    return {
+        "variables_per_method_mean": rows / total_methods if total_methods else None,
+        "variable_usage_mean": usage_total / rows,
+    }
+
+
+def summarize_members(folder, folder_path, dataset_dir=DATASET_DIR):
+    """
+    Colunas extras de metrics_results por repositório, a partir de method.csv,
+    field.csv e variable.csv (None quando a tabela não existe ou falha).
+    """
+    stats = dict.fromkeys(ROLLUP_KEYS)
+    steps = [
+        ("method.csv", lambda path: method_rollups(folder, path, dataset_dir)),
+        ("field.csv", lambda path: field_rollups(folder, path, dataset_dir)),
+        ("variable.csv", lambda path: variable_rollups(folder, path, stats["total_methods"], dataset_dir)),
+    ]
+    for name, rollup in steps:
+        try:
+            stats.update(rollup(os.path.join(folder_path, name)))
+        except Exception as e:
+            print(f"[AVISO] Falha ao agregar {name} em {folder}: {e}")
+    return stats
@@ -0,0 +1,93 @@
+import os
+import math
+import shutil
+import hashlib
+
+# Amostragem de arquivos .java para repositórios grandes demais para o CK
+# analisar inteiros. O sorteio é sistemático sobre a lista de arquivos
+# ordenada por pacote (diretório) e, dentro do pacote, por um hash com a
+# semente: todo arquivo tem a mesma probabilidade de entrar (a amostra se
+# pondera sozinha, então as estatísticas não precisam de pesos) e cada pacote
+# recebe uma parte proporcional ao seu tamanho (estratificação implícita).
+# Mesma semente e mesmos arquivos = mesma amostra.
+SAMPLE_METHOD = "systematic-by-package"
+
+
+def _hash_unit(*parts):
+    # Número em [0, 1) determinístico a partir das partes
+    digest = hashlib.sha256(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return int(digest[:13], 16) / float(1 << 52)
+
+
+def list_java_files(repo_dir):
+    """
+    {pacote (diretório relativo): [arquivos .java]} do repositório.
+    """
+    strata = {}
+    for root, dirs, files in os.walk(repo_dir):
+        dirs.sort()
+        java = sorted(name for name in files if name.endswith(".java"))
+        if java:
+            strata[os.path.relpath(root, repo_dir)] = java
+    return strata
+
+
+def select_files(strata, fraction, seed=0, key=""):
+    """
+    Caminhos relativos sorteados de `strata` (ver list_java_files) com
+    probabilidade `fraction` cada. `key` (ex.: owner/repo) muda o ponto de
+    partida entre repositórios com a mesma semente.
+    """
+    ordered = []
+    for package in sorted(strata):
+        files = sorted(strata[package], key=lambda name: _hash_unit(seed, package, name))
+        ordered.extend(os.path.join(package, name) for name in files)
+    if fraction >= 1:
+        return ordered
+    start = _hash_unit(seed, key)
+    # arquivo i entra quando floor(start + i·f) avança: intervalo de 1/f arquivos
+    return [path for i, path in enumerate(ordered)
+            if math.floor(start + (i + 1) * fraction) > math.floor(start + i * fraction)]
+
+
+def _link_or_copy(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def build_sample_tree(repo_dir, sample_dir, fraction, seed=0, key="", extra_suffixes=(".jar",)):
+    """
+    Monta em `sample_dir` uma árvore só com os arquivos sorteados (hard links
+    quando possível, senão cópias), preservando os caminhos relativos. Os
+    arquivos com `extra_suffixes` (os .jar usados pelo CK para resolver
+    tipos) entram todos. Retorna o registro da amostra para o manifesto.
+    """
+    strata = list_java_files(repo_dir)
+    files_total = sum(len(files) for files in strata.values())
+    selected = select_files(strata, fraction, seed, key)
+
+    if os.path.exists(sample_dir):
+        shutil.rmtree(sample_dir, ignore_errors=True)
+    os.makedirs(sample_dir, exist_ok=True)
+    for rel_path in selected:
+        _link_or_copy(os.path.join(repo_dir, rel_path), os.path.join(sample_dir, rel_path))
+    for root, _, files in os.walk(repo_dir):
+        for name in files:
+            if name.endswith(tuple(extra_suffixes)):
+                src = os.path.join(root, name)
+                _link_or_copy(src, os.path.join(sample_dir, os.path.relpath(src, repo_dir)))
+
+    return {
+        "method": SAMPLE_METHOD,
+        "seed": seed,
+        "requested_fraction": fraction,
+        # fração efetiva: a usada nos intervalos de confiança do analyzer
+        "fraction": len(selected) / files_total if files_total else 1.0,
+        "files_total": files_total,
+        "files_sampled": len(selected),
+        "packages_total": len(strata),
+        "packages_sampled": len({os.path.dirname(path) for path in selected}),
+    }
@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+
+INDEX_FILE = "index.json"
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class SnapshotCache:
+    """
+    Cache local de snapshots de repositórios, endereçado por
+    "owner/name@sha#variante". Como a chave inclui o commit, uma entrada nunca
+    fica desatualizada: se o repositório andou, a chave muda e ele é baixado de
+    novo. A variante diz quais arquivos a árvore tem ("full" ou, por exemplo,
+    "only.java.jar" na extração em fluxo).
+
+    As entradas são pastas já extraídas; quem usa uma entrada (lookup/store)
+    a mantém "presa" até chamar release(), para que a remoção LRU (por tamanho
+    total) não apague um snapshot que o CK ainda está lendo.
+    """
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evicted = 0
+        self._pins = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index = self._load_index()
+
+    @staticmethod
+    def make_key(owner, name, sha, variant="full"):
+        return f"{owner}/{name}@{sha}#{variant}"
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._-]", "_", key))
+
+    def _load_index(self):
+        index_path = os.path.join(self.root, INDEX_FILE)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Descarta entradas cuja pasta sumiu
+        return {k: v for k, v in index.items() if os.path.isdir(self._entry_dir(k))}
+
+    def _save_index(self):
+        index_path = os.path.join(self.root, INDEX_FILE)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, index_path)
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self._index.values())
+
+    def lookup(self, key):
+        """
+        Devolve a pasta do snapshot (e a prende) ou None em caso de miss.
+        """
+        return self.lookup_any([key])[1]
+
+    def lookup_any(self, keys):
+        """
+        Procura as chaves em ordem e devolve (chave, pasta) da primeira
+        encontrada (já presa) ou (None, None); conta um único hit ou miss.
+        """
+        with self._lock:
+            for key in keys:
+                entry = self._index.get(key)
+                if entry is None or not os.path.isdir(self._entry_dir(key)):
+                    self._index.pop(key, None)
+                    continue
+                entry["last_used"] = time.time()
+                self.hits += 1
+                # O acerto evita o download, não a extração
+                self.bytes_saved += entry.get("download_bytes", 0)
+                self._pins[key] = self._pins.get(key, 0) + 1
+                self._save_index()
+                return key, self._entry_dir(key)
+            self.misses += 1
+            return None, None
+
+    def store(self, key, src_dir, download_bytes=0):
+        """
+        Move src_dir para dentro do cache e devolve o novo caminho (já preso).
+        download_bytes: bytes baixados para obter a árvore, contados em
+        bytes_saved a cada acerto futuro.
+        """
+        target = self._entry_dir(key)
+        size = _dir_size(src_dir)
+        with self._lock:
+            if os.path.exists(target):
+                shutil.rmtree(target, ignore_errors=True)
+            shutil.move(src_dir, target)
+            self._index[key] = {"size": size, "download_bytes": download_bytes, "last_used": time.time()}
+            self._pins[key] = self._pins.get(key, 0) + 1
+            self._evict()
+            self._save_index()
+        return target
+
+    def release(self, key):
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """
+        Remove as entradas usadas há mais tempo até caber em max_bytes
+        (entradas presas nunca são removidas).
+        """
+        total = self.total_size()
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if self._pins.get(key):
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            del self._index[key]
+            total -= entry["size"]
+            self.evicted += 1
+
+    def print_stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        print("\n=== Cache de snapshots ===")
+        print(f"Hits: {self.hits} | Misses: {self.misses} | Taxa de acerto: {hit_rate:.1f}%")
+        print(f"Download evitado: {self.bytes_saved / 1024 ** 2:.1f} MB")
+        print(f"Entradas removidas (LRU): {self.evicted}")
+        print(f"Tamanho atual: {self.total_size() / 1024 ** 2:.1f} MB de {self.max_bytes / 1024 ** 2:.1f} MB")
@@ -0,0 +1,265 @@
+import numpy as np
+
+# Kernel de estatísticas descritivas usado pelo analyzer.py (por repositório) e
+# pelo metrics.py. Cada coluna é ordenada uma única vez; a ordenação serve
+# mediana, percentil, moda (maior sequência de valores iguais), mínimo e máximo.
+# Os postos da correlação de Spearman saem de um argsort por coluna. Os
+# resultados seguem as mesmas fórmulas do pandas (skipna, ddof=1, quantil
+# linear, menor valor entre as modas).
+
+# z da normal padrão para intervalos de confiança de 95%
+Z_95 = 1.959963984540054
+
+
+def _lerp(a, b, t):
+    # Mesma interpolação do np.quantile (método "linear")
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+def _quantile_sorted(sorted_values, q):
+    n = len(sorted_values)
+    virtual = (n - 1) * q
+    if virtual >= n - 1:
+        return sorted_values[-1]
+    lower = int(np.floor(virtual))
+    return _lerp(sorted_values[lower], sorted_values[lower + 1], virtual - lower)
+
+
+def quantile_from_counts(values, counts, q):
+    """
+    Quantil linear de uma distribuição dada como histograma (valores
+    ordenados e suas contagens), sem expandir as repetições: igual ao
+    np.quantile do vetor expandido.
+    """
+    ends = np.cumsum(counts)
+    n = ends[-1]
+    virtual = (n - 1) * q
+    lower = int(np.floor(virtual))
+    # posição p (0-based) do vetor expandido cai no primeiro valor com ends > p
+    a = values[np.searchsorted(ends, lower, side="right")]
+    if virtual >= n - 1:
+        return a
+    b = values[np.searchsorted(ends, lower + 1, side="right")]
+    return _lerp(a, b, virtual - lower)
+
+
+def _runs(sorted_values):
+    """
+    Início e tamanho de cada sequência de valores iguais de um vetor ordenado.
+    """
+    if len(sorted_values) == 0:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    change = np.flatnonzero(sorted_values[1:] != sorted_values[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    lengths = np.diff(np.concatenate((starts, [len(sorted_values)])))
+    return starts, lengths
+
+
+def _average_ranks(values):
+    """
+    Postos médios (empates recebem a média dos postos), como rank(method="average").
+    """
+    # Empates recebem o mesmo posto qualquer que seja a ordem entre eles, então
+    # o argsort não precisa ser estável
+    order = np.argsort(values)
+    starts, lengths = _runs(values[order])
+    run_ranks = starts + (lengths + 1) / 2.0
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.repeat(run_ranks, lengths)
+    return ranks
+
+
+def describe_column(column, q=0.9, z=2.0, thresholds=(), integer=False):
+    """
+    Estatísticas de uma coluna (1-D, float64, NaN = ausente):
+    count, mean, median, mode, std, std0 (ddof=0), min, max, quantile (q),
+    outlier_pct (|z| > z, em % de todas as linhas) e above_<t> (% de todas
+    as linhas acima de cada threshold). Com integer=True, moda, mínimo e
+    máximo voltam como inteiros (como no pandas para colunas int).
+    """
+    total = len(column)
+    missing = np.isnan(column)
+    if missing.any():
+        values = column[~missing]
+        # o pandas soma a coluna inteira com os NaN zerados; somar o mesmo vetor
+        # mantém os resultados idênticos bit a bit
+        filled = np.where(missing, 0.0, column)
+    else:
+        values = filled = column
+    n = len(values)
+
+    stats = {"count": n}
+    if n == 0:
+        for key in ("mean", "median", "std", "std0", "min", "max", "quantile"):
+            stats[key] = np.nan
+        stats["mode"] = None
+        stats["outlier_pct"] = 0.0
+    else:
+        sorted_values = np.sort(values)
+        mean = filled.sum() / n
+        deviations = (mean - filled) ** 2
+        if values is not filled:
+            deviations[missing] = 0.0
+        squares = deviations.sum()
+        std0 = np.sqrt(squares / n)
+
+        starts, lengths = _runs(sorted_values)
+        mode = sorted_values[starts[np.argmax(lengths)]]
+        low, high = sorted_values[0], sorted_values[-1]
+        if integer:
+            mode, low, high = int(mode), int(low), int(high)
+
+        stats.update({
+            "mean": mean,
+            "median": (sorted_values[(n - 1) // 2] + sorted_values[n // 2]) / 2,
+            "mode": mode,
+            "std": np.sqrt(squares / (n - 1)) if n > 1 else np.nan,
+            "std0": std0,
+            "min": low,
+            "max": high,
+            "quantile": _quantile_sorted(sorted_values, q),
+        })
+        if std0 != 0:
+            zscores = (values - mean) / std0
+            stats["outlier_pct"] = np.count_nonzero(np.abs(zscores) > z) / total * 100
+        else:
+            stats["outlier_pct"] = 0.0
+
+    for threshold in thresholds:
+        stats[f"above_{threshold}"] = np.count_nonzero(values > threshold) / total * 100 if total else np.nan
+    return stats
+
+
+def _pearson(x, y):
+    if len(x) < 2:
+        return np.nan
+    dx = x - x.mean()
+    dy = y - y.mean()
+    denom = np.sqrt((dx * dx).sum() * (dy * dy).sum())
+    return (dx * dy).sum() / denom if denom != 0 else np.nan
+
+
+def correlations(matrix):
+    """
+    Matrizes de correlação de Pearson e Spearman entre as colunas de `matrix`
+    (2-D). Linhas com NaN são descartadas por par de colunas, como no
+    DataFrame.corr(). Sem NaN, os postos de cada coluna são calculados uma vez.
+    """
+    k = matrix.shape[1]
+    pearson = np.eye(k)
+    spearman = np.eye(k)
+    complete = not np.isnan(matrix).any()
+    ranks = [_average_ranks(matrix[:, j]) for j in range(k)] if complete else None
+
+    for i in range(k):
+        for j in range(i + 1, k):
+            if complete:
+                x, y, rx, ry = matrix[:, i], matrix[:, j], ranks[i], ranks[j]
+            else:
+                mask = ~(np.isnan(matrix[:, i]) | np.isnan(matrix[:, j]))
+                x, y = matrix[mask, i], matrix[mask, j]
+                rx, ry = _average_ranks(x), _average_ranks(y)
+            pearson[i, j] = pearson[j, i] = _pearson(x, y)
+            spearman[i, j] = spearman[j, i] = _pearson(rx, ry)
+    return pearson, spearman
+
+
+def describe_frame(df, columns, thresholds=None, q=0.9, z=2.0):
+    """
+    Aplica describe_column a cada coluna de `columns` de um DataFrame, em cima
+    de um único array 2-D. thresholds: {coluna: [limites]}.
+    Retorna ({coluna: estatísticas}, matriz 2-D usada).
+    """
+    thresholds = thresholds or {}
+    matrix = df[columns].to_numpy(dtype=np.float64)
+    summary = {}
+    for j, col in enumerate(columns):
+        integer = np.issubdtype(df[col].dtype, np.integer)
+        summary[col] = describe_column(matrix[:, j], q=q, z=z,
+                                       thresholds=thresholds.get(col, ()), integer=integer)
+    return summary, matrix
+
+
+def mean_ci(values, clusters=None, fraction=0.0, z=Z_95):
+    """
+    Intervalo de confiança da média de `values` (1-D, sem NaN) estimada de
+    uma amostra. clusters: rótulo do conglomerado de cada valor (o arquivo
+    .java de cada classe, quando a amostra sorteia arquivos); None = amostra
+    aleatória simples de valores. fraction: fração sorteada da população
+    (correção para população finita; 0 = população muito maior que a amostra). Com conglomerados, a variância é a do
+    estimador de razão (soma dos valores / número de valores por arquivo).
+    Retorna (inferior, superior, efeito do desenho); NaN sem amostra suficiente.
+    """
+    n = len(values)
+    if n < 2:
+        return np.nan, np.nan, np.nan
+    mean = values.mean()
+    fpc = max(0.0, 1.0 - fraction)
+    srs_var = fpc * values.var(ddof=1) / n
+    if clusters is None:
+        var = srs_var
+    else:
+        _, codes = np.unique(clusters, return_inverse=True)
+        sums = np.bincount(codes, weights=values)
+        sizes = np.bincount(codes)
+        k = len(sizes)
+        if k < 2:
+            return np.nan, np.nan, np.nan
+        residuals = sums - mean * sizes
+        var = fpc * k / (k - 1) * (residuals * residuals).sum() / (n * n)
+    half = z * np.sqrt(var)
+    deff = var / srs_var if srs_var > 0 else 1.0
+    return mean - half, mean + half, deff
+
+
+def quantile_ci(sorted_values, q, n_eff, z=Z_95):
+    """
+    Intervalo de Woodruff para o quantil q de uma amostra ordenada: os
+    quantis da amostra em q ± z·sqrt(q(1-q)/n_eff). n_eff é o tamanho
+    efetivo da amostra (já descontados efeito do desenho e fração amostrada);
+    infinito = sem erro amostral.
+    """
+    if len(sorted_values) == 0 or not n_eff > 0:
+        return np.nan, np.nan
+    half = z * np.sqrt(q * (1 - q) / n_eff)
+    return (_quantile_sorted(sorted_values, max(0.0, q - half)),
+            _quantile_sorted(sorted_values, min(1.0, q + half)))
+
+
+def describe_ci(column, clusters=None, fraction=1.0, q=0.9, z=2.0, thresholds=(), confidence_z=Z_95):
+    """
+    Intervalos de confiança para as estatísticas de describe_column que
+    dependem da amostra: mean, median, quantile (q), outlier_pct e above_<t>
+    (percentuais tratados como médias de indicadores 0/100). Mesmos
+    argumentos de describe_column, mais clusters e fraction (ver mean_ci).
+    Retorna {estatística: (inferior, superior)}.
+    """
+    valid = ~np.isnan(column)
+    values = column[valid]
+    labels = clusters[valid] if clusters is not None else None
+    nan = (np.nan, np.nan)
+    if len(values) < 2:
+        return {key: nan for key in ["mean", "median", "quantile", "outlier_pct"]
+                + [f"above_{t}" for t in thresholds]}
+
+    low, high, deff = mean_ci(values, labels, fraction, confidence_z)
+    intervals = {"mean": (low, high)}
+    # Quantis: tamanho efetivo da amostra pelo efeito do desenho da média
+    fpc = 1.0 - fraction
+    n_eff = len(values) / (max(deff, 1.0) * fpc) if fpc > 0 else np.inf
+    sorted_values = np.sort(values)
+    intervals["median"] = quantile_ci(sorted_values, 0.5, n_eff, confidence_z)
+    intervals["quantile"] = quantile_ci(sorted_values, q, n_eff, confidence_z)
+
+    # Percentuais sobre todas as linhas, como em describe_column
+    share = len(values) / len(column)
+    std0 = values.std()
+    indicators = {"outlier_pct": np.abs(values - values.mean()) > z * std0 if std0 != 0
+                  else np.zeros(len(values), dtype=bool)}
+    for threshold in thresholds:
+        indicators[f"above_{threshold}"] = values > threshold
+    for key, flags in indicators.items():
+        low, high, _ = mean_ci(flags * 100.0, labels, fraction, confidence_z)
+        intervals[key] = (max(0.0, low * share), min(100.0, high * share))
+    return intervals
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Instrumentação por estágio da varredura do ck_metrics.py. Cada repositório
+# acumula em job["spans"] um registro por etapa (default branch, download,
+# extração, CK, validação dos CSVs, comentários...) com tempo de parede, tempo
+# de CPU e, quando se aplica, bytes baixados/gravados e pico de RSS do filho.
+# Ao terminar (com sucesso, pulado ou com falha), o repositório vira uma linha
+# JSON no arquivo de tempos; no fim da execução sai um relatório com
+# percentis por estágio e os repositórios mais lentos (impresso e gravado em
+# <arquivo>_report.json).
+TIMINGS_PATH = os.path.join("results", "ck_timings.jsonl")
+PERCENTILES = (50, 90, 99)
+SLOWEST_REPOS = 10
+
+
+def add_span(job, stage, wall_s, cpu_s=None, **fields):
+    """
+    Registra em job["spans"] uma etapa já medida (ex.: o CK, medido pelo run_ck).
+    """
+    record = {"stage": stage, "wall_s": round(wall_s, 3) if wall_s is not None else None,
+              "cpu_s": round(cpu_s, 3) if cpu_s is not None else None}
+    record.update(fields)
+    job["spans"].append(record)
+    return record
+
+
+def busy_time(job):
+    """
+    Soma das etapas medidas do repositório: o tempo em que ele de fato ocupou
+    um worker, sem as esperas nas filas entre estágios.
+    """
+    return sum(s["wall_s"] for s in job["spans"] if s["wall_s"] is not None)
+
+
+@contextmanager
+def span(job, stage, **fields):
+    """
+    Mede o bloco como a etapa `stage` do repositório. O CPU é o da thread que
+    executa o estágio (time.thread_time); o dict devolvido aceita campos extras
+    (bytes_downloaded, bytes_written, ...) preenchidos dentro do bloco.
+    """
+    extra = dict(fields)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield extra
+    finally:
+        add_span(job, stage, time.perf_counter() - wall, time.thread_time() - cpu, **extra)
+
+
+def _percentile(sorted_values, p):
+    # Percentil linear (mesma interpolação do np.percentile)
+    if not sorted_values:
+        return None
+    virtual = (len(sorted_values) - 1) * p / 100
+    lower = int(virtual)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (virtual - lower)
+
+
+def _total(values):
+    values = [v for v in values if v is not None]
+    return sum(values) if values else None
+
+
+def build_report(records, top=SLOWEST_REPOS):
+    """
+    Relatório de uma lista de linhas do arquivo de tempos: por estágio, número
+    de execuções, percentis e total do tempo de parede, CPU total, bytes e
+    maior pico de RSS; e os `top` repositórios com maior tempo total.
+    """
+    by_stage = {}
+    for record in records:
+        for s in record["spans"]:
+            by_stage.setdefault(s["stage"], []).append(s)
+
+    stages = {}
+    for stage, spans in by_stage.items():
+        walls = sorted(s["wall_s"] for s in spans if s["wall_s"] is not None)
+        summary = {"count": len(spans), "wall_total_s": round(sum(walls), 3)}
+        for p in PERCENTILES:
+            value = _percentile(walls, p)
+            summary[f"wall_p{p}_s"] = round(value, 3) if value is not None else None
+        summary["wall_max_s"] = walls[-1] if walls else None
+        summary["cpu_total_s"] = _total(s["cpu_s"] for s in spans)
+        summary["bytes_downloaded"] = _total(s.get("bytes_downloaded") for s in spans)
+        summary["bytes_written"] = _total(s.get("bytes_written") for s in spans)
+        peaks = [s["peak_rss_kb"] for s in spans if s.get("peak_rss_kb")]
+        summary["peak_rss_max_kb"] = max(peaks) if peaks else None
+        stages[stage] = summary
+
+    slowest = []
+    for record in sorted(records, key=lambda r: r["wall_s"] or 0, reverse=True)[:top]:
+        stage_walls = [s for s in record["spans"] if s["wall_s"] is not None]
+        dominant = max(stage_walls, key=lambda s: s["wall_s"]) if stage_walls else None
+        slowest.append({
+            "repo": record["repo"],
+            "status": record["status"],
+            "wall_s": record["wall_s"],
+            "wait_s": record["wait_s"],
+            "dominant_stage": dominant["stage"] if dominant else None,
+            "dominant_wall_s": dominant["wall_s"] if dominant else None,
+        })
+
+    statuses = {}
+    for record in records:
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+    return {"repos": len(records), "status": statuses, "stages": stages, "slowest": slowest}
+
+
+def print_report(report):
+    print("\n=== Tempos por estágio ===")
+    print(f"Repositórios: {report['repos']} " +
+          " ".join(f"{status}={count}" for status, count in sorted(report["status"].items())))
+    header = ["estágio", "n"] + [f"p{p}(s)" for p in PERCENTILES] + ["máx(s)", "total(s)", "CPU(s)", "MB baixados",
+                                                                     "MB gravados", "pico RSS(MB)"]
+    print("  ".join(f"{h:>12}" for h in header))
+
+    def mb(value, unit=1024 ** 2):
+        return f"{value / unit:.1f}" if value else "-"
+
+    for stage, s in report["stages"].items():
+        row = [stage, s["count"]] + [s[f"wall_p{p}_s"] for p in PERCENTILES] + [
+            s["wall_max_s"], s["wall_total_s"], s["cpu_total_s"] if s["cpu_total_s"] is not None else "-",
+            mb(s["bytes_downloaded"]), mb(s["bytes_written"]), mb(s["peak_rss_max_kb"], 1024)]
+        print("  ".join(f"{value:>12.2f}" if isinstance(value, float) else f"{value!s:>12}" for value in row))
+
+    print(f"\nRepositórios mais lentos (top {len(report['slowest'])}):")
+    for r in report["slowest"]:
+        line = f"  {r['repo']}: {r['wall_s']:.1f}s ({r['status']}"
+        if r["dominant_stage"]:
+            line += f"; maior etapa {r['dominant_stage']} {r['dominant_wall_s']:.1f}s, fila {r['wait_s']:.1f}s"
+        print(line + ")")
+
+
+class SweepTimings:
+    """
+    Grava uma linha JSON por repositório finalizado (compartilhado entre as
+    threads dos estágios) e guarda as linhas para o relatório final.
+    """
+    def __init__(self, path=TIMINGS_PATH):
+        self.path = path
+        self.records = []
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+
+    def finish(self, job, status, error=None):
+        """
+        Encerra os tempos do repositório: status "ok", "skipped" ou "failed".
+        wait_s = tempo total menos a soma das etapas (filas entre estágios).
+        """
+        spans = job["spans"]
+        wall = time.time() - job["start"] if job["start"] else None
+        busy = busy_time(job)
+        record = {
+            "repo": job["repo_id"],
+            "status": status,
+            "head_sha": job["head_sha"],
+            "size_bytes": job["size_bytes"],
+            "wall_s": round(wall, 3) if wall is not None else None,
+            "predicted_s": round(job["predicted_s"], 3) if job.get("predicted_s") is not None else None,
+            "wait_s": round(max(0.0, wall - busy), 3) if wall is not None else None,
+            "spans": spans,
+        }
+        if error:
+            record["error"] = error
+        with self._lock:
+            self.records.append(record)
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+        return record
+
+    def close(self):
+        """
+        Fecha o arquivo de tempos e grava o relatório ao lado (<nome>_report.json).
+        """
+        with self._lock:
+            self._file.close()
+        report = build_report(self.records)
+        with open(os.path.splitext(self.path)[0] + "_report.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+
+def read_timings(path):
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def main():
+    # Refaz o relatório de uma execução anterior: python -m utils.timings [arquivo]
+    path = sys.argv[1] if len(sys.argv) > 1 else TIMINGS_PATH
+    print_report(build_report(read_timings(path)))
+
+
+if __name__ == "__main__":
+    main()
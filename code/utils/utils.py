@@ -1,7 +1,9 @@
 import os
-import re
+import mmap
+import time
 import pandas as pd
-from collections import defaultdict
+from functools import partial
+from utils.java_lexer import count_comments_by_type
 try:
     import keyring
 except ImportError:
@@ -31,143 +33,173 @@ def get_github_token():
         "Configure no keyring ou na variável de ambiente 'GITHUB_TOKEN'."
     )
 
+COMMENT_FIELDS = ("line_comments", "block_comments", "comment_lines", "total_comments")
+FILES_PER_TASK = 64  # arquivos por tarefa enviada ao pool de processos
+
+
+def _count_file_comments(abs_path, scan_mode):
+    """
+    Conta os comentários de um arquivo. No modo "mmap" o lexer varre os bytes
+    mapeados em memória, sem ler nem decodificar o arquivo inteiro; no modo
+    "text" o arquivo é lido e decodificado como UTF-8.
+    """
+    if scan_mode == "text":
+        with open(abs_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        return count_comments_by_type(content), os.path.getsize(abs_path)
+
+    with open(abs_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return count_comments_by_type(b""), 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            return count_comments_by_type(content), size
+
+
+def _scan_java_files(paths, scan_mode="mmap"):
+    """
+    Conta comentários de um lote de arquivos (roda nos processos do pool).
+    Devolve contadores compactos: [(path, {classe: (line, block, lines, total)}, bytes lidos)].
+    """
+    results = []
+    for abs_path in paths:
+        try:
+            counters, nbytes = _count_file_comments(abs_path, scan_mode)
+        except Exception as e:
+            print(f"[!] Não foi possível abrir {abs_path}: {e}")
+            continue
+        counts = {
+            cname: tuple(vals[field] for field in COMMENT_FIELDS)
+            for cname, vals in counters.items()
+        }
+        results.append((abs_path, counts, nbytes))
+    return results
+
+
+def _existing_paths(candidates):
+    """
+    Verifica a existência de vários arquivos com um os.listdir por diretório,
+    em vez de um os.path.exists por arquivo.
+    """
+    listings = {}
+    found = set()
+    for path in candidates:
+        directory, name = os.path.split(path)
+        if directory not in listings:
+            try:
+                listings[directory] = set(os.listdir(directory or "."))
+            except OSError:
+                listings[directory] = set()
+        if name in listings[directory]:
+            found.add(path)
+    return found
+
+
+def _build_file_index(df_class, repo_dir):
+    """
+    Índice arquivo → caminho no disco, montado uma vez por arquivo distinto do
+    class.csv (e não por linha). Retorna DataFrame com file, file_norm e abs_path
+    (None quando o arquivo não existe).
+    """
+    files = pd.DataFrame({"file": df_class["file"].unique()})
+    files["file_norm"] = files["file"].map(os.path.normpath)
+    files["norm_path"] = [os.path.join(repo_dir, f) for f in files["file_norm"]]
+    # tenta também sem normalização (algumas entradas do CK podem usar separadores diferentes)
+    files["raw_path"] = [os.path.join(repo_dir, f) for f in files["file"]]
+
+    existing = _existing_paths(set(files["norm_path"]) | set(files["raw_path"]))
+    files["abs_path"] = files["norm_path"].where(
+        files["norm_path"].isin(existing),
+        files["raw_path"].where(files["raw_path"].isin(existing), None)
+    )
+    return files[["file", "file_norm", "abs_path"]]
+
+
 # Função para gerar CSV de comentários por classe a partir de um repositório clonado
-def generate_comments_by_class(repo_dir, class_csv_path, output_dir):
+def generate_comments_by_class(repo_dir, class_csv_path, output_dir, executor=None, scan_mode="mmap"):
     """
     Lê class.csv (gerado pelo CK), percorre os arquivos .java do repo e conta
     comentários por classe. Gera um CSV separado em output_dir/comments_by_class.csv.
 
     Estratégia:
-    - Para cada arquivo listado em class.csv, abre o arquivo e localiza comentários
-      via regex (// ... ou /* ... */).
-    - Localiza declarações de classes/interfaces/enums e determina o bloco da classe
-      via busca do '{' e brace-matching simples.
-    - Atribui cada comentário à classe mais interna que o contém (por posição).
+    - Monta uma vez o índice arquivo → classes do class.csv (caminhos
+      normalizados por arquivo distinto, existência checada por diretório).
+    - Para cada arquivo existente, faz uma única passada de lexer
+      (utils/java_lexer.py) que reconhece strings, chars, text blocks e
+      comentários (// ... ou /* ... */) e acompanha a pilha de tipos aninhados.
+    - Cada comentário é atribuído ao tipo mais interno que o contém, com o nome
+      no mesmo formato da coluna `class` do CK (pacote.Outer$Inner), então a
+      junção com class.csv é exata.
+    - scan_mode="mmap" varre os bytes do arquivo mapeado em memória (só os nomes
+      de tipos são decodificados); "text" lê o arquivo decodificado como antes.
+    - Com executor (ProcessPoolExecutor), os arquivos são divididos em lotes
+      entre os processos e os contadores de cada arquivo são juntados aqui;
+      a saída é ordenada, então é a mesma do modo sequencial.
+    - Classes do class.csv sem comentários entram com zeros (junção externa).
     - Escreve CSV com colunas: file, class, line_comments, block_comments, comment_lines, total_comments
     """
     try:
-        df_class = pd.read_csv(class_csv_path, encoding="utf-8", encoding_errors="ignore")
+        df_class = pd.read_csv(class_csv_path, usecols=["file", "class"],
+                               encoding="utf-8", encoding_errors="ignore")
     except Exception as e:
         print(f"[!] Não foi possível ler {class_csv_path}: {e}")
         return None
 
-    comment_re = re.compile(r'//.*?$|/\*.*?\*/', re.DOTALL | re.MULTILINE)
-    class_decl_re = re.compile(r'\b(class|interface|enum)\s+([A-Za-z_][A-Za-z0-9_$]*)', re.MULTILINE)
-
-    # mapping: (file_rel, class_name) -> counters
-    counters = defaultdict(lambda: {"line_comments": 0, "block_comments": 0, "comment_lines": 0, "total_comments": 0})
-
-    processed_files = set()
-
-    for _, row in df_class.iterrows():
-        file_rel = row.get('file')
-        class_name_ck = row.get('class')
-        if not isinstance(file_rel, str) or not isinstance(class_name_ck, str):
-            continue
-
-        file_rel_norm = os.path.normpath(file_rel)
-        abs_path = os.path.join(repo_dir, file_rel_norm)
-        if not os.path.exists(abs_path):
-            # tenta também sem normalização (algumas entradas do CK podem usar separadores diferentes)
-            abs_path = os.path.join(repo_dir, file_rel)
-            if not os.path.exists(abs_path):
-                # arquivo não encontrado; pula
-                continue
-
-        if abs_path in processed_files:
-            # já processado o arquivo, mas garantimos que exista a chave para esta classe
-            _ = counters[(file_rel_norm, class_name_ck)]
-            continue
+    df_class = df_class.dropna(subset=["file", "class"]).astype(str)
+
+    files = _build_file_index(df_class, repo_dir)
+    found = files.dropna(subset=["abs_path"]).drop_duplicates(subset=["abs_path"])
+    file_of_path = dict(zip(found["abs_path"], found["file_norm"]))
+
+    start = time.time()
+    paths = list(file_of_path)
+    batches = [paths[i:i + FILES_PER_TASK] for i in range(0, len(paths), FILES_PER_TASK)]
+    scan = partial(_scan_java_files, scan_mode=scan_mode)
+    if executor is not None and len(batches) > 1:
+        scanned = executor.map(scan, batches)
+    else:
+        scanned = map(scan, batches)
+
+    total_bytes = 0
+    records = []
+    for results in scanned:
+        for abs_path, counts, nbytes in results:
+            total_bytes += nbytes
+            file_norm = file_of_path[abs_path]
+            records.extend((file_norm, cname, *vals) for cname, vals in counts.items())
+
+    elapsed = max(time.time() - start, 1e-6)
+    print(f"[+] Comentários: {len(paths)} arquivos, {total_bytes / 1024 ** 2:.1f} MB em {elapsed:.2f}s "
+          f"({len(paths) / elapsed:.0f} arquivos/s, {total_bytes / 1024 ** 2 / elapsed:.1f} MB/s)")
 
-        processed_files.add(abs_path)
+    # Garante que todas as classes listadas no class.csv apareçam (mesmo que 0)
+    df_keys = (df_class.merge(files[["file", "file_norm"]], on="file")
+               [["file_norm", "class"]].rename(columns={"file_norm": "file"}))
+    return write_comments_csv(records, df_keys, output_dir)
 
-        try:
-            with open(abs_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except Exception as e:
-            print(f"[!] Não foi possível abrir {abs_path}: {e}")
-            continue
 
-        # Encontra ranges de classes no arquivo
-        class_ranges = []
-        for m in class_decl_re.finditer(content):
-            cname = m.group(2)
-            # procurar '{' após a declaração
-            brace_idx = content.find('{', m.end())
-            if brace_idx == -1:
-                continue
-            # brace matching simples
-            depth = 0
-            i = brace_idx
-            end_idx = None
-            L = len(content)
-            while i < L:
-                ch = content[i]
-                if ch == '{':
-                    depth += 1
-                elif ch == '}':
-                    depth -= 1
-                    if depth == 0:
-                        end_idx = i + 1
-                        break
-                i += 1
-            if end_idx:
-                # armazena (nome, start, end)
-                class_ranges.append((cname, brace_idx, end_idx))
-
-        # ordena por tamanho do range (menor primeiro) para escolher a classe interna mais específica
-        class_ranges.sort(key=lambda x: (x[2] - x[1]))
-
-        # percorre comentários
-        for cm in comment_re.finditer(content):
-            start_pos = cm.start()
-            text = cm.group(0)
-            lines = text.count('\n') + 1
-            is_block = text.startswith('/*')
-            assigned = False
-            # encontra the classe mais interna que contém este comentário
-            for cname, s, e in class_ranges:
-                if s <= start_pos < e:
-                    key = (file_rel_norm, cname)
-                    if is_block:
-                        counters[key]["block_comments"] += 1
-                    else:
-                        counters[key]["line_comments"] += 1
-                    counters[key]["comment_lines"] += lines
-                    counters[key]["total_comments"] += 1
-                    assigned = True
-                    break
-            if not assigned:
-                # comentário fora de classes: atribui a entrada com class '<file_level>'
-                key = (file_rel_norm, '<file_level>')
-                if is_block:
-                    counters[key]["block_comments"] += 1
-                else:
-                    counters[key]["line_comments"] += 1
-                counters[key]["comment_lines"] += lines
-                counters[key]["total_comments"] += 1
+def write_comments_csv(records, df_keys, output_dir):
+    """
+    Grava output_dir/comments_by_class.csv a partir de registros
+    (file, class, *COMMENT_FIELDS). Classes de df_keys (file, class) sem
+    comentários entram com zeros. Retorna o caminho do CSV ou None.
+    """
+    columns = ["file", "class", *COMMENT_FIELDS]
+    df_counts = pd.DataFrame.from_records(records, columns=columns).drop_duplicates(
+        subset=["file", "class"], keep="last")
 
-    # Garante que todas as classes listadas no class.csv apareçam (mesmo que 0)
-    for _, row in df_class.iterrows():
-        file_rel = row.get('file')
-        class_name_ck = row.get('class')
-        if isinstance(file_rel, str) and isinstance(class_name_ck, str):
-            key = (os.path.normpath(file_rel), class_name_ck)
-            if key not in counters:
-                counters[key]  # inicializa com zeros
+    df_out = df_counts.merge(df_keys[["file", "class"]].drop_duplicates(), on=["file", "class"], how="outer")
+    df_out[list(COMMENT_FIELDS)] = df_out[list(COMMENT_FIELDS)].fillna(0).astype(int)
+    df_out = df_out.sort_values(["file", "class"])[columns]
 
     # Prepara output
     os.makedirs(output_dir, exist_ok=True)
     out_csv = os.path.join(output_dir, 'comments_by_class.csv')
     try:
-        import csv
-        with open(out_csv, 'w', newline='', encoding='utf-8') as fout:
-            writer = csv.writer(fout)
-            writer.writerow(['file', 'class', 'line_comments', 'block_comments', 'comment_lines', 'total_comments'])
-            for (file_rel, cname), vals in sorted(counters.items()):
-                writer.writerow([file_rel, cname, vals["line_comments"], vals["block_comments"], vals["comment_lines"], vals["total_comments"]])
+        # mesmo terminador do csv.writer usado antes
+        df_out.to_csv(out_csv, index=False, encoding='utf-8', lineterminator='\r\n')
         print(f"[✓] CSV de comentários gerado em: {out_csv}")
         return out_csv
     except Exception as e:
         print(f"[!] Falha ao gravar {out_csv}: {e}")
-        return None
\ No newline at end of file
+        return None
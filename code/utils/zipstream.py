@@ -0,0 +1,213 @@
+import os
+import struct
+import zlib
+
+LOCAL_FILE_SIG = b"PK\x03\x04"
+CENTRAL_DIR_SIG = b"PK\x01\x02"
+END_OF_CENTRAL_DIR_SIG = b"PK\x05\x06"
+ZIP64_END_SIG = b"PK\x06\x06"
+DATA_DESCRIPTOR_SIG = b"PK\x07\x08"
+
+FLAG_ENCRYPTED = 0x01
+FLAG_DATA_DESCRIPTOR = 0x08
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+ZIP64_EXTRA_ID = 0x0001
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class StreamZipError(Exception):
+    """
+    O ZIP usa algum recurso que não dá para ler sequencialmente
+    (criptografia, método de compressão desconhecido, stored com data descriptor...).
+    Quem chama deve cair para a extração tradicional com o arquivo completo.
+    """
+
+
+class _ChunkReader:
+    """
+    Leitor sequencial sobre um iterável de blocos de bytes (ex.: response.iter_content).
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+        self.bytes_read = 0
+
+    def _fill(self, n):
+        while len(self._buffer) < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return False
+            self._buffer += chunk
+            self.bytes_read += len(chunk)
+        return True
+
+    def read(self, n):
+        if not self._fill(n):
+            raise StreamZipError("ZIP truncado")
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+    def peek(self, n):
+        self._fill(n)
+        return bytes(self._buffer[:n])
+
+    def read_some(self, max_bytes):
+        if not self._buffer and not self._fill(1):
+            raise StreamZipError("ZIP truncado")
+        data = bytes(self._buffer[:max_bytes])
+        del self._buffer[:max_bytes]
+        return data
+
+    def unread(self, data):
+        if data:
+            self._buffer[:0] = data
+
+    def skip(self, n):
+        while n > 0:
+            n -= len(self.read_some(min(n, WRITE_BUFFER_SIZE)))
+
+
+def _parse_zip64_extra(extra, usize, csize):
+    """
+    Lê tamanhos de 64 bits do campo extra ZIP64 (quando o header tem 0xFFFFFFFF).
+    """
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[pos:pos + 4])
+        body = extra[pos + 4:pos + 4 + size]
+        if header_id == ZIP64_EXTRA_ID:
+            values = []
+            for i in range(0, len(body) - 7, 8):
+                values.append(struct.unpack("<Q", body[i:i + 8])[0])
+            if usize == 0xFFFFFFFF and values:
+                usize = values.pop(0)
+            if csize == 0xFFFFFFFF and values:
+                csize = values.pop(0)
+            return usize, csize, True
+        pos += 4 + size
+    return usize, csize, False
+
+
+def _safe_relative_path(name, strip_root):
+    """
+    Converte o nome da entrada em caminho relativo seguro, removendo a pasta raiz
+    do arquivo (owner-repo-sha/ no GitHub). Devolve None para entradas a ignorar.
+    """
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    if strip_root:
+        parts = parts[1:]
+    if not parts or any(p == ".." for p in parts) or ":" in parts[0]:
+        return None
+    return os.path.join(*parts)
+
+
+def _copy_entry(reader, method, csize, has_descriptor, out):
+    """
+    Consome os dados de uma entrada, escrevendo o conteúdo descompactado em `out`
+    (ou descartando, se out for None). Devolve o CRC32 do conteúdo.
+    """
+    crc = 0
+    if method == METHOD_STORED:
+        if has_descriptor:
+            raise StreamZipError("entrada stored com data descriptor")
+        if out is None:
+            reader.skip(csize)
+            return None
+        remaining = csize
+        while remaining > 0:
+            data = reader.read_some(min(remaining, WRITE_BUFFER_SIZE))
+            remaining -= len(data)
+            crc = zlib.crc32(data, crc)
+            out.write(data)
+        return crc
+
+    if method != METHOD_DEFLATED:
+        raise StreamZipError(f"método de compressão não suportado: {method}")
+
+    if out is None and not has_descriptor:
+        # Tamanho compactado conhecido: pula sem descompactar
+        reader.skip(csize)
+        return None
+
+    decompressor = zlib.decompressobj(-15)
+    remaining = None if has_descriptor else csize
+    while not decompressor.eof:
+        want = WRITE_BUFFER_SIZE if remaining is None else min(remaining, WRITE_BUFFER_SIZE)
+        if want == 0:
+            raise StreamZipError("fluxo deflate incompleto")
+        data = reader.read_some(want)
+        if remaining is not None:
+            remaining -= len(data)
+        chunk = decompressor.decompress(data)
+        if out is not None and chunk:
+            crc = zlib.crc32(chunk, crc)
+            out.write(chunk)
+    # O que sobrou depois do fim do fluxo deflate pertence ao próximo registro
+    reader.unread(decompressor.unused_data)
+    if remaining:
+        reader.skip(remaining)
+    return crc if out is not None else None
+
+
+def stream_extract(chunks, dest_dir, suffixes=None, strip_root=True):
+    """
+    Extrai um ZIP lendo-o sequencialmente de `chunks`, sem gravar o arquivo
+    completo em disco. Somente entradas cujo nome termina com um dos `suffixes`
+    (ex.: ('.java', '.jar')) são gravadas; as demais são puladas. Com strip_root,
+    a pasta raiz do arquivo é removida durante a extração.
+
+    Devolve (arquivos_gravados, bytes_gravados, bytes_baixados).
+    """
+    suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+    reader = _ChunkReader(chunks)
+    files_written = 0
+    bytes_written = 0
+
+    os.makedirs(dest_dir, exist_ok=True)
+    while True:
+        signature = reader.peek(4)
+        if signature in (CENTRAL_DIR_SIG, END_OF_CENTRAL_DIR_SIG, ZIP64_END_SIG) or len(signature) < 4:
+            break
+        if signature != LOCAL_FILE_SIG:
+            raise StreamZipError("assinatura de entrada inválida")
+
+        header = reader.read(30)
+        (_, _, flags, method, _, _, crc_expected, csize, usize,
+         name_len, extra_len) = struct.unpack("<4sHHHHHIIIHH", header)
+        raw_name = reader.read(name_len)
+        extra = reader.read(extra_len)
+
+        if flags & FLAG_ENCRYPTED:
+            raise StreamZipError("entrada criptografada")
+
+        usize, csize, is_zip64 = _parse_zip64_extra(extra, usize, csize)
+        has_descriptor = bool(flags & FLAG_DATA_DESCRIPTOR)
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437", errors="replace")
+
+        is_dir = name.endswith("/")
+        wanted = not is_dir and (suffixes is None or name.lower().endswith(suffixes))
+        rel_path = _safe_relative_path(name, strip_root) if wanted else None
+
+        if rel_path:
+            target = os.path.join(dest_dir, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb", buffering=WRITE_BUFFER_SIZE) as out:
+                crc = _copy_entry(reader, method, csize, has_descriptor, out)
+                bytes_written += out.tell()
+            files_written += 1
+        else:
+            crc = _copy_entry(reader, method, csize, has_descriptor, None)
+
+        if has_descriptor:
+            if reader.peek(4) == DATA_DESCRIPTOR_SIG:
+                reader.read(4)
+            descriptor = reader.read(20 if is_zip64 else 12)
+            crc_expected = struct.unpack("<I", descriptor[:4])[0]
+
+        if crc is not None and crc != crc_expected:
+            raise StreamZipError(f"CRC inválido em {name}")
+
+    return files_written, bytes_written, reader.bytes_read